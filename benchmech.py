@@ -0,0 +1,102 @@
+"""Benchmark per-command latency of robot_control_mech.send_robot_command.
+
+Compares a fresh connection per command (module-level requests.post, the old
+behaviour) with the mech's pooled keep-alive session, against a headless
+simulator in a subprocess. Also counts the client sockets left in TIME_WAIT.
+
+    python benchmech.py --commands 2000 --server flask --server aiohttp
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+import robot_control_mech
+from robotbench import percentile, wait_until_up
+
+
+def time_wait_sockets(port):
+    """Sockets to `port` in TIME_WAIT, from /proc/net/tcp (0 where that is unavailable)."""
+    count = 0
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[3] == "06" and int(fields[2].rsplit(":", 1)[1], 16) == port:
+                        count += 1
+        except OSError:
+            pass
+    return count
+
+
+def post_fresh(url, data):
+    response = requests.post(url, json=data, timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+
+def post_pooled(url, data):
+    return robot_control_mech.send_robot_command(data["command"], data["duration"], url=url)
+
+
+def measure(send, url, commands):
+    data = {"command": "forward", "duration": 0.01}
+    latencies = []
+    for _ in range(commands):
+        start = time.perf_counter()
+        send(url, data)
+        latencies.append(time.perf_counter() - start)
+    return {"p50_ms": 1000 * statistics.median(latencies),
+            "p99_ms": 1000 * percentile(latencies, 0.99),
+            "mean_ms": 1000 * statistics.fmean(latencies)}
+
+
+def run_mode(server, port, commands):
+    process = subprocess.Popen([sys.executable, "robotsim.py", "--headless", "--time-warp", "max",
+                                "--server", server, "--port", str(port), "--seed", "1"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_until_up(base):
+            print(f"{server}: server did not start")
+            return []
+        url = base + "/command"
+        results = []
+        for name, send in (("fresh connection", post_fresh), ("pooled session", post_pooled)):
+            send(url, {"command": "forward", "duration": 0.01})  # Warm up
+            before = time_wait_sockets(port)
+            result = measure(send, url, commands)
+            result.update(server=server, client=name, time_wait=time_wait_sockets(port) - before)
+            results.append(result)
+        return results
+    finally:
+        robot_control_mech.close_sessions()
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=1000, help="Sequential commands per client mode")
+    parser.add_argument("--server", action="append", choices=("flask", "aiohttp"), default=None)
+    parser.add_argument("--port", type=int, default=5200)
+    args = parser.parse_args()
+
+    results = []
+    for offset, server in enumerate(args.server or ["flask", "aiohttp"]):
+        results.extend(run_mode(server, args.port + offset, args.commands))
+
+    print(f"{'server':<10}{'client':<18}{'p50 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'TIME_WAIT':>11}")
+    for r in results:
+        print(f"{r['server']:<10}{r['client']:<18}{r['p50_ms']:>9.3f}{r['p99_ms']:>9.3f}"
+              f"{r['mean_ms']:>9.3f}{r['time_wait']:>11}")
+
+
+if __name__ == "__main__":
+    main()
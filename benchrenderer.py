@@ -0,0 +1,92 @@
+"""Benchmark canvas frame time over a long run: immediate vs retained rendering.
+
+The immediate renderer reproduces the old draw_robot/update_path behaviour
+(delete and recreate the robot, one new line segment per frame). The retained
+renderer is RetainedRobotRenderer. Needs a display.
+
+    python benchrenderer.py --frames 100000 --window 10000
+"""
+
+import argparse
+import math
+import time
+import tkinter as tk
+
+from robotrenderer import RetainedRobotRenderer
+
+COLORS = {"robot": "#5050a0", "direction": "#ff5050", "path": "#ffc0c0"}
+ROBOT_SIZE = 20
+
+
+class ImmediateRenderer:
+    """The pre-retained renderer: new canvas items every frame."""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.last = None
+
+    def draw_robot(self, x, y, angle):
+        self.canvas.delete("robot")
+        size = ROBOT_SIZE
+        self.canvas.create_oval(x - size, y - size, x + size, y + size,
+                                fill=COLORS["robot"], outline="black", width=2, tags="robot")
+        eye_size = size / 5
+        eye_offset = size / 3
+        angle_rad = math.radians(angle)
+        for offset in (math.pi/4, -math.pi/4):
+            ex = x + math.cos(angle_rad + offset) * eye_offset
+            ey = y - math.sin(angle_rad + offset) * eye_offset
+            self.canvas.create_oval(ex - eye_size, ey - eye_size, ex + eye_size, ey + eye_size,
+                                    fill="white", outline="black", tags="robot")
+        end_x = x + math.cos(angle_rad) * size * 1.2
+        end_y = y - math.sin(angle_rad) * size * 1.2
+        self.canvas.create_line(x, y, end_x, end_y, fill=COLORS["direction"], width=3, tags="robot")
+        self.canvas.create_oval(end_x - 4, end_y - 4, end_x + 4, end_y + 4,
+                                fill=COLORS["direction"], outline="black", tags="robot")
+
+    def extend_path(self, x, y):
+        if self.last is not None:
+            self.canvas.create_line(self.last[0], self.last[1], x, y,
+                                    fill=COLORS["path"], width=2, tags="path")
+        self.last = (x, y)
+
+
+def run(name, renderer, root, canvas, frames, window):
+    print(f"{name}:")
+    print(f"{'frames':>10} {'mean ms':>10} {'max ms':>10} {'items':>10}")
+    times = []
+    for frame in range(1, frames + 1):
+        # Circle the map so the trail keeps growing
+        t = frame * 0.016
+        x = 300 + 200 * math.cos(t * 0.3)
+        y = 250 + 200 * math.sin(t * 0.3)
+        start = time.perf_counter()
+        renderer.extend_path(x, y)
+        renderer.draw_robot(x, y, math.degrees(t * 0.3) + 90)
+        root.update_idletasks()
+        times.append(time.perf_counter() - start)
+        if frame % window == 0:
+            items = len(canvas.find_all())
+            print(f"{frame:>10} {1000 * sum(times) / len(times):>10.3f} "
+                  f"{1000 * max(times):>10.3f} {items:>10}")
+            times = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--window", type=int, default=10000)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    for name, factory in (("immediate", ImmediateRenderer),
+                          ("retained", lambda c: RetainedRobotRenderer(c, COLORS, ROBOT_SIZE))):
+        canvas = tk.Canvas(root, width=600, height=500)
+        canvas.pack()
+        run(name, factory(canvas), root, canvas, args.frames, args.window)
+        canvas.destroy()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark how long a headless simulator takes to answer GET /health.
+
+In-process runs time world generation, engine, app, port bind and the first
+/health response, with the modules already imported. Cold runs start
+robotsim.py --headless in a fresh interpreter and poll /health until it
+answers, so they include imports (numpy, and flask for the Flask server).
+
+    python benchstartup.py --runs 20 --server flask --server aiohttp
+    python benchstartup.py --cold 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from robotbench import percentile
+from robotengine import HeadlessRobotEngine
+from robotworld import World
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_in_process(server, seed):
+    """Seconds from nothing to a 200 from /health, and the phase split."""
+    port = free_port()
+    started = time.perf_counter()
+    engine = HeadlessRobotEngine(world=World.generate(seed))
+    built = time.perf_counter()
+    ready = threading.Event()
+    if server == "aiohttp":
+        from robotasyncserver import create_async_app, start_async_server
+        start_async_server(create_async_app(engine), host="127.0.0.1", port=port, ready=ready)
+    else:
+        from robotserver import create_app, start_server
+        start_server(create_app(engine), host="127.0.0.1", port=port, ready=ready)
+    if not ready.is_set():
+        raise RuntimeError(f"{server} server did not bind port {port}")
+    bound = time.perf_counter()
+    response = requests.get(f"http://127.0.0.1:{port}/health", timeout=5)
+    response.raise_for_status()
+    answered = time.perf_counter()
+    return {"engine": built - started, "bind": bound - built,
+            "first_response": answered - bound, "total": answered - started}
+
+
+def start_cold(server, seed, timeout=30.0):
+    """Seconds from spawning robotsim.py --headless to a 200 from /health."""
+    port = free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "robotsim.py")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script, "--headless", "--port", str(port),
+                                "--seed", str(seed), "--server", server],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        session = requests.Session()
+        while time.perf_counter() - started < timeout:
+            try:
+                if session.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                    return time.perf_counter() - started
+            except requests.ConnectionError:
+                time.sleep(0.002)
+        raise RuntimeError(f"robotsim.py --server {server} not ready after {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(name, samples):
+    print(f"{name:<28}median {statistics.median(samples) * 1000:8.2f} ms   "
+          f"p95 {percentile(samples, 0.95) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--server", action="append", choices=("flask", "aiohttp"), default=None)
+    parser.add_argument("--runs", type=int, default=20, help="In-process startups per server")
+    parser.add_argument("--cold", type=int, default=3, help="Fresh-interpreter startups per server (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for server in args.server or ["flask", "aiohttp"]:
+        start_in_process(server, args.seed)  # Warm up imports and the first bind
+        runs = [start_in_process(server, args.seed) for _ in range(args.runs)]
+        for phase in ("engine", "bind", "first_response", "total"):
+            report(f"{server} {phase}", [run[phase] for run in runs])
+        if args.cold:
+            report(f"{server} cold process", [start_cold(server, args.seed) for _ in range(args.cold)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark robot_control_mech commands/sec over the HTTP and in-process transports.
+
+Each backend gets the same stream of single "forward"/"backward" prompts
+through robot_control_mech.run. HTTP goes over the pooled session to a
+headless simulator in a subprocess (Flask and aiohttp). In-process hands the
+commands straight to a HeadlessRobotEngine running in this process. All
+simulators run at --time-warp max so the queue keeps draining.
+
+    python benchtransport.py --commands 5000
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+import robot_control_mech
+from robotbench import percentile, wait_until_up
+from robotengine import HeadlessRobotEngine
+from robotworld import World
+
+PROMPTS = ("forward 0.01", "backward 0.01")
+
+
+def measure(transport, commands):
+    errors = 0
+    latencies = []
+    started = time.perf_counter()
+    for n in range(commands):
+        start = time.perf_counter()
+        _, _, metadata, _ = robot_control_mech.run(prompt=PROMPTS[n % 2], tool="robot-control",
+                                                   transport=transport)
+        latencies.append(time.perf_counter() - start)
+        errors += metadata is None
+    elapsed = time.perf_counter() - started
+    return {"commands": commands, "errors": errors, "rate": commands / elapsed,
+            "p50_us": 1e6 * percentile(latencies, 0.5),
+            "p99_us": 1e6 * percentile(latencies, 0.99)}
+
+
+def run_http(server, port, commands):
+    process = subprocess.Popen([sys.executable, "robotsim.py", "--headless", "--time-warp", "max",
+                                "--server", server, "--port", str(port), "--seed", "1"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_until_up(base):
+            print(f"{server}: server did not start")
+            return None
+        transport = robot_control_mech.HttpTransport(base + "/command")
+        measure(transport, 50)  # Warm up the pooled connection
+        return dict(measure(transport, commands), backend=f"http ({server})")
+    finally:
+        robot_control_mech.close_sessions()
+        process.terminate()
+        process.wait()
+
+
+def run_in_process(commands):
+    # Submitting in-process outpaces the physics thread, which shares the GIL;
+    # a queue that holds the whole run keeps backpressure out of the numbers
+    engine = HeadlessRobotEngine(time_warp=None, world=World.generate(1), queue_size=commands + 100)
+    stop_event = threading.Event()
+    physics = threading.Thread(target=engine.run_forever, args=(stop_event,), daemon=True)
+    physics.start()
+    try:
+        transport = robot_control_mech.InProcessTransport(engine)
+        measure(transport, 50)
+        return dict(measure(transport, commands), backend="in-process")
+    finally:
+        stop_event.set()
+        physics.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=2000, help="Sequential commands per backend")
+    parser.add_argument("--server", action="append", choices=("flask", "aiohttp"), default=None,
+                        help="HTTP front ends to compare against (default: both)")
+    parser.add_argument("--port", type=int, default=5400)
+    args = parser.parse_args()
+
+    results = [run_in_process(args.commands)]
+    for offset, server in enumerate(args.server or ["flask", "aiohttp"]):
+        results.append(run_http(server, args.port + offset, args.commands))
+
+    print(f"{'backend':<16}{'commands/s':>12}{'p50 us':>10}{'p99 us':>10}{'errors':>8}")
+    for r in filter(None, results):
+        print(f"{r['backend']:<16}{r['rate']:>12.0f}{r['p50_us']:>10.0f}{r['p99_us']:>10.0f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Load-test the simulator's HTTP front ends.
+
+Starts a headless simulator for each server mode (Flask and aiohttp) in a
+subprocess, hammers it from concurrent keep-alive clients with a mix of
+GET /status and POST /command, and reports requests/sec and p50/p99 latency.
+
+    python loadtestsim.py --clients 16 --seconds 10
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from robotbench import percentile, wait_until_up
+
+
+def client_loop(url, deadline, command_every, latencies, errors):
+    session = requests.Session()
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        start = time.perf_counter()
+        try:
+            if command_every and n % command_every == 0:
+                response = session.post(url + "/command", json={"command": "forward", "duration": 0.01})
+            else:
+                response = session.get(url + "/status")
+            # 429 is valid backpressure, anything else non-2xx is an error
+            if response.status_code >= 400 and response.status_code != 429:
+                errors.append(response.status_code)
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run_mode(server, port, clients, seconds, command_every):
+    process = subprocess.Popen([sys.executable, "robotsim.py", "--headless", "--time-warp", "max",
+                                "--server", server, "--port", str(port)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://localhost:{port}"
+    try:
+        if not wait_until_up(url):
+            print(f"{server}: server did not start")
+            return None
+
+        latencies, errors = [], []
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=client_loop, args=(url, deadline, command_every, latencies, errors))
+                   for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return {
+            "server": server,
+            "requests": len(latencies),
+            "errors": len(errors),
+            "rps": len(latencies) / elapsed,
+            "p50_ms": 1000 * percentile(latencies, 0.50),
+            "p99_ms": 1000 * percentile(latencies, 0.99)
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client threads")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration per server mode")
+    parser.add_argument("--command-every", type=int, default=10,
+                        help="Every Nth request is a POST /command (0 = status only)")
+    parser.add_argument("--servers", nargs="+", default=["flask", "aiohttp"])
+    parser.add_argument("--port", type=int, default=5100)
+    args = parser.parse_args()
+
+    results = []
+    for offset, server in enumerate(args.servers):
+        result = run_mode(server, args.port + offset, args.clients, args.seconds, args.command_every)
+        if result:
+            results.append(result)
+
+    print(f"{'server':<10} {'requests':>10} {'errors':>8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for r in results:
+        print(f"{r['server']:<10} {r['requests']:>10} {r['errors']:>8} {r['rps']:>10.1f} "
+              f"{r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
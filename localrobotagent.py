@@ -5,6 +5,7 @@ from aea.skills.base import SkillContext
 from aea.skills.behaviours import TickerBehaviour
 from openai_request import run as openai_run
 from robot_control_mech import run as robot_run
+from robotplancompiler import PlanError, PlanStep, compile_plan, plan_prompt
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -20,7 +21,7 @@ class LocalCoordinatorBehaviour(TickerBehaviour):
     def __init__(self, **kwargs):
         super().__init__(tick_interval=10.0, **kwargs)  # Check every 10 seconds
         self.openai_tool = "openai-gpt-4o-2024-08-06"
-        self.robot_tool = "robot-control"
+        self.robot_tool = "robot-control-batch"
         self.api_keys = {"openai": os.getenv("OPENAI_API_KEY", "mock-openai-key")}
 
     def setup(self) -> None:
@@ -40,28 +41,31 @@ class LocalCoordinatorBehaviour(TickerBehaviour):
             logger.error("Failed to get response from OpenAI Mech")
             return
 
-        # Step 2: Parse OpenAI Mech response into individual commands
-        commands = self._parse_openai_response(openai_response)
-        if not commands:
+        # Step 2: Compile OpenAI Mech response into a validated plan
+        plan = self._compile_plan(openai_response)
+        if not plan:
             logger.error("No valid commands received from OpenAI Mech")
             return
 
-        # Step 3: Send each command to Robot Control Mech
-        for command in commands:
-            robot_response = self._send_robot_request(prompt=command)
+        # Step 3: Send the whole plan to Robot Control Mech in one request
+        plans = [plan]
+        for current_plan in plans:
+            prompt = plan_prompt(current_plan)
+            robot_response = self._send_robot_request(prompt=prompt)
             if robot_response is None:
-                logger.error(f"Failed to execute command: {command}")
+                logger.error(f"Failed to execute plan: {prompt}")
                 continue
             logger.info(f"Robot response: {robot_response}")
 
             # Step 4: Check for feedback (e.g., obstacles)
             if "error" in robot_response.lower() or "obstacle" in robot_response.lower():
                 logger.info("Issue detected; requesting new path")
-                new_path_prompt = f"Obstacle detected during '{command}' while navigating to the kitchen. Suggest a new sequence of commands."
+                new_path_prompt = f"Obstacle detected during '{', '.join(step.text for step in current_plan)}' while navigating to the kitchen. Suggest a new sequence of commands."
                 new_openai_response = self._send_openai_request(prompt=new_path_prompt)
                 if new_openai_response:
-                    new_commands = self._parse_openai_response(new_openai_response)
-                    commands.extend(new_commands)  # Add new commands to the queue
+                    new_plan = self._compile_plan(new_openai_response)
+                    if new_plan:
+                        plans.append(new_plan)  # Add the new plan to the queue
 
     def _send_openai_request(self, prompt: str) -> Optional[str]:
         """Send a request to the OpenAI Mech."""
@@ -83,7 +87,8 @@ class LocalCoordinatorBehaviour(TickerBehaviour):
     def _send_robot_request(self, prompt: str) -> Optional[str]:
         """Send a request to the Robot Control Mech."""
         try:
-            result = robot_run(prompt=prompt, tool=self.robot_tool)
+            # Wait until the robot has finished, so the feedback check sees collisions
+            result = robot_run(prompt=prompt, tool=self.robot_tool, wait=True)
             response = result[0] if isinstance(result, tuple) else result
             logger.info(f"Robot Control Mech response for prompt '{prompt}': {response}")
             return response
@@ -91,13 +96,12 @@ class LocalCoordinatorBehaviour(TickerBehaviour):
             logger.error(f"Error interacting with Robot Control Mech: {str(e)}")
             return None
 
-    def _parse_openai_response(self, response: str) -> List[str]:
-        """Parse the OpenAI Mech response into a list of robot commands."""
+    def _compile_plan(self, response: str) -> List[PlanStep]:
+        """Compile the OpenAI Mech response into validated robot commands, or [] if it is rejected."""
         try:
-            commands = [cmd.strip() for cmd in response.split(",") if cmd.strip()]
-            return commands
-        except Exception as e:
-            logger.error(f"Error parsing OpenAI response: {str(e)}")
+            return compile_plan(response)
+        except PlanError as e:
+            logger.error(f"Rejected plan from OpenAI Mech: {str(e)}")
             return []
 
     def teardown(self) -> None:
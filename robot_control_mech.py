@@ -18,23 +18,58 @@
 # ------------------------------------------------------------------------------
 """Robot control Mech tool for sending HTTP commands to a robot server."""
 
+import json
+import os
+import queue
 import re
+import threading
+import time
 import requests
-from typing import Any, Dict, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
 
 MechResponse = Tuple[str, Optional[str], Optional[Dict[str, Any]], Any, Any]
 
 # Configuration
 PREFIX = "robot-"
-ALLOWED_TOOLS = [f"{PREFIX}control"]
-ROBOT_SERVER_URL = "http://localhost:5000/command"
-VALID_COMMANDS = {"forward", "backward", "left", "right"}
+ALLOWED_TOOLS = [f"{PREFIX}control", f"{PREFIX}control-batch"]
+ROBOT_SERVER_URL = os.environ.get("ROBOT_SERVER_URL", "http://localhost:5000/command")
+# Keep-alive connections kept open per robot server (scheme, host and port)
+POOL_SIZE = int(os.environ.get("ROBOT_POOL_SIZE", "4"))
+# Wait for commands to finish unless a call says otherwise (wait=...); off by default
+WAIT = os.environ.get("ROBOT_WAIT", "").lower() in ("1", "true", "yes")
+# Longest a waiting call blocks for its commands to finish, in seconds
+WAIT_TIMEOUT = float(os.environ.get("ROBOT_WAIT_TIMEOUT", "60"))
+VALID_COMMANDS = {"forward", "backward", "left", "right", "velocity"}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_transport = None  # Installed with set_transport; None sends over HTTP to ROBOT_SERVER_URL
 
 def run(**kwargs) -> Tuple[Optional[str], Optional[Dict[str, Any]], Any, Any]:
-    """Run the robot control task by sending an HTTP command to the robot server."""
+    """Run the robot control task by sending an HTTP command to the robot server.
+
+    Commands go over the transport given as transport=..., else the one
+    installed with set_transport, else HTTP to robot_server_url or
+    ROBOT_SERVER_URL. InProcessTransport queues straight into a simulator
+    running in the same process.
+
+    The robot-control-batch tool takes a whole comma- or newline-separated
+    plan, validates every step before anything is sent and queues the plan
+    with a single request.
+
+    By default the call returns once the server has queued the command. With
+    wait=True it returns when the robot has finished it, as announced on the
+    server's event stream, with the final pose, the simulated seconds it ran
+    and any collision in the metadata (wait_timeout seconds at most).
+    """
     prompt = kwargs["prompt"]
     tool = kwargs["tool"]
     counter_callback = kwargs.get("counter_callback", None)
+    transport = kwargs.get("transport") or get_transport(kwargs.get("robot_server_url"))
+    wait = bool(kwargs.get("wait", WAIT))
+    wait_timeout = float(kwargs.get("wait_timeout", WAIT_TIMEOUT))
 
     # Validate tool
     if tool not in ALLOWED_TOOLS:
@@ -45,9 +80,12 @@ def run(**kwargs) -> Tuple[Optional[str], Optional[Dict[str, Any]], Any, Any]:
             None,
         )
 
+    if tool == f"{PREFIX}control-batch":
+        return run_batch(prompt, transport, wait, wait_timeout)
+
     # Parse prompt to extract command and duration
     try:
-        command, duration = parse_prompt(prompt)
+        command, duration, velocity = parse_prompt(prompt)
         if command not in VALID_COMMANDS:
             return (
                 f"Invalid command '{command}'. Supported commands: {', '.join(VALID_COMMANDS)}.",
@@ -64,46 +102,405 @@ def run(**kwargs) -> Tuple[Optional[str], Optional[Dict[str, Any]], Any, Any]:
         )
 
     # Send HTTP request to robot server
+    stream = None
     try:
-        response = send_robot_command(command, duration)
-        response_message = response.get("message", "No message returned")
+        if wait:
+            # Subscribe before sending, so the completion cannot be missed
+            stream = transport.subscribe(wait_timeout)
+        response = send_robot_command(command, duration, velocity, transport=transport)
+        if stream is None:
+            response_message = response.get("message", "No message returned")
+            return (
+                response_message,
+                prompt,
+                response,  # Include full JSON response as metadata
+                None,
+            )
+        record = stream.wait([response["id"]], wait_timeout)[response["id"]]
         return (
-            response_message,
+            describe_completion(record),
             prompt,
-            response,  # Include full JSON response as metadata
+            dict(response, **completion_result([record])),
             None,
         )
-    except requests.RequestException as e:
+    except TimeoutError as e:
+        return (
+            str(e),
+            prompt,
+            response,
+            None,
+        )
+    except (requests.RequestException, TransportError) as e:
         return (
             f"Error communicating with robot server: {str(e)}",
             prompt,
             None,
             None,
         )
+    finally:
+        if stream is not None:
+            stream.close()
+
+def run_batch(prompt: str, transport=None, wait: bool = False,
+              wait_timeout: float = WAIT_TIMEOUT) -> Tuple[Optional[str], Optional[Dict[str, Any]], Any, Any]:
+    """Queue a whole plan with one POST /commands; the metadata holds one result per step.
+
+    With wait=True the call returns once every step has finished.
+    """
+    transport = transport or get_transport()
+    try:
+        plan = parse_plan(prompt)
+    except ValueError as e:
+        return (
+            f"Error parsing plan: {str(e)}",
+            prompt,
+            None,
+            None,
+        )
+
+    stream = None
+    metadata = None
+    try:
+        if wait:
+            stream = transport.subscribe(wait_timeout)
+        response = send_robot_commands(plan, transport=transport)
+
+        # The server answers with one queued command per step, in plan order
+        steps = [dict(entry, step=index + 1, prompt=text)
+                 for index, ((text, _, _, _), entry) in enumerate(zip(plan, response.get("commands", [])))]
+        metadata = {"status": response.get("status"), "ids": [step["id"] for step in steps], "steps": steps}
+        if not steps:
+            return (
+                "Error parsing plan: Plan contains no commands",
+                prompt,
+                None,
+                None,
+            )
+        if stream is None:
+            return (
+                f"{len(steps)} commands queued (ids {', '.join(str(step['id']) for step in steps)})",
+                prompt,
+                metadata,
+                None,
+            )
+
+        records = stream.wait(metadata["ids"], wait_timeout)
+        steps = [dict(step, **records[step["id"]]) for step in steps]
+        problems = [f"step {step['step']}: {describe_completion(step)}" for step in steps
+                    if step["status"] != "done" or "collision" in step]
+        message = f"{len(steps)} commands finished"
+        if steps[-1].get("end_pose"):
+            message += f", {_describe_pose(steps[-1]['end_pose'])}"
+        if problems:
+            message += "; " + "; ".join(problems)
+        return (
+            message,
+            prompt,
+            dict(metadata, steps=steps, **completion_result(steps)),
+            None,
+        )
+    except TimeoutError as e:
+        return (
+            str(e),
+            prompt,
+            metadata,
+            None,
+        )
+    except (requests.RequestException, TransportError) as e:
+        return (
+            f"Error communicating with robot server: {str(e)}",
+            prompt,
+            None,
+            None,
+        )
+    finally:
+        if stream is not None:
+            stream.close()
+
+def parse_plan(prompt: str) -> List[Tuple[str, str, float, Optional[Tuple[float, float]]]]:
+    """Split a comma- or newline-separated plan into (text, command, duration, velocity) steps.
+
+    Every step is checked before any is returned; the first invalid one
+    raises ValueError naming its position.
+    """
+    plan = []
+    fragments = [fragment.strip() for fragment in re.split(r"[,;\n]", prompt) if fragment.strip()]
+    if not fragments:
+        raise ValueError("Plan contains no commands")
+    for index, text in enumerate(fragments, 1):
+        try:
+            command, duration, velocity = parse_prompt(text)
+        except ValueError as e:
+            raise ValueError(f"step {index} ('{text}'): {str(e)}")
+        if command not in VALID_COMMANDS:
+            raise ValueError(f"step {index} ('{text}'): invalid command '{command}'. "
+                             f"Supported commands: {', '.join(VALID_COMMANDS)}.")
+        plan.append((text, command, duration, velocity))
+    return plan
+
+def parse_prompt(prompt: str) -> Tuple[str, float, Optional[Tuple[float, float]]]:
+    """Parse the prompt to extract command, duration and, for velocity commands, (linear, angular)."""
+    # Velocity format: "velocity 40 -15 for 2 seconds" (px/s, deg/s, seconds)
+    velocity_pattern = r"^(?:set\s+)?velocity\s+(-?\d*\.?\d+)\s+(-?\d*\.?\d+)\s+(?:for\s+)?(\d*\.?\d*)\s*(?:seconds)?$"
+    match = re.match(velocity_pattern, prompt.lower().strip())
+    if match:
+        linear, angular, duration_str = match.groups()
+        return "velocity", _parse_duration(duration_str), (float(linear), float(angular))
 
-def parse_prompt(prompt: str) -> Tuple[str, float]:
-    """Parse the prompt to extract command and duration."""
     # Expected format: "move forward 2 seconds" or "turn left 1.5"
     pattern = r"^(?:move\s+)?(\w+)\s+(\d*\.?\d*)\s*(?:seconds)?$"
     match = re.match(pattern, prompt.lower().strip())
     if not match:
-        raise ValueError("Prompt must be in format '<command> <duration> [seconds]', e.g., 'move forward 2' or 'turn left 1.5'")
+        raise ValueError("Prompt must be in format '<command> <duration> [seconds]', e.g., 'move forward 2' or 'turn left 1.5', "
+                         "or 'velocity <linear> <angular> <duration>', e.g., 'velocity 40 -15 for 2 seconds'")
     
     command, duration_str = match.groups()
+    return command, _parse_duration(duration_str), None
+
+def _parse_duration(duration_str: str) -> float:
     try:
         duration = float(duration_str)
         if duration <= 0:
             raise ValueError("Duration must be positive")
-        return command, duration
+        return duration
     except ValueError as e:
         raise ValueError(f"Invalid duration: {str(e)}")
 
-def send_robot_command(command: str, duration: float) -> Dict[str, Any]:
-    """Send an HTTP POST request to the robot server."""
+def get_session(url: Optional[str] = None) -> requests.Session:
+    """The shared keep-alive session for the robot server at `url`, created on first use.
+
+    Sessions are kept per endpoint for the life of the process, so successive
+    `run` calls reuse open connections instead of connecting for every command.
+    Each keeps up to POOL_SIZE (ROBOT_POOL_SIZE) connections open.
+    """
+    parts = urlsplit(url or ROBOT_SERVER_URL)
+    endpoint = f"{parts.scheme}://{parts.netloc}"
+    session = _sessions.get(endpoint)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(endpoint)
+            if session is None:
+                session = requests.Session()
+                session.mount(endpoint, HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+                _sessions[endpoint] = session
+    return session
+
+def close_sessions() -> None:
+    """Close every pooled connection, e.g. before forking or at shutdown."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+class TransportError(Exception):
+    """Raised by a transport when the simulator rejects a command."""
+
+class HttpTransport:
+    """Commands as JSON over HTTP to a robot server, on the pooled keep-alive sessions (the default)."""
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url or ROBOT_SERVER_URL
+
+    def send(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = get_session(self.url).post(self.url, json=data, timeout=5)
+        response.raise_for_status()  # Raise exception for 4xx/5xx status codes
+        return response.json()
+
+    def send_many(self, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # /commands sits next to /command on the same server
+        url = urljoin(self.url, "commands")
+        response = get_session(url).post(url, json={"commands": commands}, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def subscribe(self, timeout: float = WAIT_TIMEOUT) -> "EventStream":
+        return open_event_stream(self.url, timeout)
+
+class InProcessTransport:
+    """Commands handed straight to a simulator in this process: no JSON, sockets or server threads.
+
+    `target` is a HeadlessRobotEngine, or anything with an `engine`
+    attribute such as the Tk simulator. Commands are validated and answered
+    by the same handlers as the HTTP routes, so replies and errors match.
+    """
+
+    def __init__(self, target):
+        from robotserver import handle_command, handle_commands
+        self.engine = getattr(target, "engine", target)
+        self._handle_command = handle_command
+        self._handle_commands = handle_commands
+
+    def _check(self, payload: Dict[str, Any], status: int) -> Dict[str, Any]:
+        if status != 200:
+            raise TransportError(f"{status}: {payload.get('error', 'rejected')}")
+        return payload
+
+    def send(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._check(*self._handle_command(self.engine, data))
+
+    def send_many(self, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return self._check(*self._handle_commands(self.engine, {"commands": commands}))
+
+    def subscribe(self, timeout: float = WAIT_TIMEOUT) -> "EngineSubscription":
+        return EngineSubscription(self.engine)
+
+def set_transport(transport) -> None:
+    """Send every command without an explicit transport or robot_server_url over `transport` (None: HTTP)."""
+    global _transport
+    _transport = transport
+
+def get_transport(url: Optional[str] = None):
+    """The installed transport, or HTTP to `url` when one is given or none is installed."""
+    if url is None and _transport is not None:
+        return _transport
+    return HttpTransport(url)
+
+def send_robot_command(command: str, duration: float, velocity: Optional[Tuple[float, float]] = None,
+                       url: Optional[str] = None, transport=None) -> Dict[str, Any]:
+    """Send a command to the robot server, by default an HTTP POST over its pooled session."""
     data = {
         "command": command,
         "duration": duration
     }
-    response = requests.post(ROBOT_SERVER_URL, json=data, timeout=5)
-    response.raise_for_status()  # Raise exception for 4xx/5xx status codes
-    return response.json()
\ No newline at end of file
+    if velocity is not None:
+        data["linear"], data["angular"] = velocity
+    return (transport or get_transport(url)).send(data)
+
+def send_robot_commands(plan: List[Tuple[str, str, float, Optional[Tuple[float, float]]]],
+                        url: Optional[str] = None, transport=None) -> Dict[str, Any]:
+    """Queue a parsed plan with one request, by default an HTTP POST to the robot server's /commands."""
+    commands = []
+    for _, command, duration, velocity in plan:
+        data = {"command": command, "duration": duration}
+        if velocity is not None:
+            data["linear"], data["angular"] = velocity
+        commands.append(data)
+    return (transport or get_transport(url)).send_many(commands)
+
+class EventStream:
+    """An open subscription to the robot server's /stream of command events."""
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        # One byte at a time: a bigger chunk size would wait for it to fill
+        self.lines = response.iter_lines(chunk_size=1, decode_unicode=True)
+
+    def wait(self, ids, timeout: float = WAIT_TIMEOUT) -> Dict[int, Dict[str, Any]]:
+        return wait_for_completion(self, ids, timeout)
+
+    def close(self) -> None:
+        self.response.close()
+
+class EngineSubscription:
+    """Completed-command events of an in-process engine, the counterpart of EventStream."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.completed: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        engine.add_listener(self._on_event)
+
+    def _on_event(self, event: str, data: Dict[str, Any]) -> None:
+        # Runs on the simulation thread
+        if event == "completed":
+            self.completed.put(data)
+
+    def wait(self, ids, timeout: float = WAIT_TIMEOUT) -> Dict[int, Dict[str, Any]]:
+        """Block until every command in `ids` has finished; raises TimeoutError after `timeout` seconds."""
+        pending = set(ids)
+        records: Dict[int, Dict[str, Any]] = {}
+        deadline = time.monotonic() + timeout
+        while pending:
+            try:
+                record = self.completed.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"Timed out after {timeout:g}s waiting for command(s) "
+                                   f"{', '.join(str(command_id) for command_id in sorted(pending))} to finish")
+            if record["id"] in pending:
+                pending.discard(record["id"])
+                records[record["id"]] = record
+        return records
+
+    def close(self) -> None:
+        self.engine.remove_listener(self._on_event)
+
+def open_event_stream(url: Optional[str] = None, timeout: float = WAIT_TIMEOUT,
+                      heartbeat: float = 15.0) -> EventStream:
+    """Subscribe to the robot server's /stream of command events, without pose samples.
+
+    Returns once the server has confirmed the subscription, so any command
+    sent afterwards has its completion delivered on this stream.
+    """
+    stream_url = urljoin(url or ROBOT_SERVER_URL, "stream?rate=0")
+    # Reads block until the next event or keep-alive comment; past `timeout`
+    # or a missed keep-alive the wait is over anyway
+    response = get_session(stream_url).get(stream_url, stream=True, timeout=(5, min(timeout, heartbeat + 5) + 0.25))
+    response.raise_for_status()
+    stream = EventStream(response)
+    next(stream.lines)  # ": connected"
+    return stream
+
+def wait_for_completion(stream: EventStream, ids, timeout: float = WAIT_TIMEOUT) -> Dict[int, Dict[str, Any]]:
+    """Read `completed` events off an open event stream until every command in `ids` has finished.
+
+    Returns the final command records by id. Raises TimeoutError after
+    `timeout` seconds, or requests.ConnectionError if the stream ends first.
+    """
+    pending = set(ids)
+    records: Dict[int, Dict[str, Any]] = {}
+    deadline = time.monotonic() + timeout
+    event = None
+    try:
+        for line in stream.lines:
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "completed":
+                record = json.loads(line[len("data: "):])
+                if record["id"] in pending:
+                    pending.discard(record["id"])
+                    records[record["id"]] = record
+                    if not pending:
+                        return records
+            if time.monotonic() > deadline:
+                break
+    except requests.exceptions.ConnectionError as e:
+        # Read timeouts on a stream surface as connection errors
+        if time.monotonic() <= deadline:
+            raise
+    if time.monotonic() <= deadline:
+        raise requests.ConnectionError("Event stream closed before the commands finished")
+    raise TimeoutError(f"Timed out after {timeout:g}s waiting for command(s) "
+                       f"{', '.join(str(command_id) for command_id in sorted(pending))} to finish")
+
+def completion_result(records) -> Dict[str, Any]:
+    """Final status, pose, simulated seconds run and collisions of finished command records."""
+    started = [record for record in records if record.get("sim_start") is not None]
+    result = {
+        "status": records[-1]["status"] if len(records) == 1 else
+                  ("done" if all(record["status"] == "done" for record in records) else "incomplete"),
+        "final_pose": next((record["end_pose"] for record in reversed(records) if record.get("end_pose")), None),
+        "actual_duration": (max(record["sim_end"] for record in started) -
+                            min(record["sim_start"] for record in started)) if started else 0.0,
+    }
+    collisions = [record["collision"] for record in records if record.get("collision")]
+    if len(records) == 1:
+        result["collision"] = collisions[0] if collisions else None
+    else:
+        result["collisions"] = collisions
+    return result
+
+def describe_completion(record: Dict[str, Any]) -> str:
+    """One line on how a finished command ended."""
+    ran = (record["sim_end"] - record["sim_start"]) if record.get("sim_start") is not None else 0.0
+    if record.get("collision"):
+        collision = record["collision"]
+        return (f"{record['command']} stopped by obstacle '{collision['obstacle']}' after {ran:.2f}s, "
+                f"{_describe_pose(record['end_pose'])}")
+    if record["status"] != "done":
+        return f"{record['command']} {record['status']}: {record.get('error') or 'not run'}"
+    text = f"{record['command']} done in {ran:.2f}s"
+    if record.get("end_pose"):
+        text += f", {_describe_pose(record['end_pose'])}"
+    return text
+
+def _describe_pose(pose: Dict[str, float]) -> str:
+    return f"at ({pose['x']:.1f}, {pose['y']:.1f}) facing {pose['angle']:.1f}°"
@@ -1,12 +1,13 @@
 import json
 import logging
 import os
-from typing import List, Optional, Tuple
+from typing import List, Optional
 from aea.skills.base import SkillContext
 from aea.skills.behaviours import TickerBehaviour
 from mech_client.interact import interact
 from web3 import Web3
 from dotenv import load_dotenv
+from robotplancompiler import PlanError, PlanStep, compile_plan, plan_prompt
 
 # Load environment variables
 load_dotenv()
@@ -32,7 +33,7 @@ class CoordinatorBehaviour(TickerBehaviour):
 
         # Robot Control Mech configuration (replace with actual values after deployment)
         self.robot_mech_address = "0xabcdef1234567890abcdef1234567890abcdef12"  # Placeholder
-        self.robot_tool = "robot-control"
+        self.robot_tool = "robot-control-batch"
 
     def setup(self) -> None:
         """Set up the behaviour."""
@@ -60,36 +61,39 @@ class CoordinatorBehaviour(TickerBehaviour):
             logger.error("Failed to get response from OpenAI Mech")
             return
 
-        # Step 2: Parse OpenAI Mech response into individual commands
-        commands = self._parse_openai_response(openai_response)
-        if not commands:
+        # Step 2: Compile OpenAI Mech response into a validated plan
+        plan = self._compile_plan(openai_response)
+        if not plan:
             logger.error("No valid commands received from OpenAI Mech")
             return
 
-        # Step 3: Send each command to Robot Control Mech
-        for command in commands:
+        # Step 3: Send the whole plan to Robot Control Mech in one request
+        plans = [plan]
+        for current_plan in plans:
+            prompt = plan_prompt(current_plan)
             robot_response = self._send_mech_request(
                 mech_address=self.robot_mech_address,
                 tool=self.robot_tool,
-                prompt=command
+                prompt=prompt
             )
             if robot_response is None:
-                logger.error(f"Failed to execute command: {command}")
+                logger.error(f"Failed to execute plan: {prompt}")
                 continue
             logger.info(f"Robot response: {robot_response}")
 
             # Step 4: Check for feedback (e.g., obstacles)
             if "error" in robot_response.lower() or "obstacle" in robot_response.lower():
                 logger.info("Issue detected; requesting new path")
-                new_path_prompt = f"Obstacle detected during '{command}' while navigating to the kitchen. Suggest a new sequence of commands."
+                new_path_prompt = f"Obstacle detected during '{', '.join(step.text for step in current_plan)}' while navigating to the kitchen. Suggest a new sequence of commands."
                 new_openai_response = self._send_mech_request(
                     mech_address=self.openai_mech_address,
                     tool=self.openai_tool,
                     prompt=new_path_prompt
                 )
                 if new_openai_response:
-                    new_commands = self._parse_openai_response(new_openai_response)
-                    commands.extend(new_commands)  # Add new commands to the queue
+                    new_plan = self._compile_plan(new_openai_response)
+                    if new_plan:
+                        plans.append(new_plan)  # Add the new plan to the queue
 
     def _send_mech_request(self, mech_address: str, tool: str, prompt: str) -> Optional[str]:
         """Send a request to a Mech and return the response."""
@@ -109,14 +113,13 @@ class CoordinatorBehaviour(TickerBehaviour):
             logger.error(f"Error interacting with Mech {mech_address}: {str(e)}")
             return None
 
-    def _parse_openai_response(self, response: str) -> List[str]:
-        """Parse the OpenAI Mech response into a list of robot commands."""
+    def _compile_plan(self, response: str) -> List[PlanStep]:
+        """Compile the OpenAI Mech response into validated robot commands, or [] if it is rejected."""
+        # Example response: "move forward 2 seconds, turn left 1.5 seconds, move forward 1 second"
         try:
-            # Example response: "move forward 2 seconds, turn left 1.5 seconds, move forward 1 second"
-            commands = [cmd.strip() for cmd in response.split(",") if cmd.strip()]
-            return commands
-        except Exception as e:
-            logger.error(f"Error parsing OpenAI response: {str(e)}")
+            return compile_plan(response)
+        except PlanError as e:
+            logger.error(f"Rejected plan from OpenAI Mech: {str(e)}")
             return []
 
     def teardown(self) -> None:
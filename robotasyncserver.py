@@ -0,0 +1,258 @@
+"""aiohttp front end for the robot simulator.
+
+Serves the same contract as robotserver.create_app (/command, /commands,
+/stop, /cancel, /health, /status, /sensors, /stream, /path, /map, /plan,
+/locations, /metrics) from an asyncio event loop, with HTTP keep-alive and
+concurrent request handling, instead of Flask's development server. Request
+validation is shared with the Flask routes.
+
+Requires aiohttp (pip install aiohttp).
+"""
+
+import asyncio
+import threading
+import time
+
+from aiohttp import web
+
+from robotserver import (format_sse, handle_add_location, handle_cancel, handle_command, handle_command_status,
+                         handle_commands, handle_health, handle_plan, handle_replace_commands, handle_sensors,
+                         handle_set_map, handle_status, handle_stop, http_metrics, parse_path_args,
+                         parse_stream_rate)
+from robotmetrics import CONTENT_TYPE
+from robottrajectory import encode_binary, encode_json
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def create_async_app(engine):
+    """Create the aiohttp app serving /command and /status for an engine."""
+    routes = web.RouteTableDef()
+    latency, responses = http_metrics(engine)
+    started = time.time()
+
+    @web.middleware
+    async def record_request(request, handler):
+        start = time.perf_counter()
+        code = 500
+        try:
+            response = await handler(request)
+            code = response.status
+            return response
+        except web.HTTPException as e:
+            code = e.status
+            raise
+        finally:
+            resource = request.match_info.route.resource
+            route = resource.canonical if resource is not None else "unmatched"
+            latency.labels(request.method, route).observe(time.perf_counter() - start)
+            responses.labels(request.method, route, str(code)).inc()
+
+    @routes.get('/health')
+    async def get_health(request):
+        payload, status = handle_health(engine, started)
+        return web.json_response(payload, status=status)
+
+    @routes.post('/command')
+    async def receive_command(request):
+        payload, status = handle_command(engine, await read_json(request))
+        return web.json_response(payload, status=status)
+
+    @routes.post('/commands')
+    async def receive_commands(request):
+        payload, status = handle_commands(engine, await read_json(request))
+        return web.json_response(payload, status=status)
+
+    @routes.put('/commands')
+    async def replace_commands(request):
+        payload, status = handle_replace_commands(engine, await read_json(request))
+        return web.json_response(payload, status=status)
+
+    @routes.post('/stop')
+    async def stop(request):
+        payload, status = handle_stop(engine)
+        return web.json_response(payload, status=status)
+
+    @routes.post('/cancel/{command_id:\\d+}')
+    async def cancel_command(request):
+        payload, status = handle_cancel(engine, int(request.match_info['command_id']))
+        return web.json_response(payload, status=status)
+
+    @routes.get('/commands/{command_id:\\d+}')
+    async def get_command(request):
+        payload, status = handle_command_status(engine, int(request.match_info['command_id']))
+        return web.json_response(payload, status=status)
+
+    @routes.get('/status')
+    async def get_status(request):
+        return web.json_response(handle_status(engine, request.query))
+
+    @routes.get('/sensors')
+    async def get_sensors(request):
+        # Scans run off the event loop so they never block other requests
+        payload, status = await asyncio.get_running_loop().run_in_executor(
+            None, handle_sensors, engine, request.query)
+        return web.json_response(payload, status=status)
+
+    @routes.get('/stream')
+    async def get_stream(request):
+        try:
+            rate = parse_stream_rate(request.query)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return await stream_engine(request, engine, rate)
+
+    @routes.get('/path')
+    async def get_path(request):
+        try:
+            since, limit, binary = parse_path_args(request.query)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        first_seq, next_cursor, records = engine.path.since(since, limit)
+        if binary:
+            return web.Response(body=encode_binary(first_seq, next_cursor, records),
+                                content_type='application/octet-stream')
+        return web.json_response(encode_json(first_seq, next_cursor, records))
+
+    @routes.get('/plan')
+    async def get_plan(request):
+        # Planning is CPU-bound, keep it off the event loop like /sensors
+        payload, status = await asyncio.get_running_loop().run_in_executor(
+            None, handle_plan, engine, request.query)
+        return web.json_response(payload, status=status)
+
+    @routes.post('/plan')
+    async def post_plan(request):
+        data = await read_json(request)
+        execute = bool(isinstance(data, dict) and data.get('execute'))
+        payload, status = await asyncio.get_running_loop().run_in_executor(
+            None, handle_plan, engine, data, execute)
+        return web.json_response(payload, status=status)
+
+    @routes.get('/locations')
+    async def get_locations(request):
+        return web.json_response(engine.world.locations)
+
+    @routes.post('/locations')
+    async def add_location(request):
+        payload, status = handle_add_location(engine, await read_json(request))
+        return web.json_response(payload, status=status)
+
+    @routes.get('/metrics')
+    async def get_metrics(request):
+        return web.Response(body=engine.metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    @routes.get('/map')
+    async def get_map(request):
+        if request.query.get('format') == 'npz':
+            return web.Response(body=engine.world.to_npz_bytes(), content_type='application/octet-stream')
+        return web.json_response(engine.world.to_dict())
+
+    @routes.post('/map')
+    async def set_map(request):
+        # Large maps take a moment to index, so build them off the event loop
+        loop = asyncio.get_running_loop()
+        if request.content_type == 'application/octet-stream':
+            body = await request.read()
+            payload, status = await loop.run_in_executor(None, lambda: handle_set_map(engine, npz=body))
+        else:
+            data = await read_json(request)
+            payload, status = await loop.run_in_executor(None, handle_set_map, engine, data)
+        return web.json_response(payload, status=status)
+
+    app = web.Application(client_max_size=64 * 1024 ** 2, middlewares=[record_request])
+    app.add_routes(routes)
+    return app
+
+
+async def stream_engine(request, engine, rate, heartbeat=15.0):
+    """Async counterpart of robotserver.stream_engine."""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def on_event(event, data):
+        # Engine events fire on the simulation thread
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    # Subscribe before the client sees the stream open, so a command it sends
+    # once connected cannot complete unseen
+    engine.add_listener(on_event)
+    try:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream",
+                                               "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        await response.write(b": connected\n\n")
+
+        interval = 1.0 / rate if rate > 0 else None
+        next_pose = time.monotonic()
+        last_sent = time.monotonic()
+        last_pose = None
+        while True:
+            now = time.monotonic()
+            timeout = heartbeat - (now - last_sent)
+            if interval is not None:
+                timeout = min(timeout, next_pose - now)
+            try:
+                event, data = await asyncio.wait_for(events.get(), max(0.0, timeout))
+                await response.write(format_sse(event, data).encode())
+                last_sent = time.monotonic()
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.monotonic()
+            if interval is not None and now >= next_pose:
+                next_pose = max(next_pose + interval, now)
+                status = engine.status()
+                pose = (status["position"]["x"], status["position"]["y"], status["angle"])
+                if pose != last_pose:
+                    last_pose = pose
+                    await response.write(format_sse("pose", {
+                        "x": pose[0], "y": pose[1], "angle": pose[2],
+                        "executing": status["executing"], "time": time.time()}).encode())
+                    last_sent = now
+            if now - last_sent >= heartbeat:
+                await response.write(b": keep-alive\n\n")
+                last_sent = now
+    except ConnectionResetError:
+        pass
+    finally:
+        engine.remove_listener(on_event)
+    return response
+
+
+def start_async_server(app, host='0.0.0.0', port=5000, ready=None):
+    """Run the aiohttp app on its own event loop in a daemon thread and return the thread.
+
+    Returns once the port is bound, setting `ready` (a threading.Event) if
+    it was; on failure the error is printed and `ready` stays clear.
+    """
+    started = threading.Event()
+
+    def run_server():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            runner = web.AppRunner(app, access_log=None)
+            loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, host, port, backlog=1024)
+            loop.run_until_complete(site.start())
+            if ready is not None:
+                ready.set()
+        except Exception as e:
+            print(f"Server error: {e}")
+            return
+        finally:
+            started.set()
+        loop.run_forever()
+
+    server_thread = threading.Thread(target=run_server, daemon=True)
+    server_thread.start()
+    started.wait()
+    return server_thread
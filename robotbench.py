@@ -0,0 +1,327 @@
+"""Parallel scenario benchmark for robot brains.
+
+Runs a suite of navigation scenarios in headless engines spread over a
+process pool. Each scenario has a world (seed or map file), a start pose, a
+goal and a command source, called a "brain". The report gives success rate,
+path length, collisions and wall time per brain. Runs are independent and
+CPU-bound, so throughput scales with the number of worker processes.
+
+    python robotbench.py --scenarios 200 --brain planner --brain greedy --workers 8
+    python robotbench.py --suite suite.json --brain mybrains:cautious --out report.json
+    python robotbench.py --scenarios 200 --scaling      # speedup at 1, 2, 4, ... workers
+
+A suite is JSON: {"scenarios": [{"name": ..., "seed": 7 or "map": "office.npz",
+"start": [x, y, angle], "goal": "kitchen" or [x, y], "tolerance": 15,
+"time_limit": 300, "commands": [...]}, ...]}; only the world is required.
+
+A brain is called as brain(engine, goal, scenario) with the robot idle and
+the goal as an (x, y) point. It returns the next (command, duration[,
+priority[, velocity]]) steps, and is called again once they have run. This
+repeats until the goal is reached, it returns no steps, or the time or round
+limit is hit. Use a built-in brain (planner, greedy, script) or any
+importable "module:function".
+
+wait_until_up and percentile are shared with the other benchmark scripts
+(benchmech.py, benchstartup.py, benchtransport.py, loadtestsim.py).
+"""
+
+import argparse
+import functools
+import importlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+from robotengine import HeadlessRobotEngine
+from robotplanner import NoPath
+from robotworld import World
+
+DEFAULTS = {"goal": "kitchen", "tolerance": 15.0, "time_limit": 300.0, "max_rounds": 20}
+
+
+def wait_until_up(url, timeout=15.0):
+    """True once the simulator at `url` answers GET /health, False after `timeout` seconds."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url + "/health", timeout=0.5).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def percentile(values, fraction):
+    """The `fraction` quantile (0.5 for the median) of `values`, NaN if there are none."""
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def planner_brain(engine, goal, scenario):
+    """Route with the engine's own occupancy-grid planner."""
+    try:
+        plan = engine.plan(goal)
+    except NoPath:
+        return []
+    return [(step["command"], step["duration"]) for step in plan["commands"]]
+
+
+def greedy_brain(engine, goal, scenario):
+    """Face the goal and drive straight at it; a baseline that ignores obstacles."""
+    dx, dy = goal[0] - engine.robot_x, goal[1] - engine.robot_y
+    diff = (math.degrees(math.atan2(-dy, dx)) - engine.robot_angle + 180) % 360 - 180
+    steps = []
+    turn = round(abs(diff) / engine.robot_turn_speed, 3)
+    if turn > 0:
+        steps.append(("left" if diff > 0 else "right", turn))
+    drive = round(math.hypot(dx, dy) / engine.robot_speed, 3)
+    if drive > 0:
+        steps.append(("forward", drive))
+    return steps
+
+
+def script_brain(engine, goal, scenario):
+    """Replay the scenario's fixed "commands" list once, e.g. a recorded LLM plan."""
+    if engine.commands:
+        return []
+    return [(step["command"], step["duration"], step.get("priority", 0),
+             (step["linear"], step.get("angular", 0.0)) if "linear" in step else None)
+            for step in scenario.get("commands", [])]
+
+
+BRAINS = {"planner": planner_brain, "greedy": greedy_brain, "script": script_brain}
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_brain(name):
+    if name in BRAINS:
+        return BRAINS[name]
+    module, _, function = name.partition(":")
+    if not function:
+        raise ValueError(f"Unknown brain '{name}'; use one of {sorted(BRAINS)} or module:function")
+    return getattr(importlib.import_module(module), function)
+
+
+@functools.lru_cache(maxsize=16)
+def load_map(path):
+    # Shared by every run in a worker process; brains must not modify it
+    return World.load(path)
+
+
+def load_world(scenario):
+    if "map" in scenario:
+        return load_map(scenario["map"])
+    return World.generate(int(scenario["seed"]))
+
+
+def resolve_goal(world, goal):
+    if isinstance(goal, str):
+        if goal not in world.locations:
+            raise KeyError(f"Unknown location '{goal}'")
+        return world.locations[goal]
+    return float(goal[0]), float(goal[1])
+
+
+def path_length(engine, cursor):
+    _, _, records = engine.path.since(cursor)
+    x, y = records["x"].astype(float), records["y"].astype(float)
+    return float(sum(math.hypot(x1 - x0, y1 - y0) for x0, y0, x1, y1 in zip(x, y, x[1:], y[1:])))
+
+
+def run_scenario(scenario, brain):
+    """Run one scenario with one brain in a fresh headless engine; returns a result row."""
+    scenario = dict(DEFAULTS, **scenario)
+    started, cpu_started = time.perf_counter(), time.process_time()
+    result = {"scenario": scenario.get("name"), "brain": brain, "success": False, "outcome": None,
+              "collisions": 0, "commands": 0, "rounds": 0, "distance_to_goal": None,
+              "straight_line": None, "path_length": None, "sim_time": None}
+    try:
+        world = load_world(scenario)
+        think = resolve_brain(brain)
+        goal = resolve_goal(world, scenario["goal"])
+    except (KeyError, ValueError, OSError, ImportError, AttributeError) as e:
+        return dict(result, outcome=f"error: {e}", wall_time=time.perf_counter() - started,
+                    cpu_time=time.process_time() - cpu_started)
+
+    engine = HeadlessRobotEngine(time_warp=None, world=world)
+    if scenario.get("start") is not None:
+        start = scenario["start"]
+        engine.robot_x, engine.robot_y = float(start[0]), float(start[1])
+        if len(start) > 2:
+            engine.robot_angle = float(start[2]) % 360
+    engine.path.append(engine.sim_time, engine.robot_x, engine.robot_y, engine.robot_angle, force=True)
+    cursor = engine.path.next_seq - 1
+    origin = (engine.robot_x, engine.robot_y)
+
+    def on_event(event, data):
+        if event == "completed" and "collision" in data:
+            result["collisions"] += 1
+    engine.add_listener(on_event)
+
+    time_limit = scenario["time_limit"]
+    while True:
+        if math.hypot(goal[0] - engine.robot_x, goal[1] - engine.robot_y) <= scenario["tolerance"]:
+            result["success"], result["outcome"] = True, "reached"
+            break
+        if result["rounds"] >= scenario["max_rounds"]:
+            result["outcome"] = "round limit"
+            break
+        if engine.sim_time >= time_limit:
+            result["outcome"] = "time limit"
+            break
+        try:
+            steps = think(engine, goal, scenario)
+            if not steps:
+                result["outcome"] = "no commands"
+                break
+            engine.submit_many(steps)
+        except Exception as e:
+            # A broken brain fails its own runs, not the whole benchmark
+            result["outcome"] = f"error: {type(e).__name__}: {e}"
+            break
+        result["rounds"] += 1
+        result["commands"] += len(steps)
+        pose = (engine.robot_x, engine.robot_y, engine.robot_angle)
+        engine.run_until_idle(max_time=time_limit - engine.sim_time)
+        if not engine.is_idle():
+            engine.stop()
+        if (engine.robot_x, engine.robot_y, engine.robot_angle) == pose:
+            result["outcome"] = "stuck"
+            break
+
+    result.update({
+        "distance_to_goal": math.hypot(goal[0] - engine.robot_x, goal[1] - engine.robot_y),
+        "straight_line": math.hypot(goal[0] - origin[0], goal[1] - origin[1]),
+        "path_length": path_length(engine, cursor),
+        "sim_time": engine.sim_time,
+        "wall_time": time.perf_counter() - started,
+        "cpu_time": time.process_time() - cpu_started
+    })
+    return result
+
+
+def _run_task(task):
+    return run_scenario(*task)
+
+
+def summarize(results):
+    """Aggregate result rows per brain."""
+    summary = {}
+    for brain in dict.fromkeys(row["brain"] for row in results):
+        rows = [row for row in results if row["brain"] == brain]
+        reached = [row for row in rows if row["success"]]
+
+        def mean(values):
+            values = list(values)
+            return sum(values) / len(values) if values else None
+
+        summary[brain] = {
+            "runs": len(rows),
+            "success_rate": len(reached) / len(rows),
+            "mean_path_length": mean(row["path_length"] for row in reached),
+            # Path driven over straight-line distance, for the runs that arrived
+            "mean_path_ratio": mean(row["path_length"] / row["straight_line"]
+                                    for row in reached if row["straight_line"] > 0),
+            "collisions": sum(row["collisions"] for row in rows),
+            "collisions_per_run": mean(row["collisions"] for row in rows),
+            "mean_sim_time": mean(row["sim_time"] for row in reached),
+            "mean_wall_time": mean(row["wall_time"] for row in rows),
+            "outcomes": {outcome: sum(row["outcome"] == outcome for row in rows)
+                         for outcome in dict.fromkeys(row["outcome"] for row in rows)}
+        }
+    return summary
+
+
+def run_suite(scenarios, brains, workers=None):
+    """Run every scenario with every brain across `workers` processes (default: all cores)."""
+    workers = workers or os.cpu_count() or 1
+    tasks = [(scenario, brain) for brain in brains for scenario in scenarios]
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_run_task(task) for task in tasks]
+    else:
+        # Several tasks per message keeps the pool's overhead off short runs
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_task, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "runs": len(results),
+        "wall_time": elapsed,
+        # CPU seconds spent in runs per elapsed second: ideally min(workers, cores)
+        "speedup": sum(row["cpu_time"] for row in results) / elapsed if elapsed > 0 else 0.0,
+        "brains": summarize(results),
+        "results": results
+    }
+
+
+def generate_suite(count, first_seed=0):
+    """One kitchen run from the default start on each of `count` generated worlds."""
+    return [{"name": f"seed-{seed}", "seed": seed, "goal": "kitchen"}
+            for seed in range(first_seed, first_seed + count)]
+
+
+def print_report(report):
+    print(f"{report['runs']} runs on {report['workers']} workers in {report['wall_time']:.2f}s "
+          f"(speedup {report['speedup']:.1f}x)")
+    print(f"{'brain':<24}{'success':>9}{'path px':>10}{'ratio':>7}{'coll/run':>10}{'sim s':>8}{'wall ms':>9}")
+
+    def fmt(value, width, spec):
+        return format(value, f">{width}{spec}") if value is not None else "-".rjust(width)
+
+    for brain, row in report["brains"].items():
+        print(f"{brain:<24}{row['success_rate']:>9.1%}{fmt(row['mean_path_length'], 10, '.1f')}"
+              f"{fmt(row['mean_path_ratio'], 7, '.2f')}{row['collisions_per_run']:>10.2f}"
+              f"{fmt(row['mean_sim_time'], 8, '.1f')}{row['mean_wall_time'] * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark robot brains on navigation scenarios")
+    parser.add_argument("--suite", default=None, metavar="FILE", help="Scenario suite (JSON)")
+    parser.add_argument("--scenarios", type=int, default=100,
+                        help="Without --suite, generate this many seeded kitchen runs")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--brain", action="append", default=None,
+                        help="Brain to evaluate (repeatable): planner, greedy, script or module:function")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--scaling", action="store_true",
+                        help="Run the suite at 1, 2, 4, ... workers and report the speedup")
+    parser.add_argument("--out", default=None, metavar="FILE", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    if args.suite:
+        with open(args.suite) as f:
+            scenarios = json.load(f)["scenarios"]
+    else:
+        scenarios = generate_suite(args.scenarios, args.first_seed)
+    brains = args.brain or ["planner", "greedy"]
+
+    if args.scaling:
+        most = args.workers or os.cpu_count() or 1
+        counts = sorted({1, most} | {2 ** i for i in range(most.bit_length()) if 2 ** i <= most})
+        baseline = None
+        for workers in counts:
+            report = run_suite(scenarios, brains, workers)
+            baseline = baseline or report["wall_time"]
+            print(f"{workers:>3} workers: {report['wall_time']:7.2f}s  "
+                  f"{report['runs'] / report['wall_time']:8.1f} runs/s  x{baseline / report['wall_time']:.2f}")
+        return
+
+    report = run_suite(scenarios, brains, args.workers)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,864 @@
+"""Headless kinematics engine for the robot simulator.
+
+The engine owns the robot pose, the command queue and the world state and
+advances on a simulated clock instead of Tk callbacks and wall-clock time.
+It can run in real time, with a time-warp factor, or as fast as possible,
+and always lands on exactly the same end poses as the Tk simulator, which
+is now just an optional viewer attached to it.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from robotmetrics import MetricsRegistry
+from robotplanner import PathPlanner, plan_commands
+from robotqueue import CommandQueue
+from robotsensors import RangeSensor
+from robottrajectory import TrajectoryStore
+from robotworld import World
+
+VALID_COMMANDS = {"forward", "backward", "left", "right", "velocity"}
+MOVES = {"forward": 1, "backward": -1}
+TURNS = {"left": 1, "right": -1}
+
+# Velocity arcs are driven along chords between exact points of the arc,
+# straying at most this many pixels from it, so that collisions are swept
+# on straight segments like any move and do not depend on the step size
+ARC_TOLERANCE = 0.05
+
+
+def normalize_turn(command, duration, full_turn):
+    """The equivalent turn of at most half a revolution; full_turn is its duration."""
+    signed = (TURNS[command] * duration) % full_turn
+    if signed > full_turn / 2:
+        signed -= full_turn
+    return ("left", signed) if signed >= 0 else ("right", -signed)
+
+
+def combine_commands(first, second, full_turn):
+    """One (command, duration) ending in the same pose as first then second, or None.
+
+    Moves in the same direction add up and turns add as signed angles.
+    Opposite moves are never combined, since a collision on the way out
+    would not be undone on the way back. Callers must also check that a
+    combined move needs no clamping at the map edge, which would bend its
+    path (see HeadlessRobotEngine._move_fits).
+    """
+    if first[1] == 0:
+        return second
+    if second[1] == 0:
+        return first
+    if first[0] in MOVES and first[0] == second[0]:
+        return first[0], first[1] + second[1]
+    if first[0] in TURNS and second[0] in TURNS:
+        return normalize_turn("left", TURNS[first[0]] * first[1] + TURNS[second[0]] * second[1], full_turn)
+    return None
+
+
+class HeadlessRobotEngine:
+    def __init__(self, robot_x=250, robot_y=250, robot_angle=0, time_warp=1.0, path=None,
+                 queue_size=1000, history_size=10000, world=None, physics_hz=200, compact=False):
+        # Robot properties
+        self.robot_x = robot_x  # Starting X position
+        self.robot_y = robot_y  # Starting Y position
+        self.robot_angle = robot_angle  # 0 degrees = facing right/east
+        self.robot_size = 20  # Size of the robot
+        self.robot_speed = 50  # Pixels per second
+        self.robot_turn_speed = 90  # Degrees per second
+
+        # Map properties
+        self.map_width = 600
+        self.map_height = 500
+        self.grid_size = 50
+
+        # Obstacle geometry, hashed into grid_size cells; the map size follows the world
+        self.world = world if world is not None else World(self.map_width, self.map_height, self.grid_size)
+        self.map_width = self.world.map_width
+        self.map_height = self.world.map_height
+        if self.world.start is not None:
+            self.robot_x, self.robot_y = self.world.start[0], self.world.start[1]
+            if len(self.world.start) > 2:
+                self.robot_angle = self.world.start[2] % 360
+
+        # Command queue and timing
+        self.command_queue = CommandQueue(maxsize=queue_size)
+        self.executing_command = False
+        self.current_command = None  # QueuedCommand being executed
+        self.command_start_time = 0  # Simulated time the command started
+        self.command_duration = 0  # Current command duration
+
+        # Simulated clock; time_warp=None steps as fast as possible
+        self.sim_time = 0.0
+        self.time_warp = time_warp
+        self._wall_time = None
+
+        # Real-time runs integrate in fixed physics_dt steps; wall time that
+        # does not fill a whole step waits in the accumulator
+        self.physics_dt = 1.0 / physics_hz
+        self.max_catchup_steps = max(1, int(physics_hz))  # Fall behind rather than spiral after a stall
+        self._accumulator = 0.0
+        self._previous_pose = (self.robot_x, self.robot_y, self.robot_angle)
+        self._motion = None  # Interpolation state of the running command
+
+        # Default range sensor for /sensors and /status?sensors=1
+        self.sensor = RangeSensor()
+
+        # Occupancy-grid route planner for /plan
+        self.planner = PathPlanner()
+
+        # Bounded, decimated record of where the robot has been
+        self.path = path if path is not None else TrajectoryStore()
+        self.path.append(self.sim_time, self.robot_x, self.robot_y, self.robot_angle, force=True)
+
+        # Recent commands by id, for completion tracking
+        self.commands = OrderedDict()
+        self.history_size = history_size
+
+        self._listeners = []
+        self.lock = threading.RLock()
+
+        # Served at /metrics; viewers and servers register their own series here too
+        self.metrics = MetricsRegistry()
+        self._received_total = self.metrics.counter(
+            "robot_commands_received_total", "Commands accepted into the queue")
+        self._completed_total = self.metrics.counter(
+            "robot_commands_completed_total", "Commands finished, by outcome", labels=("status",))
+        self._queue_wait = self.metrics.histogram(
+            "robot_queue_wait_seconds", "Wall-clock time commands spent queued")
+        self._start_lateness = self.metrics.histogram(
+            "robot_command_start_lateness_seconds",
+            "Delay from when a command could have started (received, or the previous command finished) "
+            "to when it did")
+        self._tick_time = self.metrics.histogram(
+            "robot_physics_tick_seconds", "Wall-clock cost of one real-time engine tick")
+        self.metrics.gauge("robot_queue_depth", "Commands waiting in the queue",
+                           function=lambda: len(self.command_queue))
+        self.metrics.gauge("robot_sim_time_seconds", "Simulated clock", function=lambda: self.sim_time)
+        self._last_finished = None  # perf_counter of the last completion, for start lateness
+
+        # Optional robotrecorder.FlightRecorder, fed every pose the engine steps to
+        self.recorder = None
+
+        # Queue compaction: fold redundant queued commands into one at dispatch
+        self.compact = compact
+        self.compaction = {"merged": 0, "dropped": 0, "sim_time_saved": 0.0}
+        self._merged_total = self.metrics.counter(
+            "robot_compaction_commands_total", "Commands folded into another or dropped as no-ops")
+        self._saved_total = self.metrics.counter(
+            "robot_compaction_saved_seconds_total", "Simulated seconds removed from the queue by compaction")
+
+    def add_listener(self, callback):
+        """Register callback(event, data) for received/started/completed/world events."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event, data):
+        for callback in list(self._listeners):
+            callback(event, data)
+
+    def submit(self, command, duration, priority=0, velocity=None):
+        """Add a command to the queue. Safe to call from any thread.
+
+        Higher priorities run first. A "velocity" command drives at
+        velocity=(linear px/s, angular deg/s) for duration seconds. An unknown
+        command, a duration that is not a positive number of seconds, or bad
+        or out-of-range rates raise ValueError. Raises robotqueue.QueueFull
+        when the queue is at capacity. Returns the command's tracking record.
+        """
+        command, duration, priority, velocity = self._check_step(command, duration, priority, velocity)
+        entry = self.command_queue.push(command, duration, priority, velocity)
+        self._received([entry])
+        return entry.to_dict()
+
+    def submit_many(self, commands):
+        """Queue a whole plan of (command, duration[, priority[, velocity]]) steps at once.
+
+        Every step is validated before anything is queued; a ValueError names
+        the first bad step. A run of "velocity" steps is a timed list of
+        velocity segments. Returns the tracking records in plan order.
+        """
+        entries = self.command_queue.push_many(self._validate_steps(commands))
+        self._received(entries)
+        return [entry.to_dict() for entry in entries]
+
+    def replace_queue(self, commands, interrupt=False):
+        """Atomically swap every queued command for a new plan. Safe to call from any thread.
+
+        Steps are validated as in submit_many and nothing changes if one is
+        bad or the plan does not fit. The replaced commands end as
+        cancelled. With interrupt the running command is cut short too, so
+        the new plan starts from where the robot is now. Returns the new
+        tracking records, the replaced ids and the interrupted command's
+        record (or None).
+        """
+        steps = self._validate_steps(commands)
+        with self.lock:
+            entries, replaced = self.command_queue.replace(steps)
+            interrupted = None
+            if interrupt and self.current_command is not None:
+                interrupted = self._end_current("cancelled", "Replaced")
+            self._end(replaced, "cancelled", "Replaced", 0.0)
+            self._received(entries)
+            return {"commands": [entry.to_dict() for entry in entries],
+                    "replaced": [entry.id for entry in replaced],
+                    "interrupted": interrupted}
+
+    def cancel(self, command_id):
+        """Cancel a queued or running command. Safe to call from any thread.
+
+        A queued command is dropped. A running one stops where the robot is
+        now, which is at most one physics step behind the call, and its
+        record reports the seconds actually `executed`. Cancelling any part
+        of a compacted command cancels all of it. Returns the command's
+        record (unchanged if it had already finished), or None if the id is
+        unknown or expired.
+        """
+        with self.lock:
+            entry = self.commands.get(command_id)
+            if entry is None:
+                return None
+            head = self.commands.get(entry.merged_into, entry)
+            if head is self.current_command:
+                self._end_current("cancelled", "Cancelled")
+            elif head.status == "queued" and self.command_queue.remove(head.id) is not None:
+                self._end([head], "cancelled", "Cancelled", 0.0)
+            return entry.to_dict()
+
+    def stop(self):
+        """Halt immediately: cut the running command short and drop everything queued.
+
+        Returns where the robot stopped, the truncated command's record (or
+        None if it was idle) and the ids of the dropped commands.
+        """
+        with self.lock:
+            dropped = self.command_queue.drain()
+            stopped = None
+            if self.current_command is not None:
+                stopped = self._end_current("cancelled", "Stopped")
+            self._end(dropped, "cancelled", "Stopped", 0.0)
+            return {"position": {"x": self.robot_x, "y": self.robot_y}, "angle": self.robot_angle,
+                    "sim_time": self.sim_time, "stopped": stopped,
+                    "dropped": [entry.id for entry in dropped]}
+
+    def _check_step(self, command, duration, priority=0, velocity=None):
+        """A command as a normalized (command, duration, priority, velocity) step. Raises ValueError."""
+        if not isinstance(command, str):
+            raise ValueError(f"Command must be a string, not {type(command).__name__}")
+        try:
+            duration, priority = float(duration), int(priority)
+        except (TypeError, ValueError):
+            raise ValueError("Duration must be a number of seconds and priority an integer") from None
+        command = command.lower()
+        if command not in VALID_COMMANDS:
+            raise ValueError(f"Unknown command '{command}'")
+        # Written so that NaN fails too
+        if not (0 < duration < math.inf):
+            raise ValueError("Duration must be a positive number of seconds")
+        return command, duration, priority, self._check_velocity(command, velocity)
+
+    def _validate_steps(self, commands):
+        steps = []
+        for index, step in enumerate(commands):
+            try:
+                steps.append(self._check_step(*step))
+            except TypeError:
+                raise ValueError(f"Step {index}: expected (command, duration[, priority[, velocity]])") from None
+            except ValueError as e:
+                raise ValueError(f"Step {index}: {e}")
+        return steps
+
+    def _received(self, entries):
+        self._received_total.inc(len(entries))
+        self._track(entries)
+        for entry in entries:
+            self._emit("received", entry.to_dict())
+
+    def _check_velocity(self, command, velocity):
+        """The (linear, angular) rates of a velocity command as floats, else None. Raises ValueError."""
+        if command != "velocity":
+            return None
+        if velocity is None:
+            raise ValueError("A velocity command needs linear (px/s) and angular (deg/s) rates")
+        try:
+            linear, angular = (float(rate) for rate in velocity)
+        except (TypeError, ValueError):
+            raise ValueError("Velocity must be a (linear, angular) pair of numbers") from None
+        # Written so that NaN fails too
+        if not (abs(linear) <= self.robot_speed and abs(angular) <= self.robot_turn_speed):
+            raise ValueError(f"Velocity must be within ±{self.robot_speed} px/s and "
+                             f"±{self.robot_turn_speed} deg/s")
+        return linear, angular
+
+    def _track(self, entries):
+        with self.lock:
+            for entry in entries:
+                self.commands[entry.id] = entry
+            while len(self.commands) > self.history_size:
+                self.commands.popitem(last=False)
+
+    def command_status(self, command_id):
+        """Tracking record for a command id, or None if unknown or expired."""
+        with self.lock:
+            entry = self.commands.get(command_id)
+            return entry.to_dict() if entry is not None else None
+
+    def set_world(self, world):
+        """Hot-swap the world map. Safe to call from any thread.
+
+        If the map has a start pose the robot is placed there, and a command
+        still running is ended as failed since its target no longer applies.
+        Queued commands are kept. Emits a "world" event.
+        """
+        with self.lock:
+            self.world = world
+            self.map_width = world.map_width
+            self.map_height = world.map_height
+            if world.start is not None:
+                if self.current_command is not None:
+                    self._end_current("failed", "World replaced")
+                self.robot_x, self.robot_y = world.start[0], world.start[1]
+                if len(world.start) > 2:
+                    self.robot_angle = world.start[2] % 360
+                self.path.append(self.sim_time, self.robot_x, self.robot_y, self.robot_angle, force=True)
+            self._emit("world", {"seed": world.seed, "map_width": world.map_width,
+                                 "map_height": world.map_height, "obstacles": len(world)})
+
+    def is_idle(self):
+        return not self.executing_command and not self.command_queue
+
+    def status(self):
+        with self.lock:
+            status = {
+                "position": {"x": self.robot_x, "y": self.robot_y},
+                "angle": self.robot_angle,
+                "queue_size": len(self.command_queue),
+                "executing": self.executing_command,
+                "queue_wait": self.command_queue.wait_stats()
+            }
+            if self.compact:
+                saved = self.compaction["sim_time_saved"]
+                status["compaction"] = dict(self.compaction, wall_time_saved=saved / self.time_warp
+                                            if self.time_warp else 0.0)
+            return status
+
+    def scan(self, sensor=None):
+        """Range scan from the current pose; only the pose snapshot holds the lock."""
+        sensor = sensor if sensor is not None else self.sensor
+        with self.lock:
+            x, y, heading = self.robot_x, self.robot_y, self.robot_angle
+        offsets, ranges = sensor.scan(self.world, x, y, heading)
+        return {
+            "pose": {"x": x, "y": y, "angle": heading},
+            "max_range": sensor.max_range,
+            "angles": offsets.tolist(),
+            "ranges": ranges.tolist()
+        }
+
+    def plan(self, goal, allow_backward=True):
+        """Commands that drive the robot from its current pose to `goal`.
+
+        `goal` is a named location of the world or an (x, y) point. Raises
+        ValueError for any other goal, KeyError for an unknown name and
+        robotplanner.NoPath if the goal is blocked or unreachable. Like scan(),
+        only the pose snapshot holds the lock; plan from an idle robot, or the
+        queue will have moved it.
+        """
+        with self.lock:
+            x, y, angle, world = self.robot_x, self.robot_y, self.robot_angle, self.world
+        if isinstance(goal, str):
+            if goal not in world.locations:
+                raise KeyError(goal)
+            goal = world.locations[goal]
+        elif (isinstance(goal, (list, tuple)) and len(goal) == 2
+              and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in goal)):
+            goal = (float(goal[0]), float(goal[1]))
+        else:
+            raise ValueError("Goal must be a location name or an [x, y] point")
+        if not all(math.isfinite(v) for v in goal):
+            raise ValueError("Goal coordinates must be finite")
+        waypoints = self.planner.route(world, (x, y), goal, self.robot_size)
+        commands = plan_commands(waypoints, x, y, angle, self.robot_speed, self.robot_turn_speed,
+                                 allow_backward=allow_backward)
+        return {
+            "start": {"x": x, "y": y, "angle": angle},
+            "goal": {"x": goal[0], "y": goal[1]},
+            "waypoints": [list(point) for point in waypoints],
+            "commands": commands,
+            "duration": round(sum(step["duration"] for step in commands), 3)
+        }
+
+    def process_commands(self):
+        """Start the next queued command if idle. Returns True if one is running."""
+        while not self.executing_command:
+            entry = self.command_queue.pop()
+            if entry is None:
+                break
+            self._queue_wait.observe(entry.wait_time)
+            ready = entry.enqueued_at
+            if self._last_finished is not None and self._last_finished > ready:
+                ready = self._last_finished
+            self._start_lateness.observe(time.perf_counter() - ready)
+            if self.compact and self._compact(entry) == 0:
+                self._skip_noop(entry)
+                continue
+            self.execute_command(entry)
+        return self.executing_command
+
+    def _compactable(self, entry):
+        if (entry.command not in MOVES and entry.command not in TURNS) or entry.duration < 0:
+            return None
+        if entry.command in TURNS:
+            return normalize_turn(entry.command, entry.duration, 360.0 / self.robot_turn_speed)
+        return entry.command, entry.duration
+
+    def _compact(self, entry):
+        """Fold the commands queued right behind entry into it.
+
+        Returns the duration left to run, or None if entry cannot be compacted.
+
+        Only what is already queued is folded; a command that arrives while
+        the merged one runs waits for all of it, whatever its priority.
+        """
+        run = self._compactable(entry)
+        if run is None:
+            return None
+        full_turn = 360.0 / self.robot_turn_speed
+        absorbed = []
+        while True:
+            combined = []
+
+            def mergeable(following):
+                other = self._compactable(following)
+                merged = combine_commands(run, other, full_turn) if other is not None else None
+                if (merged is not None and merged[0] in MOVES and run[1] > 0 and other[1] > 0
+                        and not self._move_fits(merged)):
+                    merged = None
+                combined.append(merged)
+                return merged is not None
+
+            following = self.command_queue.pop_if(mergeable)
+            if following is None:
+                break
+            following.merged_into = entry.id
+            absorbed.append(following)
+            run = combined[-1]
+
+        if absorbed:
+            entry.merged = absorbed
+        if run != (entry.command, entry.duration):
+            entry.executed_as = run
+            saved = entry.duration + sum(following.duration for following in absorbed) - run[1]
+            self.compaction["merged"] += len(absorbed)
+            self.compaction["sim_time_saved"] += saved
+            self._merged_total.inc(len(absorbed))
+            self._saved_total.inc(saved)
+        return run[1]
+
+    def _move_fits(self, move):
+        """True if a move from the current pose ends inside the map without being clamped.
+
+        A clamped target changes the direction of travel, so the merged move
+        would no longer follow the path (and collisions) of its parts.
+        """
+        command, duration = move
+        distance = self.robot_speed * duration * MOVES[command]
+        angle_rad = math.radians(self.robot_angle)
+        target_x = self.robot_x + math.cos(angle_rad) * distance
+        target_y = self.robot_y - math.sin(angle_rad) * distance
+        size = self.robot_size
+        return size <= target_x <= self.map_width - size and size <= target_y <= self.map_height - size
+
+    def _end_current(self, status, error):
+        """End the running command, and any merged into it, where the robot is now.
+
+        Returns the command's record.
+        """
+        entry = self.current_command
+        executed = self._motion["elapsed"]
+        self._motion = None
+        self.current_command = None
+        self.executing_command = False
+        self._last_finished = time.perf_counter()
+        self.path.append(self.sim_time, self.robot_x, self.robot_y, self.robot_angle, force=True)
+        self._end([entry] + (entry.merged or []), status, error, executed)
+        return entry.to_dict()
+
+    def _end(self, entries, status, error, executed):
+        now = time.time()
+        for entry in entries:
+            entry.status = status
+            entry.error = error
+            entry.executed = executed
+            entry.finished_at = now
+            entry.sim_end = self.sim_time
+            if entry.started_at is not None:
+                entry.end_pose = (self.robot_x, self.robot_y, self.robot_angle)
+            self._completed_total.labels(status).inc()
+            self._emit("completed", entry.to_dict())
+
+    def _skip_noop(self, entry):
+        """Complete a command that compacted away to nothing, without running it."""
+        self.compaction["dropped"] += 1
+        self._merged_total.inc()
+        now = time.time()
+        for done in [entry] + (entry.merged or []):
+            done.status = "done"
+            done.started_at = done.finished_at = now
+            done.sim_start = done.sim_end = self.sim_time
+            done.end_pose = (self.robot_x, self.robot_y, self.robot_angle)
+            self._completed_total.labels("done").inc()
+            self._emit("completed", done.to_dict())
+
+    def execute_command(self, entry):
+        command, duration = entry.executed_as or (entry.command, entry.duration)
+
+        # Store command start time and duration
+        self.command_start_time = self.sim_time
+        self.command_duration = duration
+        entry.started_at = time.time()
+        entry.sim_start = self.sim_time
+
+        # submit() rejects unknown commands; this only guards entries pushed onto the queue directly
+        if command not in VALID_COMMANDS:
+            entry.status = "failed"
+            entry.error = "Unknown command"
+            entry.finished_at = entry.started_at
+            entry.sim_end = entry.sim_start
+            entry.end_pose = (self.robot_x, self.robot_y, self.robot_angle)
+            self._completed_total.labels("failed").inc()
+            self._emit("completed", entry.to_dict())
+            return
+
+        self.executing_command = True
+        self.current_command = entry
+        entry.status = "running"
+        self._emit("started", entry.to_dict())
+        for merged in entry.merged or ():
+            merged.status = "running"
+            merged.started_at = entry.started_at
+            merged.sim_start = entry.sim_start
+            self._emit("started", merged.to_dict())
+
+        if command == "forward":
+            self.execute_movement(duration, 1)
+        elif command == "backward":
+            self.execute_movement(duration, -1)
+        elif command == "left":
+            self.execute_turn(duration, 1)
+        elif command == "right":
+            self.execute_turn(duration, -1)
+        elif command == "velocity":
+            self.execute_velocity(duration, *entry.velocity)
+
+    def execute_movement(self, duration, direction):
+        # Calculate total distance to move
+        total_distance = self.robot_speed * duration
+        angle_rad = math.radians(self.robot_angle)
+
+        # Calculate target position
+        target_x = self.robot_x + math.cos(angle_rad) * total_distance * direction
+        target_y = self.robot_y - math.sin(angle_rad) * total_distance * direction
+
+        # Keep target within bounds
+        target_x = max(self.robot_size, min(self.map_width - self.robot_size, target_x))
+        target_y = max(self.robot_size, min(self.map_height - self.robot_size, target_y))
+
+        self._motion = {
+            "kind": "move", "elapsed": 0.0, "duration": duration,
+            "start_x": self.robot_x, "start_y": self.robot_y,
+            "target_x": target_x, "target_y": target_y
+        }
+
+    def execute_turn(self, duration, direction):
+        # Calculate total angle change
+        total_angle_change = self.robot_turn_speed * duration * direction
+        target_angle = (self.robot_angle + total_angle_change) % 360
+
+        # Interpolate along the shortest arc, as the Tk animation always has
+        angle_diff = (target_angle - self.robot_angle) % 360
+        if angle_diff > 180:
+            angle_diff -= 360
+
+        self._motion = {
+            "kind": "turn", "elapsed": 0.0, "duration": duration,
+            "start_angle": self.robot_angle, "angle_diff": angle_diff,
+            "target_angle": target_angle
+        }
+
+    def execute_velocity(self, duration, linear, angular):
+        """Drive at linear px/s while turning at angular deg/s: an arc, or a line when angular is 0."""
+        motion = {
+            "kind": "arc", "elapsed": 0.0, "duration": duration,
+            "start_x": self.robot_x, "start_y": self.robot_y, "start_angle": self.robot_angle,
+            "linear": linear, "angular": angular, "chord_time": duration
+        }
+        rate = abs(math.radians(angular))
+        if rate and linear:
+            # Longest chord whose sagitta stays within ARC_TOLERANCE
+            radius = abs(linear) / rate
+            motion["chord_time"] = 2 * math.acos(max(-1.0, 1 - ARC_TOLERANCE / radius)) / rate
+        motion["target_x"], motion["target_y"] = self._arc_point(motion, duration)
+        motion["target_angle"] = (self.robot_angle + angular * duration) % 360
+        self._next_chord(motion, 0.0, self.robot_x, self.robot_y)
+        self._motion = motion
+
+    def _next_chord(self, motion, t0, x0, y0):
+        t1 = t0 + motion["chord_time"]
+        if t1 >= motion["duration"] - 1e-9:
+            t1, x1, y1 = motion["duration"], motion["target_x"], motion["target_y"]
+        else:
+            x1, y1 = self._arc_point(motion, t1)
+        motion["chord"] = (t0, x0, y0, t1, x1, y1)
+
+    def _arc_point(self, motion, t):
+        """Position t seconds into a velocity arc, kept off the map border like a clamped move."""
+        # Closed form of the unicycle model: the chord to the point has length
+        # linear * t * sinc(half the heading change) and points along the mean heading
+        half = math.radians(motion["angular"]) * t / 2
+        heading = math.radians(motion["start_angle"]) + half
+        chord = motion["linear"] * t * (math.sin(half) / half if half else 1.0)
+        x = motion["start_x"] + math.cos(heading) * chord
+        y = motion["start_y"] - math.sin(heading) * chord
+        size = self.robot_size
+        return (max(size, min(self.map_width - size, x)),
+                max(size, min(self.map_height - size, y)))
+
+    def _apply_progress(self, progress):
+        motion = self._motion
+        if motion["kind"] == "move":
+            self.robot_x = motion["start_x"] + (motion["target_x"] - motion["start_x"]) * progress
+            self.robot_y = motion["start_y"] + (motion["target_y"] - motion["start_y"]) * progress
+        elif motion["kind"] == "arc":
+            self.robot_x, self.robot_y = self._motion_point(progress)
+            self.robot_angle = self._arc_angle(motion, motion["elapsed"])
+        else:
+            self.robot_angle = (motion["start_angle"] + motion["angle_diff"] * progress) % 360
+
+    def _arc_angle(self, motion, t):
+        return (motion["start_angle"] + motion["angular"] * t) % 360
+
+    def _motion_point(self, progress):
+        """Position of the running movement at `progress`, exact at 1.0."""
+        motion = self._motion
+        if progress >= 1.0:
+            return motion["target_x"], motion["target_y"]
+        if motion["kind"] == "arc":
+            t0, x0, y0, t1, x1, y1 = motion["chord"]
+            fraction = (motion["duration"] * progress - t0) / (t1 - t0)
+            return x0 + (x1 - x0) * fraction, y0 + (y1 - y0) * fraction
+        return (motion["start_x"] + (motion["target_x"] - motion["start_x"]) * progress,
+                motion["start_y"] + (motion["target_y"] - motion["start_y"]) * progress)
+
+    def _finish_command(self, collision=None):
+        motion = self._motion
+        if collision is None:
+            # Ensure the final pose is exact
+            if motion["kind"] != "turn":
+                self.robot_x = motion["target_x"]
+                self.robot_y = motion["target_y"]
+            if motion["kind"] != "move":
+                self.robot_angle = motion["target_angle"]
+
+        self.path.append(self.sim_time, self.robot_x, self.robot_y, self.robot_angle, force=True)
+
+        entry = self.current_command
+        entry.collision = collision
+        entry.status = "done"
+        entry.finished_at = time.time()
+        entry.sim_end = self.sim_time
+        entry.end_pose = (self.robot_x, self.robot_y, self.robot_angle)
+        self._motion = None
+        self.current_command = None
+        self.executing_command = False
+        self._last_finished = time.perf_counter()
+        self._completed_total.labels("done").inc()
+        self._emit("completed", entry.to_dict())
+        for merged in entry.merged or ():
+            merged.status = "done"
+            merged.collision = collision
+            merged.finished_at = entry.finished_at
+            merged.sim_end = entry.sim_end
+            merged.end_pose = entry.end_pose
+            self._completed_total.labels("done").inc()
+            self._emit("completed", merged.to_dict())
+
+    def step(self, dt, fill_idle=True):
+        """Advance the simulation by dt simulated seconds.
+
+        Time left over when a command finishes carries into the next queued
+        command, so the result does not depend on how dt is sliced. If the
+        queue runs dry the clock still advances by the rest of dt, unless
+        fill_idle is False.
+        """
+        with self.lock:
+            self._step(dt, fill_idle)
+            if self.recorder is not None:
+                self.recorder.record_pose(self.sim_time, self.robot_x, self.robot_y, self.robot_angle)
+
+    def _step(self, dt, fill_idle):
+        remaining = max(0.0, dt)
+        while True:
+            if not self.process_commands():
+                if fill_idle:
+                    self.sim_time += remaining
+                return
+
+            motion = self._motion
+            left = max(0.0, motion["duration"] - motion["elapsed"])
+            finishing = remaining >= left
+            advance = left if finishing else remaining
+            knot = False
+            if motion["kind"] == "arc":
+                # A slice never runs past the end of the current chord
+                chord_end = motion["chord"][3]
+                if chord_end < motion["duration"] and motion["elapsed"] + advance >= chord_end:
+                    advance = chord_end - motion["elapsed"]
+                    finishing, knot = False, True
+            progress = 1.0 if finishing else (motion["elapsed"] + advance) / motion["duration"]
+
+            if motion["kind"] != "turn":
+                # Sweep this slice of the path against nearby obstacles
+                next_x, next_y = motion["chord"][4:] if knot else self._motion_point(progress)
+                hit = self.world.sweep(self.robot_x, self.robot_y, next_x, next_y, self.robot_size)
+                if hit is not None:
+                    t, obstacle = hit
+                    self.robot_x += (next_x - self.robot_x) * t
+                    self.robot_y += (next_y - self.robot_y) * t
+                    if motion["kind"] == "arc":
+                        self.robot_angle = self._arc_angle(motion, motion["elapsed"] + advance * t)
+                    self.sim_time += advance * t
+                    remaining -= advance * t
+                    self._finish_command(collision={
+                        "obstacle": obstacle.kind,
+                        "obstacle_id": obstacle.id,
+                        "x": self.robot_x,
+                        "y": self.robot_y,
+                        "executed": motion["elapsed"] + advance * t
+                    })
+                    continue
+
+            self.sim_time += advance
+            remaining -= advance
+            if finishing:
+                self._finish_command()
+                continue
+
+            if knot:
+                # Land exactly on the chord's end and carry on along the next one
+                motion["elapsed"] = chord_end
+                self.robot_x, self.robot_y = next_x, next_y
+                self.robot_angle = self._arc_angle(motion, chord_end)
+                self._next_chord(motion, chord_end, next_x, next_y)
+                self.path.append(self.sim_time, self.robot_x, self.robot_y, self.robot_angle)
+                continue
+
+            motion["elapsed"] += advance
+            self._apply_progress(progress)
+            self.path.append(self.sim_time, self.robot_x, self.robot_y, self.robot_angle)
+            return
+
+    def run_until_idle(self, max_time=None):
+        """Execute queued commands back to back without waiting on the wall clock.
+
+        Returns the simulated time consumed.
+        """
+        start = self.sim_time
+        while True:
+            with self.lock:
+                if not self.process_commands():
+                    break
+                left = max(0.0, self._motion["duration"] - self._motion["elapsed"])
+                if max_time is not None:
+                    budget = start + max_time - self.sim_time
+                    if budget <= 0:
+                        break
+                    left = min(left, budget)
+                self.step(left, fill_idle=False)
+        return self.sim_time - start
+
+    def advance_realtime(self):
+        """Advance by the wall-clock time since the last call, scaled by time_warp.
+
+        The simulated time is consumed in fixed physics_dt steps, however
+        irregularly this is called; the remainder carries to the next call.
+        Returns the number of steps taken.
+        """
+        now = time.perf_counter()
+        if self._wall_time is None:
+            self._wall_time = now
+        elapsed = now - self._wall_time
+        self._wall_time = now
+
+        if self.time_warp is None:
+            self.run_until_idle()
+            return 0
+
+        dt = self.physics_dt
+        started = now
+        with self.lock:
+            self._accumulator += elapsed * self.time_warp
+            steps = int(self._accumulator / dt)
+            if steps > self.max_catchup_steps:
+                # Drop the backlog; simulated time slips instead of stalling the caller
+                self._accumulator -= (steps - self.max_catchup_steps) * dt
+                steps = self.max_catchup_steps
+            for _ in range(steps):
+                self._previous_pose = (self.robot_x, self.robot_y, self.robot_angle)
+                self.step(dt)
+                self._accumulator -= dt
+        if steps:
+            self._tick_time.observe(time.perf_counter() - started)
+        return steps
+
+    def interpolated_pose(self):
+        """Pose between the last two physics steps, for drawing between ticks.
+
+        Lags the physics by at most one step. An idle robot is drawn exactly
+        where it stopped.
+        """
+        with self.lock:
+            if not self.executing_command:
+                return self.robot_x, self.robot_y, self.robot_angle
+            alpha = min(1.0, self._accumulator / self.physics_dt)
+            x0, y0, a0 = self._previous_pose
+            turn = (self.robot_angle - a0 + 180) % 360 - 180
+            return (x0 + (self.robot_x - x0) * alpha,
+                    y0 + (self.robot_y - y0) * alpha,
+                    (a0 + turn * alpha) % 360)
+
+    def sync_idle_clock(self):
+        """Advance the clock over an idle wait without crediting it to queued commands."""
+        now = time.perf_counter()
+        with self.lock:
+            if self._wall_time is not None and self.time_warp is not None:
+                self.sim_time += (now - self._wall_time) * self.time_warp
+            self._wall_time = now
+
+    def run_forever(self, stop_event, tick=None):
+        """Drive the engine from the current thread until stop_event is set.
+
+        This is the simulation's only scheduler: it wakes every `tick`
+        seconds (physics_dt by default) on a fixed cadence that does not
+        drift with how long each step took. While idle the thread blocks on
+        the command queue, so a new command is dispatched as soon as it is
+        pushed rather than on the next tick.
+        """
+        tick = tick if tick is not None else self.physics_dt
+        next_tick = time.perf_counter()
+        while not stop_event.is_set():
+            self.advance_realtime()
+            if self.is_idle():
+                self.command_queue.wait(timeout=0.5)
+                self.sync_idle_clock()
+                next_tick = time.perf_counter()
+            else:
+                next_tick += tick
+                delay = next_tick - time.perf_counter()
+                if delay < 0:
+                    next_tick = time.perf_counter()  # Overran; don't try to catch up in a burst
+                stop_event.wait(max(0.0, delay))
@@ -0,0 +1,241 @@
+"""Vectorized multi-robot fleet simulation.
+
+FleetEngine holds the pose and active-command state of every robot in NumPy
+arrays and advances them all with one vectorized step per tick. It uses the
+same kinematics as HeadlessRobotEngine; only robots that start a new command
+during a tick touch Python-level per-robot state.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+IDLE, MOVE, TURN = 0, 1, 2
+
+# command -> (kind, direction)
+COMMAND_CODES = {
+    "forward": (MOVE, 1.0),
+    "backward": (MOVE, -1.0),
+    "left": (TURN, 1.0),
+    "right": (TURN, -1.0),
+}
+
+
+class FleetEngine:
+    def __init__(self, n_robots, robot_x=250, robot_y=250, robot_angle=0, time_warp=1.0):
+        self.n_robots = n_robots
+        self.robot_size = 20
+        self.robot_speed = 50  # Pixels per second
+        self.robot_turn_speed = 90  # Degrees per second
+        self.map_width = 600
+        self.map_height = 500
+        self.grid_size = 50
+
+        # Poses; scalars or per-robot arrays are accepted
+        self.x = np.broadcast_to(np.asarray(robot_x, dtype=np.float64), (n_robots,)).copy()
+        self.y = np.broadcast_to(np.asarray(robot_y, dtype=np.float64), (n_robots,)).copy()
+        self.angle = np.broadcast_to(np.asarray(robot_angle, dtype=np.float64), (n_robots,)).copy()
+
+        # Active-command state
+        self.kind = np.zeros(n_robots, dtype=np.int8)
+        self.elapsed = np.zeros(n_robots)
+        self.duration = np.zeros(n_robots)
+        self.start_x = np.zeros(n_robots)
+        self.start_y = np.zeros(n_robots)
+        self.target_x = np.zeros(n_robots)
+        self.target_y = np.zeros(n_robots)
+        self.start_angle = np.zeros(n_robots)
+        self.angle_diff = np.zeros(n_robots)
+        self.target_angle = np.zeros(n_robots)
+
+        # Per-robot queues; pending mirrors their lengths for vectorized masks
+        self.queues = [deque() for _ in range(n_robots)]
+        self.pending = np.zeros(n_robots, dtype=np.int64)
+
+        self.sim_time = 0.0
+        self.time_warp = time_warp
+        self._wall_time = None
+        self.lock = threading.RLock()
+
+    def _check_robot(self, robot_id):
+        robot_id = int(robot_id)
+        if not 0 <= robot_id < self.n_robots:
+            raise ValueError(f"robot_id must be between 0 and {self.n_robots - 1}")
+        return robot_id
+
+    def submit(self, robot_id, command, duration):
+        """Queue a command for one robot. Safe to call from any thread."""
+        robot_id = self._check_robot(robot_id)
+        command = command.lower()
+        duration = float(duration)
+        if command not in COMMAND_CODES:
+            raise ValueError(f"Unknown command: {command}")
+        # Written so that NaN fails too
+        if not (0 < duration < math.inf):
+            raise ValueError("Duration must be a positive number of seconds")
+        with self.lock:
+            self.queues[robot_id].append((command, duration))
+            self.pending[robot_id] += 1
+        return {"robot_id": robot_id, "command": command, "duration": duration}
+
+    def status(self, robot_id):
+        robot_id = self._check_robot(robot_id)
+        with self.lock:
+            return {
+                "robot_id": robot_id,
+                "position": {"x": float(self.x[robot_id]), "y": float(self.y[robot_id])},
+                "angle": float(self.angle[robot_id]),
+                "queue_size": int(self.pending[robot_id]),
+                "executing": bool(self.kind[robot_id] != IDLE)
+            }
+
+    def fleet_status(self):
+        """Column-oriented snapshot of every robot."""
+        with self.lock:
+            return {
+                "count": self.n_robots,
+                "x": self.x.tolist(),
+                "y": self.y.tolist(),
+                "angle": self.angle.tolist(),
+                "queue_size": self.pending.tolist(),
+                "executing": (self.kind != IDLE).tolist()
+            }
+
+    def is_idle(self):
+        with self.lock:
+            return not self.kind.any() and not self.pending.any()
+
+    def _dispatch(self, idx, carry):
+        """Start the next queued command on robots idx, pre-advanced by carry seconds."""
+        kinds = np.empty(len(idx), dtype=np.int8)
+        directions = np.empty(len(idx))
+        durations = np.empty(len(idx))
+        for i, robot_id in enumerate(idx):
+            command, duration = self.queues[robot_id].popleft()
+            kinds[i], directions[i] = COMMAND_CODES[command]
+            durations[i] = duration
+        self.pending[idx] -= 1
+
+        self.kind[idx] = kinds
+        self.duration[idx] = durations
+        self.elapsed[idx] = carry
+
+        # Movement targets, clamped to the map like the single-robot engine
+        move = idx[kinds == MOVE]
+        if len(move):
+            distance = self.robot_speed * self.duration[move] * directions[kinds == MOVE]
+            angle_rad = np.radians(self.angle[move])
+            self.start_x[move] = self.x[move]
+            self.start_y[move] = self.y[move]
+            self.target_x[move] = np.clip(self.x[move] + np.cos(angle_rad) * distance,
+                                          self.robot_size, self.map_width - self.robot_size)
+            self.target_y[move] = np.clip(self.y[move] - np.sin(angle_rad) * distance,
+                                          self.robot_size, self.map_height - self.robot_size)
+
+        # Turn targets, interpolated along the shortest arc
+        turn = idx[kinds == TURN]
+        if len(turn):
+            change = self.robot_turn_speed * self.duration[turn] * directions[kinds == TURN]
+            target = (self.angle[turn] + change) % 360
+            diff = (target - self.angle[turn]) % 360
+            diff[diff > 180] -= 360
+            self.start_angle[turn] = self.angle[turn]
+            self.angle_diff[turn] = diff
+            self.target_angle[turn] = target
+
+    def _integrate(self, idx):
+        """Apply interpolation for robots idx; returns those that finished."""
+        kind = self.kind[idx]
+        done = self.elapsed[idx] >= self.duration[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            progress = np.where(done, 1.0, self.elapsed[idx] / self.duration[idx])
+
+        move = kind == MOVE
+        m = idx[move]
+        self.x[m] = self.start_x[m] + (self.target_x[m] - self.start_x[m]) * progress[move]
+        self.y[m] = self.start_y[m] + (self.target_y[m] - self.start_y[m]) * progress[move]
+
+        turn = kind == TURN
+        t = idx[turn]
+        self.angle[t] = (self.start_angle[t] + self.angle_diff[t] * progress[turn]) % 360
+
+        # Snap finished robots to their exact targets
+        finished = idx[done]
+        fm = finished[self.kind[finished] == MOVE]
+        self.x[fm] = self.target_x[fm]
+        self.y[fm] = self.target_y[fm]
+        ft = finished[self.kind[finished] == TURN]
+        self.angle[ft] = self.target_angle[ft]
+        self.kind[finished] = IDLE
+        return finished
+
+    def step(self, dt):
+        """Advance every robot by dt simulated seconds in one vectorized pass."""
+        dt = max(0.0, dt)
+        with self.lock:
+            ready = np.flatnonzero((self.kind == IDLE) & (self.pending > 0))
+            if len(ready):
+                self._dispatch(ready, 0.0)
+
+            active = np.flatnonzero(self.kind != IDLE)
+            self.elapsed[active] += dt
+            finished = self._integrate(active)
+
+            # Time left over after a command finishes carries into the next one
+            while len(finished):
+                carry = self.elapsed[finished] - self.duration[finished]
+                chained = self.pending[finished] > 0
+                finished, carry = finished[chained], carry[chained]
+                if not len(finished):
+                    break
+                self._dispatch(finished, np.maximum(carry, 0.0))
+                finished = self._integrate(finished)
+
+            self.sim_time += dt
+
+    def run_until_idle(self, max_time=None):
+        """Step as fast as possible until every queue has drained.
+
+        Each step jumps to the earliest command completion in the fleet.
+        Returns the simulated time consumed.
+        """
+        start = self.sim_time
+        while True:
+            with self.lock:
+                if self.is_idle():
+                    break
+                active = self.kind != IDLE
+                if active.any():
+                    left = float(np.min(self.duration[active] - self.elapsed[active]))
+                else:
+                    left = 0.0
+                left = max(0.0, left)
+                if max_time is not None:
+                    budget = start + max_time - self.sim_time
+                    if budget <= 0:
+                        break
+                    left = min(left, budget)
+                self.step(left)
+        return self.sim_time - start
+
+    def advance_realtime(self):
+        """Advance by the wall-clock time since the last call, scaled by time_warp."""
+        now = time.perf_counter()
+        if self._wall_time is None:
+            self._wall_time = now
+        elapsed = now - self._wall_time
+        self._wall_time = now
+
+        if self.time_warp is None:
+            self.run_until_idle()
+        else:
+            self.step(elapsed * self.time_warp)
+
+    def run_forever(self, stop_event, tick=0.016):
+        """Drive the fleet from the current thread until stop_event is set."""
+        while not stop_event.is_set():
+            self.advance_realtime()
+            stop_event.wait(tick)
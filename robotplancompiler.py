@@ -0,0 +1,184 @@
+"""Compile free-text robot plans, such as LLM output, into validated commands.
+
+A plan is split once into steps: commas, semicolons, newlines, "then" and
+"and" separate them, and list markers ("1.", "2)", "-", "*", "Step 3:") and
+heading lines ending in ":" are ignored. Each step is a command phrase and a
+quantity:
+
+    move forward 2 seconds      go straight 1.5 m       back up 500 ms
+    turn left 90 degrees        rotate right 0.5 s      turn around
+    velocity 40 -15 for 2 seconds
+
+Synonyms map to the simulator's forward / backward / left / right /
+velocity commands. Durations may be given in ms or seconds (the default),
+turns in degrees and moves in metres, centimetres or pixels; angles and
+distances become durations using the robot's speeds. A turn without a
+quantity is a quarter turn. The first step that does not compile raises
+PlanError, so a bad plan is rejected before any Mech or HTTP call.
+
+    steps = compile_plan("1. go straight 1 m\\n2. turn left 90 degrees")
+    prompt = plan_prompt(steps)  # "forward 2 seconds\\nleft 1 seconds" for robot-control-batch
+"""
+
+import math
+import re
+from typing import List, NamedTuple, Optional
+
+# HeadlessRobotEngine's defaults
+ROBOT_SPEED = 50.0  # Pixels per second
+TURN_SPEED = 90.0  # Degrees per second
+PIXELS_PER_METER = 100.0
+
+COMMAND_PHRASES = {
+    "forward": ("move forward", "go forward", "drive forward", "move forwards", "go forwards", "forwards",
+                "go straight", "move straight", "drive straight", "straight ahead", "straight", "move ahead",
+                "go ahead", "ahead", "advance", "forward"),
+    "backward": ("move backward", "go backward", "drive backward", "move backwards", "go backwards",
+                 "backwards", "move back", "go back", "back up", "reverse", "backward"),
+    "left": ("turn left", "rotate left", "spin left", "pivot left", "left"),
+    "right": ("turn right", "rotate right", "spin right", "pivot right", "right"),
+    "around": ("turn around", "rotate around", "spin around", "u-turn", "u turn"),
+}
+
+# Unit -> (kind, factor to seconds, degrees or pixels)
+UNITS = {
+    "ms": ("time", 0.001), "msec": ("time", 0.001), "millisecond": ("time", 0.001),
+    "milliseconds": ("time", 0.001),
+    "s": ("time", 1.0), "sec": ("time", 1.0), "secs": ("time", 1.0), "second": ("time", 1.0),
+    "seconds": ("time", 1.0),
+    "deg": ("angle", 1.0), "degree": ("angle", 1.0), "degrees": ("angle", 1.0), "°": ("angle", 1.0),
+    "m": ("distance", PIXELS_PER_METER), "meter": ("distance", PIXELS_PER_METER),
+    "meters": ("distance", PIXELS_PER_METER), "metre": ("distance", PIXELS_PER_METER),
+    "metres": ("distance", PIXELS_PER_METER),
+    "cm": ("distance", PIXELS_PER_METER / 100), "centimeter": ("distance", PIXELS_PER_METER / 100),
+    "centimeters": ("distance", PIXELS_PER_METER / 100), "centimetre": ("distance", PIXELS_PER_METER / 100),
+    "centimetres": ("distance", PIXELS_PER_METER / 100),
+    "px": ("distance", 1.0), "pixel": ("distance", 1.0), "pixels": ("distance", 1.0),
+}
+
+_NUMBER = r"(\d+(?:\.\d+)?|\.\d+)"
+_SIGNED = r"(-?(?:\d+(?:\.\d+)?|\.\d+))"
+_UNIT = "|".join(sorted((re.escape(unit) for unit in UNITS), key=len, reverse=True))
+_PHRASES = {phrase: command for command, phrases in COMMAND_PHRASES.items() for phrase in phrases}
+
+_SEPARATOR = re.compile(r"[,;\n]|\band then\b|\bthen\b|\band\b")
+_MARKER = re.compile(r"^(?:step\s*\d+\s*[:.)-]?|\d+\s*[.):](?!\d)|[-*•+]|\(\d+\))\s*")
+# Longest phrase first, so "turn left" wins over "left"
+_COMMAND = re.compile(r"^(" + "|".join(re.escape(phrase) for phrase in sorted(_PHRASES, key=len, reverse=True)) +
+                      r")\b(.*)$")
+_QUANTITY = re.compile(r"^(?:for\s+|by\s+)?(?:" + _NUMBER + r"\s*(" + _UNIT + r")?)?$")
+_VELOCITY = re.compile(r"^(?:set\s+)?velocity\s+" + _SIGNED + r"\s+" + _SIGNED +
+                       r"\s+(?:for\s+)?" + _NUMBER + r"\s*(" + _UNIT + r")?$")
+
+
+class PlanError(ValueError):
+    """Raised when a plan does not compile; `step` is the 1-based position of the bad step."""
+
+    def __init__(self, message, step=None, text=None):
+        if step is not None:
+            message = f"step {step} ('{text}'): {message}"
+        super().__init__(message)
+        self.step = step
+        self.text = text
+
+
+class PlanStep(NamedTuple):
+    """One compiled command; linear (px/s) and angular (deg/s) are set for velocity commands."""
+    command: str
+    duration: float
+    linear: Optional[float] = None
+    angular: Optional[float] = None
+    text: str = ""
+
+    def to_dict(self):
+        """The step as a POST /command body."""
+        data = {"command": self.command, "duration": self.duration}
+        if self.command == "velocity":
+            data["linear"], data["angular"] = self.linear, self.angular
+        return data
+
+    def to_prompt(self):
+        """The step in robot_control_mech's prompt grammar."""
+        if self.command == "velocity":
+            return f"velocity {_format(self.linear)} {_format(self.angular)} for {_format(self.duration)} seconds"
+        return f"{self.command} {_format(self.duration)} seconds"
+
+
+def _format(value):
+    return f"{value:.6f}".rstrip("0").rstrip(".")
+
+
+def compile_plan(text, speed=ROBOT_SPEED, turn_speed=TURN_SPEED, precision=3):
+    """Compile plan text into a list of PlanSteps, or raise PlanError.
+
+    `speed` (px/s) and `turn_speed` (deg/s) convert distances and angles to
+    durations and bound velocity commands; durations are rounded to
+    `precision` decimals, like the planner's commands.
+    """
+    steps = []
+    for fragment in _SEPARATOR.split(text.lower()):
+        fragment = _MARKER.sub("", fragment.strip().strip("\"'`").rstrip(".!").strip())
+        if not fragment or fragment.endswith(":"):
+            continue
+        steps.append(_compile_step(fragment, len(steps) + 1, speed, turn_speed, precision))
+    if not steps:
+        raise PlanError("plan contains no commands")
+    return steps
+
+
+def _compile_step(text, index, speed, turn_speed, precision):
+    match = _VELOCITY.match(text)
+    if match:
+        linear, angular, value, unit = match.groups()
+        duration = _duration(float(value), unit or "seconds", "velocity", speed, turn_speed, precision, index, text)
+        linear, angular = float(linear), float(angular)
+        if abs(linear) > speed or abs(angular) > turn_speed:
+            raise PlanError(f"velocity must be within ±{_format(speed)} px/s and ±{_format(turn_speed)} deg/s",
+                            index, text)
+        return PlanStep("velocity", duration, linear, angular, text)
+
+    match = _COMMAND.match(text)
+    if not match:
+        raise PlanError("unknown command; expected e.g. 'move forward 2 seconds', 'turn left 90 degrees' "
+                        "or 'velocity 40 -15 for 2 seconds'", index, text)
+    command = _PHRASES[match.group(1)]
+    quantity = _QUANTITY.match(match.group(2).strip())
+    if not quantity:
+        raise PlanError(f"cannot read the amount '{match.group(2).strip()}'", index, text)
+    value, unit = quantity.groups()
+
+    if command == "around":
+        if value is not None:
+            raise PlanError("'turn around' takes no amount", index, text)
+        command, value, unit = "left", "180", "degrees"
+    elif value is None:
+        if command not in ("left", "right"):
+            raise PlanError("a move needs a duration or distance", index, text)
+        value, unit = "90", "degrees"  # A bare "turn left" is a quarter turn
+
+    duration = _duration(float(value), unit or "seconds", command, speed, turn_speed, precision, index, text)
+    return PlanStep(command, duration, text=text)
+
+
+def _duration(value, unit, command, speed, turn_speed, precision, index, text):
+    """Seconds for `value` in `unit`, rounded to `precision` decimals; raises PlanError unless positive."""
+    kind, factor = UNITS[unit]
+    if kind == "time":
+        duration = value * factor
+    elif kind == "angle":
+        if command not in ("left", "right"):
+            raise PlanError(f"'{unit}' only applies to turns", index, text)
+        duration = value * factor / turn_speed
+    else:
+        if command not in ("forward", "backward"):
+            raise PlanError(f"'{unit}' only applies to moves", index, text)
+        duration = value * factor / speed
+    # Checked after rounding, so a step never compiles to a 0-second command
+    if not math.isfinite(duration) or round(duration, precision) <= 0:
+        raise PlanError("duration must be positive", index, text)
+    return round(duration, precision)
+
+
+def plan_prompt(steps: List[PlanStep]) -> str:
+    """A compiled plan as one robot-control-batch prompt, a step per line."""
+    return "\n".join(step.to_prompt() for step in steps)
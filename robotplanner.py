@@ -0,0 +1,282 @@
+"""On-board path planning for the robot simulator.
+
+The world's obstacles are rasterised into an occupancy grid, inflated by the
+robot's radius, and searched with A*. The cell path is shortened with exact
+swept-disc checks against the world and turned into the simulator's own
+turn / drive commands, timed with the engine's robot_speed and
+robot_turn_speed, so a client can execute a route without guessing
+durations.
+
+Grids are rebuilt only when the world changes, and routes are cached per
+(start cell, goal cell).
+"""
+
+import heapq
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+SQRT2 = math.sqrt(2.0)
+
+# Cell states in the search grid
+FREE, BLOCKED, WALL = 0, 1, 2
+
+
+class NoPath(Exception):
+    """Raised when the goal is blocked or cannot be reached."""
+
+
+class OccupancyGrid:
+    """Blocked cells of a world for a disc of `radius`, at `resolution` pixels per cell.
+
+    A cell is blocked when a disc centred anywhere in it could touch an
+    obstacle or leave the map, so straight moves between neighbouring cell
+    centres are always safe.
+    """
+
+    def __init__(self, world, radius, resolution=10):
+        self.resolution = resolution
+        self.width = max(1, int(math.ceil(world.map_width / resolution)))
+        self.height = max(1, int(math.ceil(world.map_height / resolution)))
+        self.margin = resolution * SQRT2 / 2  # Centre-to-corner distance of a cell
+        self.inflate = radius + self.margin
+
+        centres_x = (np.arange(self.width) + 0.5) * resolution
+        centres_y = (np.arange(self.height) + 0.5) * resolution
+        blocked = np.zeros((self.height, self.width), dtype=bool)
+
+        # The engine keeps the robot's centre radius away from the map border
+        blocked[:, (centres_x < radius) | (centres_x > world.map_width - radius)] = True
+        blocked[(centres_y < radius) | (centres_y > world.map_height - radius), :] = True
+
+        arrays = world.arrays()
+        circles = arrays["circles"]
+        if len(circles):
+            reach = circles[:, 2] + self.inflate
+            owner, cx, cy = self._expand(circles[:, 0] - reach, circles[:, 1] - reach,
+                                         circles[:, 0] + reach, circles[:, 1] + reach)
+            dx = centres_x[cx] - circles[owner, 0]
+            dy = centres_y[cy] - circles[owner, 1]
+            hit = dx * dx + dy * dy <= reach[owner] ** 2
+            blocked[cy[hit], cx[hit]] = True
+
+        rects = arrays["rects"]
+        if len(rects):
+            # Grown boxes, conservative at the corners like World.sweep
+            inflate = self.inflate
+            owner, cx, cy = self._expand(rects[:, 0] - inflate, rects[:, 1] - inflate,
+                                         rects[:, 2] + inflate, rects[:, 3] + inflate)
+            x, y = centres_x[cx], centres_y[cy]
+            hit = ((x >= rects[owner, 0] - inflate) & (x <= rects[owner, 2] + inflate) &
+                   (y >= rects[owner, 1] - inflate) & (y <= rects[owner, 3] + inflate))
+            blocked[cy[hit], cx[hit]] = True
+
+        self.blocked = blocked
+        self._cells = None  # Padded flat copy for the search, built on first use
+
+    def _expand(self, x0, y0, x1, y1):
+        """Every (owner, cx, cy) for the grid cells overlapping each box."""
+        res = self.resolution
+        cx0 = np.clip(np.floor(x0 / res).astype(np.int64), 0, self.width - 1)
+        cy0 = np.clip(np.floor(y0 / res).astype(np.int64), 0, self.height - 1)
+        cx1 = np.clip(np.floor(x1 / res).astype(np.int64), 0, self.width - 1)
+        cy1 = np.clip(np.floor(y1 / res).astype(np.int64), 0, self.height - 1)
+        span_x = cx1 - cx0 + 1
+        counts = span_x * (cy1 - cy0 + 1)
+        owner = np.repeat(np.arange(len(x0)), counts)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return owner, cx0[owner] + offset % span_x[owner], cy0[owner] + offset // span_x[owner]
+
+    def cell(self, x, y):
+        res = self.resolution
+        return (min(self.width - 1, max(0, int(x // res))),
+                min(self.height - 1, max(0, int(y // res))))
+
+    def centre(self, cell):
+        res = self.resolution
+        return ((cell[0] + 0.5) * res, (cell[1] + 0.5) * res)
+
+    def is_blocked(self, cell):
+        return bool(self.blocked[cell[1], cell[0]])
+
+    def search(self, start, goal, weight=1.0):
+        """8-connected A* from start to goal cell; returns the cell path or None.
+
+        A weight above 1 inflates the heuristic: the path may be up to that
+        factor longer than optimal, but far fewer cells are expanded on
+        cluttered maps.
+
+        A blocked start cell (the robot stopped against an obstacle) may only
+        be left through blocked cells connected to it, never re-entered.
+        """
+        # Pad the grid with a wall so neighbours never need bounds checks
+        width = self.width + 2
+        cells = self._padded()
+        start_index = (start[1] + 1) * width + start[0] + 1
+        goal_index = (goal[1] + 1) * width + goal[0] + 1
+        gx, gy = goal[0] + 1, goal[1] + 1
+
+        # (index delta, cost, the two side cells a diagonal step squeezes between)
+        steps = [(sy * width + sx, SQRT2 if sx and sy else 1.0, sx, sy * width)
+                 for sx in (-1, 0, 1) for sy in (-1, 0, 1) if sx or sy]
+        cost = [math.inf] * len(cells)
+        came_from = [-1] * len(cells)
+        cost[start_index] = 0.0
+        frontier = [(0.0, 0.0, start_index)]
+        push, pop = heapq.heappush, heapq.heappop
+        k = SQRT2 - 2
+        w = weight
+
+        while frontier:
+            _, h, index = pop(frontier)
+            if index == goal_index:
+                path = []
+                while index != -1:
+                    path.append((index % width - 1, index // width - 1))
+                    index = came_from[index]
+                return path[::-1]
+            g = cost[index]
+            if g < 0:
+                continue  # Already expanded
+            cost[index] = -1.0 - g  # Mark closed, keeping the cost recoverable
+
+            escaping = cells[index] == BLOCKED
+            for delta, step, side_x, side_y in steps:
+                neighbour = index + delta
+                state = cells[neighbour]
+                if state == WALL:
+                    continue
+                if not escaping and (state or cells[index + side_x] or cells[index + side_y]):
+                    continue  # Blocked, or cutting a corner between blocked cells
+                new_cost = g + step
+                if new_cost < cost[neighbour]:
+                    cost[neighbour] = new_cost
+                    came_from[neighbour] = index
+                    dx = abs(neighbour % width - gx)
+                    dy = abs(neighbour // width - gy)
+                    h = w * (dx + dy + k * (dx if dx < dy else dy))
+                    # Ties go to the node nearer the goal
+                    push(frontier, (new_cost + h, h, neighbour))
+        return None
+
+    def _padded(self):
+        if self._cells is None:
+            padded = np.full((self.height + 2, self.width + 2), WALL, dtype=np.uint8)
+            padded[1:-1, 1:-1] = self.blocked
+            self._cells = bytearray(padded.ravel().tobytes())
+        return self._cells
+
+
+def corners(path):
+    """Drop the cells in the middle of straight runs, keeping the ends."""
+    if len(path) < 3:
+        return list(path)
+    kept = [path[0]]
+    for previous, cell, following in zip(path, path[1:], path[2:]):
+        if (cell[0] - previous[0], cell[1] - previous[1]) != (following[0] - cell[0], following[1] - cell[1]):
+            kept.append(cell)
+    kept.append(path[-1])
+    return kept
+
+
+class PathPlanner:
+    def __init__(self, resolution=10, cache_size=1024, weight=1.2):
+        self.resolution = resolution
+        self.weight = weight  # Heuristic weight for A*, see OccupancyGrid.search
+        self.cache_size = cache_size
+        self._grid = None  # (world, version, radius, OccupancyGrid)
+        self._routes = OrderedDict()  # (start cell, goal cell) -> waypoints, LRU
+        self._lock = threading.Lock()  # Requests plan from several server threads
+
+    def grid(self, world, radius):
+        cached = self._grid
+        if cached is not None and cached[0] is world and cached[1] == world.version and cached[2] == radius:
+            return cached[3]
+        grid = OccupancyGrid(world, radius, self.resolution)
+        self._grid = (world, world.version, radius, grid)
+        self._routes.clear()
+        return grid
+
+    def route(self, world, start, goal, radius):
+        """Collision-free waypoints from start (x, y) to goal (x, y). Raises NoPath."""
+        with self._lock:
+            return self._route(world, start, goal, radius)
+
+    def _route(self, world, start, goal, radius):
+        grid = self.grid(world, radius)
+        start_cell, goal_cell = grid.cell(*start), grid.cell(*goal)
+        if grid.is_blocked(goal_cell):
+            raise NoPath(f"Goal ({goal[0]:.0f}, {goal[1]:.0f}) is blocked by an obstacle or the map border")
+
+        key = (start_cell, goal_cell)
+        waypoints = self._routes.get(key)
+        if waypoints is None:
+            path = grid.search(start_cell, goal_cell, self.weight)
+            if path is None:
+                raise NoPath(f"No route to ({goal[0]:.0f}, {goal[1]:.0f})")
+            waypoints = self._shorten(world, grid, [grid.centre(cell) for cell in corners(path)], radius)
+            self._routes[key] = waypoints
+            if len(self._routes) > self.cache_size:
+                self._routes.popitem(last=False)
+        else:
+            self._routes.move_to_end(key)
+
+        # Cached routes run between cell centres; swapping in the exact ends is
+        # safe because the shortening was checked with a disc grown by the
+        # centre-to-corner margin of a cell.
+        waypoints = [tuple(start)] + waypoints[1:-1] + [tuple(goal)]
+        if len(waypoints) == 2 and waypoints[0] == waypoints[1]:
+            return waypoints[:1]
+        return waypoints
+
+    def _shorten(self, world, grid, points, radius):
+        """Skip waypoints while the straight segment past them stays clear."""
+        reach = radius + grid.margin
+        shortened = [points[0]]
+        anchor = 0
+        while anchor < len(points) - 1:
+            furthest = anchor + 1
+            while furthest + 1 < len(points):
+                (x0, y0), (x1, y1) = points[anchor], points[furthest + 1]
+                if world.sweep(x0, y0, x1, y1, reach) is not None:
+                    break
+                furthest += 1
+            shortened.append(points[furthest])
+            anchor = furthest
+        return shortened
+
+
+def plan_commands(waypoints, x, y, angle, speed, turn_speed, allow_backward=True, precision=3):
+    """Turn/drive commands that take a robot at (x, y, angle) through the waypoints.
+
+    Durations are rounded to `precision` decimals and each segment is aimed
+    from the pose the rounded commands actually reach, so rounding never
+    accumulates. Targets behind the robot are reached by driving backward
+    when allow_backward is set.
+    """
+    commands = []
+    for wx, wy in waypoints[1:]:
+        distance = math.hypot(wx - x, wy - y)
+        duration = round(distance / speed, precision)
+        if duration <= 0:
+            continue
+
+        heading = math.degrees(math.atan2(-(wy - y), wx - x)) % 360
+        direction = 1
+        diff = (heading - angle + 180) % 360 - 180
+        if allow_backward and abs(diff) > 90:
+            direction = -1
+            diff = (diff + 360) % 360 - 180
+
+        turn = round(abs(diff) / turn_speed, precision)
+        if turn > 0:
+            commands.append({"command": "left" if diff > 0 else "right", "duration": turn})
+            angle = (angle + turn_speed * turn * (1 if diff > 0 else -1)) % 360
+
+        commands.append({"command": "forward" if direction > 0 else "backward", "duration": duration})
+        angle_rad = math.radians(angle)
+        x += math.cos(angle_rad) * speed * duration * direction
+        y -= math.sin(angle_rad) * speed * duration * direction
+    return commands
@@ -0,0 +1,197 @@
+"""Thread-safe, bounded priority queue for simulator commands.
+
+The HTTP thread pushes and the simulation thread pops. Pushing wakes any
+thread blocked in wait(), so a headless engine dispatches a new command as
+soon as it arrives instead of on the next poll. The queue is bounded; push
+raises QueueFull, which the server turns into HTTP 429. Every entry records
+when it was enqueued so dispatch can measure queue-wait time.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class QueueFull(Exception):
+    """Raised when pushing onto a queue that is at maxsize."""
+
+
+class QueuedCommand:
+    __slots__ = ("id", "command", "duration", "priority", "enqueued_at", "wait_time",
+                 "status", "started_at", "finished_at", "sim_start", "sim_end", "error", "collision",
+                 "merged", "merged_into", "executed_as", "velocity", "executed", "end_pose")
+
+    _ids = itertools.count(1)
+
+    def __init__(self, command, duration, priority=0, velocity=None):
+        self.id = next(QueuedCommand._ids)
+        self.command = command
+        self.duration = duration
+        self.priority = priority
+        self.velocity = velocity  # (linear px/s, angular deg/s) of a "velocity" command
+        self.enqueued_at = time.perf_counter()
+        self.wait_time = None  # Seconds spent queued, set on pop
+
+        # Lifecycle: queued -> running -> done | failed | cancelled
+        self.status = "queued"
+        self.started_at = None  # Wall-clock (epoch) timestamps
+        self.finished_at = None
+        self.sim_start = None  # Simulated-clock timestamps
+        self.sim_end = None
+        self.error = None
+        self.collision = None  # Set when a movement stopped at an obstacle
+        self.executed = None  # Seconds actually run, set when the command was cut short
+        self.end_pose = None  # (x, y, angle) when a started command finished
+
+        # Queue compaction: entries folded into this one, or the entry this was folded into
+        self.merged = None
+        self.merged_into = None
+        self.executed_as = None  # (command, duration) actually run, if compaction changed it
+
+    def to_dict(self):
+        record = {
+            "id": self.id,
+            "command": self.command,
+            "duration": self.duration,
+            "priority": self.priority,
+            "status": self.status,
+            "queue_wait": self.wait_time,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "sim_start": self.sim_start,
+            "sim_end": self.sim_end
+        }
+        if self.velocity is not None:
+            record["linear"], record["angular"] = self.velocity
+        if self.error is not None:
+            record["error"] = self.error
+        if self.collision is not None:
+            record["collision"] = self.collision
+        if self.executed is not None:
+            record["executed"] = self.executed
+        if self.end_pose is not None:
+            record["end_pose"] = {"x": self.end_pose[0], "y": self.end_pose[1], "angle": self.end_pose[2]}
+        if self.merged:
+            record["merged"] = [entry.id for entry in self.merged]
+        if self.merged_into is not None:
+            record["merged_into"] = self.merged_into
+        if self.executed_as is not None:
+            record["executed_as"] = {"command": self.executed_as[0], "duration": self.executed_as[1]}
+        return record
+
+
+class CommandQueue:
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._heap = []
+        self._counter = itertools.count()  # FIFO order within a priority
+        self._cond = threading.Condition()
+
+        # Queue-wait statistics, in wall-clock seconds
+        self.popped = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, command, duration, priority=0, velocity=None):
+        """Enqueue a command; higher priority runs first. Raises QueueFull."""
+        entry = QueuedCommand(command, duration, priority, velocity)
+        with self._cond:
+            if self.maxsize and len(self._heap) >= self.maxsize:
+                raise QueueFull(f"Command queue is full ({self.maxsize} commands)")
+            heapq.heappush(self._heap, (-priority, next(self._counter), entry))
+            self._cond.notify_all()
+        return entry
+
+    def push_many(self, commands):
+        """Enqueue [(command, duration, priority[, velocity]), ...] atomically.
+
+        Either every command is queued or, if they do not all fit, none are
+        and QueueFull is raised.
+        """
+        entries = [QueuedCommand(*step) for step in commands]
+        with self._cond:
+            if self.maxsize and len(self._heap) + len(entries) > self.maxsize:
+                raise QueueFull(f"Command queue cannot take {len(entries)} more commands "
+                                f"({len(self._heap)}/{self.maxsize} queued)")
+            for entry in entries:
+                heapq.heappush(self._heap, (-entry.priority, next(self._counter), entry))
+            self._cond.notify_all()
+        return entries
+
+    def pop(self):
+        """Remove and return the next command, or None if the queue is empty."""
+        return self.pop_if(None)
+
+    def pop_if(self, predicate):
+        """Pop the next command only if predicate(entry) is true (or predicate is None)."""
+        with self._cond:
+            if not self._heap or (predicate is not None and not predicate(self._heap[0][2])):
+                return None
+            entry = heapq.heappop(self._heap)[2]
+
+        entry.wait_time = time.perf_counter() - entry.enqueued_at
+        self.popped += 1
+        self.total_wait += entry.wait_time
+        self.max_wait = max(self.max_wait, entry.wait_time)
+        self.last_wait = entry.wait_time
+        return entry
+
+    def wait(self, timeout=None):
+        """Block until the queue is non-empty or timeout expires. Returns True if non-empty."""
+        with self._cond:
+            return bool(self._cond.wait_for(lambda: self._heap, timeout))
+
+    def notify(self):
+        """Wake waiters without pushing, e.g. on shutdown."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def remove(self, command_id):
+        """Take a queued command out of the queue; returns it, or None if it is not queued."""
+        with self._cond:
+            for index, (_, _, entry) in enumerate(self._heap):
+                if entry.id == command_id:
+                    self._heap[index] = self._heap[-1]
+                    self._heap.pop()
+                    heapq.heapify(self._heap)
+                    return entry
+        return None
+
+    def drain(self):
+        """Empty the queue; returns the removed commands in the order they would have run."""
+        with self._cond:
+            heap, self._heap = self._heap, []
+        return [entry for _, _, entry in sorted(heap)]
+
+    def replace(self, commands):
+        """Atomically swap everything queued for [(command, duration, priority[, velocity]), ...].
+
+        Returns (new entries, removed entries). Raises QueueFull, leaving the
+        queue untouched, if the new commands do not fit.
+        """
+        entries = [QueuedCommand(*step) for step in commands]
+        with self._cond:
+            if self.maxsize and len(entries) > self.maxsize:
+                raise QueueFull(f"Command queue cannot take {len(entries)} commands (maxsize {self.maxsize})")
+            heap, self._heap = self._heap, []
+            for entry in entries:
+                heapq.heappush(self._heap, (-entry.priority, next(self._counter), entry))
+            self._cond.notify_all()
+        return entries, [entry for _, _, entry in sorted(heap)]
+
+    def clear(self):
+        with self._cond:
+            self._heap.clear()
+
+    def wait_stats(self):
+        return {
+            "count": self.popped,
+            "last": self.last_wait,
+            "mean": self.total_wait / self.popped if self.popped else 0.0,
+            "max": self.max_wait
+        }
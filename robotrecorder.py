@@ -0,0 +1,348 @@
+"""Flight recorder for the robot simulator: record, replay and export runs.
+
+A recording is an append-only binary log. A short header holds the run's
+setup (start pose, robot speeds, physics rate) and the world as NPZ, and is
+followed by fixed-size records: every received, started and completed
+command and every pose the engine steps to. Because the records are fixed
+size the log can be opened with np.memmap while it is still being written.
+
+    python robotsim.py --headless --record run.rlog
+    python robotrecorder.py replay run.rlog --speed 10
+    python robotrecorder.py export run.rlog run.npz      # or run.parquet with pyarrow
+"""
+
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from robotworld import World
+
+MAGIC = b"RBTLOG\x00\x01"
+HEADER = struct.Struct("<8sIIQ")  # magic, record size, reserved, meta length
+
+RECORD_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("code", "u1"),  # Command index, or completion status
+    ("priority", "i2"),
+    ("id", "u4"),  # Command id
+    ("sim_time", "f8"),
+    ("wall_time", "f8"),
+    ("x", "f8"),  # Pose; linear and angular rates of a received velocity command
+    ("y", "f8"),
+    ("angle", "f8"),
+    ("duration", "f8")
+])
+
+# Record kinds
+POSE, RECEIVED, STARTED, COMPLETED, WORLD = range(5)
+KINDS = ("pose", "received", "started", "completed", "world")
+
+COMMANDS = ("forward", "backward", "left", "right", "velocity")
+VELOCITY = COMMANDS.index("velocity")
+UNKNOWN_COMMAND = 255
+
+# Completion codes
+DONE, FAILED, COLLIDED, CANCELLED = 0, 1, 2, 3
+STATUSES = ("done", "failed", "collided", "cancelled")
+
+
+def _command_code(command):
+    return COMMANDS.index(command) if command in COMMANDS else UNKNOWN_COMMAND
+
+
+class FlightRecorder:
+    """Appends an engine's commands and poses to a binary log.
+
+    Records are buffered in memory and written in blocks, every
+    `flush_every` records or `flush_interval` seconds, so recording costs a
+    tuple append per pose.
+    """
+
+    def __init__(self, engine, path, flush_every=1024, flush_interval=1.0):
+        self.engine = engine
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._buffer = []
+        self._last_pose = None
+        self._last_flush = time.perf_counter()
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start(self):
+        engine = self.engine
+        with engine.lock:
+            meta = {
+                "start": {"x": engine.robot_x, "y": engine.robot_y, "angle": engine.robot_angle,
+                          "sim_time": engine.sim_time},
+                "robot_size": engine.robot_size,
+                "robot_speed": engine.robot_speed,
+                "robot_turn_speed": engine.robot_turn_speed,
+                "physics_hz": 1.0 / engine.physics_dt,
+                "time_warp": engine.time_warp,
+                "created": time.time()
+            }
+            world = engine.world.to_npz_bytes()
+            meta["world_bytes"] = len(world)
+            payload = json.dumps(meta).encode()
+
+            self._file = open(self.path, "wb")
+            self._file.write(HEADER.pack(MAGIC, RECORD_DTYPE.itemsize, 0, len(payload)))
+            self._file.write(payload)
+            self._file.write(world)
+            # Align the records so the log can be memory-mapped as an array
+            self._file.write(b"\0" * (-self._file.tell() % RECORD_DTYPE.itemsize))
+            self._last_pose = (engine.robot_x, engine.robot_y, engine.robot_angle)
+            self._append((POSE, 0, 0, 0, engine.sim_time, time.time()) + self._last_pose + (0.0,))
+            engine.add_listener(self.on_event)
+            engine.recorder = self
+        return self
+
+    def _append(self, record):
+        # "received" events come from HTTP threads, so appends race with flush's swap
+        with self._lock:
+            self._buffer.append(record)
+            due = len(self._buffer) >= self.flush_every or time.perf_counter() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def record_pose(self, sim_time, x, y, angle):
+        """Called by the engine after each step; unchanged poses are skipped."""
+        pose = (x, y, angle)
+        if pose != self._last_pose:
+            self._last_pose = pose
+            self._append((POSE, 0, 0, 0, sim_time, time.time(), x, y, angle, 0.0))
+
+    def on_event(self, event, data):
+        engine = self.engine
+        now = time.time()
+        if event == "received":
+            self._append((RECEIVED, _command_code(data["command"]), data["priority"], data["id"],
+                          engine.sim_time, now, data.get("linear", 0.0), data.get("angular", 0.0), 0.0,
+                          data["duration"]))
+        elif event == "started" and "merged_into" not in data:
+            # Record what actually ran; commands folded into it by compaction are not replayed
+            run = data.get("executed_as", data)
+            self._append((STARTED, _command_code(run["command"]), data["priority"], data["id"],
+                          data["sim_start"], now, engine.robot_x, engine.robot_y, engine.robot_angle,
+                          run["duration"]))
+        elif event == "completed":
+            code = (FAILED if data["status"] == "failed" else CANCELLED if data["status"] == "cancelled"
+                    else COLLIDED if "collision" in data else DONE)
+            self._append((COMPLETED, code, data["priority"], data["id"], data["sim_end"], now,
+                          engine.robot_x, engine.robot_y, engine.robot_angle, data["duration"]))
+        elif event == "world":
+            self._append((WORLD, 0, 0, 0, engine.sim_time, now,
+                          engine.robot_x, engine.robot_y, engine.robot_angle, 0.0))
+
+    def flush(self):
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+            self._last_flush = time.perf_counter()
+            if buffer and self._file is not None:
+                self._file.write(np.array(buffer, dtype=RECORD_DTYPE).tobytes())
+                self._file.flush()
+                self.records += len(buffer)
+
+    def close(self):
+        if self.engine.recorder is self:
+            self.engine.recorder = None
+        self.engine.remove_listener(self.on_event)
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_log(path):
+    """Return (meta, world, records) with records memory-mapped from the file."""
+    with open(path, "rb") as f:
+        magic, record_size, _, meta_length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a robot simulator log")
+        meta = json.loads(f.read(meta_length))
+        world = World.from_npz_bytes(f.read(meta["world_bytes"]))
+        offset = f.tell()
+    offset += -offset % RECORD_DTYPE.itemsize
+
+    # A crash can leave a partial record at the end; map whole records only
+    count = (os.path.getsize(path) - offset) // RECORD_DTYPE.itemsize
+    if count <= 0:
+        return meta, world, np.zeros(0, dtype=RECORD_DTYPE)
+    return meta, world, np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offset, shape=(count,))
+
+
+def replay(path, speed=None, tolerance=1e-6):
+    """Feed a recorded run back through a fresh engine and diff the poses.
+
+    Each command is submitted at the simulated time it originally started;
+    the engine is then compared with every recorded pose. `speed` paces the
+    replay at that multiple of the recorded simulated time; None replays as
+    fast as possible. Replay stops at a world swap, whose new map is not
+    recorded.
+    """
+    from robotengine import HeadlessRobotEngine
+
+    meta, world, records = read_log(path)
+    start = meta["start"]
+    engine = HeadlessRobotEngine(start["x"], start["y"], start["angle"], time_warp=None, world=world,
+                                 physics_hz=meta["physics_hz"])
+    engine.robot_size = meta["robot_size"]
+    engine.robot_speed = meta["robot_speed"]
+    engine.robot_turn_speed = meta["robot_turn_speed"]
+    engine.sim_time = start["sim_time"]
+
+    wall_start = time.perf_counter()
+    errors = []
+    first_divergence = None
+    commands = 0
+    stopped = None
+    velocities = {}  # Command id -> (linear, angular), from the received records
+    replayed = {}  # Recorded command id -> id in the replay engine
+    for record in records:
+        kind = int(record["kind"])
+        if kind == RECEIVED and record["code"] == VELOCITY:
+            velocities[int(record["id"])] = (float(record["x"]), float(record["y"]))
+        if kind not in (POSE, STARTED, WORLD) and not (kind == COMPLETED and record["code"] == CANCELLED):
+            continue
+        t = float(record["sim_time"])
+        if kind == WORLD:
+            stopped = f"world replaced at t={t:.3f}"
+            break
+
+        if speed is not None:
+            delay = wall_start + (t - start["sim_time"]) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if t > engine.sim_time:
+            engine.step(t - engine.sim_time)
+
+        if kind == STARTED:
+            code = int(record["code"])
+            if code != UNKNOWN_COMMAND:
+                entry = engine.submit(COMMANDS[code], float(record["duration"]), int(record["priority"]),
+                                      velocities.get(int(record["id"])))
+                replayed[int(record["id"])] = entry["id"]
+                commands += 1
+            continue
+        if kind == COMPLETED:
+            # Stopped, cancelled or replaced at this time; queued ones never started
+            if int(record["id"]) in replayed:
+                engine.cancel(replayed[int(record["id"])])
+            continue
+
+        dx = engine.robot_x - float(record["x"])
+        dy = engine.robot_y - float(record["y"])
+        dangle = abs((engine.robot_angle - float(record["angle"]) + 180) % 360 - 180)
+        error = max(float(np.hypot(dx, dy)), dangle)
+        errors.append(error)
+        if error > tolerance and first_divergence is None:
+            first_divergence = {
+                "sim_time": t,
+                "recorded": {"x": float(record["x"]), "y": float(record["y"]), "angle": float(record["angle"])},
+                "replayed": {"x": engine.robot_x, "y": engine.robot_y, "angle": engine.robot_angle},
+                "error": error
+            }
+    else:
+        engine.run_until_idle()
+
+    errors = np.array(errors)
+    return {
+        "poses": len(errors),
+        "commands": commands,
+        "max_error": float(errors.max()) if len(errors) else 0.0,
+        "mean_error": float(errors.mean()) if len(errors) else 0.0,
+        "diverged": first_divergence is not None,
+        "first_divergence": first_divergence,
+        "sim_time": engine.sim_time - start["sim_time"],
+        "wall_time": time.perf_counter() - wall_start,
+        "stopped": stopped
+    }
+
+
+def columns(records):
+    """Split records into pose and command column dicts of NumPy arrays."""
+    records = np.asarray(records)
+    poses = records[records["kind"] == POSE]
+    pose_columns = {name: np.ascontiguousarray(poses[name]) for name in ("sim_time", "wall_time", "x", "y", "angle")}
+
+    # One row per received command, joined with its start and completion
+    received = records[records["kind"] == RECEIVED]
+    ids = received["id"]
+    command_columns = {
+        "id": np.ascontiguousarray(ids),
+        "command": np.array([COMMANDS[c] if c != UNKNOWN_COMMAND else "unknown" for c in received["code"]]),
+        "duration": np.ascontiguousarray(received["duration"]),
+        "priority": np.ascontiguousarray(received["priority"]),
+        "received_sim": np.ascontiguousarray(received["sim_time"]),
+        "received_wall": np.ascontiguousarray(received["wall_time"]),
+        "linear": np.where(received["code"] == VELOCITY, received["x"], np.nan),
+        "angular": np.where(received["code"] == VELOCITY, received["y"], np.nan)
+    }
+    for kind, prefix in ((STARTED, "started"), (COMPLETED, "completed")):
+        subset = records[records["kind"] == kind]
+        position = {int(command_id): i for i, command_id in enumerate(subset["id"])}
+        index = np.array([position.get(int(command_id), -1) for command_id in ids], dtype=np.int64)
+        found = index >= 0
+        for name in ("sim_time", "wall_time", "x", "y", "angle"):
+            column = np.full(len(ids), np.nan)
+            column[found] = subset[name][index[found]]
+            command_columns[f"{prefix}_{name}"] = column
+        if kind == COMPLETED:
+            status = np.full(len(ids), "", dtype=object)
+            status[found] = [STATUSES[c] for c in subset["code"][index[found]]]
+            command_columns["status"] = status.astype(str)
+    return pose_columns, command_columns
+
+
+def export_log(path, out):
+    """Write a log's poses and commands as columns: .npz, or .parquet with pyarrow."""
+    meta, _, records = read_log(path)
+    pose_columns, command_columns = columns(records)
+    if str(out).endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use .npz instead")
+        base = str(out)[:-len(".parquet")]
+        pq.write_table(pa.table(pose_columns), base + ".poses.parquet")
+        pq.write_table(pa.table(command_columns), base + ".commands.parquet")
+        return [base + ".poses.parquet", base + ".commands.parquet"]
+
+    arrays = {f"pose_{name}": column for name, column in pose_columns.items()}
+    arrays.update({f"command_{name}": column for name, column in command_columns.items()})
+    np.savez_compressed(out, meta=np.array(json.dumps(meta)), **arrays)
+    return [out]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay or export a robot simulator recording")
+    commands = parser.add_subparsers(dest="action", required=True)
+    replay_parser = commands.add_parser("replay", help="Re-run a recording and diff the poses")
+    replay_parser.add_argument("log")
+    replay_parser.add_argument("--speed", type=float, default=None,
+                               help="Replay at this multiple of recorded time (default: as fast as possible)")
+    replay_parser.add_argument("--tolerance", type=float, default=1e-6,
+                               help="Pose error (pixels or degrees) that counts as a divergence")
+    export_parser = commands.add_parser("export", help="Write poses and commands as columns")
+    export_parser.add_argument("log")
+    export_parser.add_argument("out", help="Output .npz, or .parquet (needs pyarrow)")
+    args = parser.parse_args()
+
+    if args.action == "replay":
+        print(json.dumps(replay(args.log, args.speed, args.tolerance), indent=2))
+    else:
+        for written in export_log(args.log, args.out):
+            print(f"Wrote {written}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Retained-mode Tk renderer for the robot simulator.
+
+The robot's canvas items are created once and moved with canvas.coords, and
+the trail is kept as a few chunked polylines whose coordinates are extended,
+so the canvas item count stays flat however long the simulator runs. Past
+max_trail_chunks the oldest chunk is deleted, so the trail's memory is
+bounded too.
+"""
+
+import math
+from collections import deque
+
+
+class RetainedRobotRenderer:
+    def __init__(self, canvas, colors, robot_size, trail_chunk=512, max_trail_chunks=200):
+        self.canvas = canvas
+        self.colors = colors
+        self.robot_size = robot_size
+        self.trail_chunk = trail_chunk  # Points per trail polyline
+        self.max_trail_chunks = max_trail_chunks  # Oldest chunks beyond this are deleted
+
+        # Robot items, created once and moved every frame
+        self.body = canvas.create_oval(0, 0, 0, 0, fill=colors["robot"], outline="black",
+                                       width=2, tags="robot")
+        self.left_eye = canvas.create_oval(0, 0, 0, 0, fill="white", outline="black", tags="robot")
+        self.right_eye = canvas.create_oval(0, 0, 0, 0, fill="white", outline="black", tags="robot")
+        self.antenna = canvas.create_line(0, 0, 0, 0, fill=colors["direction"], width=3, tags="robot")
+        self.antenna_ball = canvas.create_oval(0, 0, 0, 0, fill=colors["direction"], outline="black",
+                                               tags="robot")
+
+        # Trail state: flat [x0, y0, x1, y1, ...] for the open chunk
+        self.trail_line = None
+        self.trail_coords = []
+        self.trail_lines = deque()  # Chunk items, oldest first
+
+    def draw_robot(self, x, y, angle):
+        size = self.robot_size
+        coords = self.canvas.coords
+        coords(self.body, x - size, y - size, x + size, y + size)
+
+        # Eyes follow the heading
+        eye_size = size / 5
+        eye_offset = size / 3
+        angle_rad = math.radians(angle)
+        left_eye_x = x + math.cos(angle_rad + math.pi/4) * eye_offset
+        left_eye_y = y - math.sin(angle_rad + math.pi/4) * eye_offset
+        right_eye_x = x + math.cos(angle_rad - math.pi/4) * eye_offset
+        right_eye_y = y - math.sin(angle_rad - math.pi/4) * eye_offset
+        coords(self.left_eye, left_eye_x - eye_size, left_eye_y - eye_size,
+               left_eye_x + eye_size, left_eye_y + eye_size)
+        coords(self.right_eye, right_eye_x - eye_size, right_eye_y - eye_size,
+               right_eye_x + eye_size, right_eye_y + eye_size)
+
+        # Direction indicator (antenna)
+        antenna_length = size * 1.2
+        end_x = x + math.cos(angle_rad) * antenna_length
+        end_y = y - math.sin(angle_rad) * antenna_length
+        coords(self.antenna, x, y, end_x, end_y)
+        coords(self.antenna_ball, end_x - 4, end_y - 4, end_x + 4, end_y + 4)
+
+    def extend_path(self, x, y):
+        """Append a point to the trail, starting a new chunk when the open one is full."""
+        if self.trail_line is not None and len(self.trail_coords) >= 2 * self.trail_chunk:
+            # Close the chunk; the next one starts at its last point so the trail stays joined
+            self.trail_coords = self.trail_coords[-2:]
+            self.trail_line = None
+
+        self.trail_coords.extend((x, y))
+        if len(self.trail_coords) < 4:
+            return
+
+        if self.trail_line is None:
+            self.trail_line = self.canvas.create_line(*self.trail_coords, fill=self.colors["path"],
+                                                      width=2, tags="path")
+            self.canvas.tag_lower(self.trail_line, "robot")
+            self.trail_lines.append(self.trail_line)
+            while len(self.trail_lines) > self.max_trail_chunks:
+                self.canvas.delete(self.trail_lines.popleft())
+        else:
+            self.canvas.coords(self.trail_line, self.trail_coords)
+
+    def clear_path(self):
+        self.canvas.delete("path")
+        self.trail_line = None
+        self.trail_coords = []
+        self.trail_lines.clear()
+
+    def item_count(self):
+        return len(self.canvas.find_all())
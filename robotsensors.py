@@ -0,0 +1,93 @@
+"""Simulated range sensors (lidar / ultrasonic) for the robot simulator.
+
+A scan casts N rays from the robot's centre against the world's circles and
+rectangles and the map border. All rays are intersected with all nearby
+obstacles in one NumPy broadcast, so a 360-ray scan costs a handful of array
+operations rather than a Python loop per ray.
+"""
+
+import numpy as np
+
+
+def cast_rays(world, x, y, angles, max_range):
+    """Distance from (x, y) along each heading in `angles` (degrees) to the nearest hit.
+
+    Angles use the simulator's convention: 0 is east and positive turns
+    counter-clockwise on screen (y grows downwards). Ranges are clipped to
+    max_range.
+    """
+    theta = np.radians(np.asarray(angles, dtype=np.float64))
+    dx = np.cos(theta)[:, None]
+    dy = -np.sin(theta)[:, None]
+    ranges = np.full(len(theta), float(max_range))
+
+    # Map border, seen from inside
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx = np.where(dx > 0, (world.map_width - x) / dx, np.where(dx < 0, -x / dx, np.inf))
+        ty = np.where(dy > 0, (world.map_height - y) / dy, np.where(dy < 0, -y / dy, np.inf))
+    ranges = np.minimum(ranges, np.maximum(np.minimum(tx, ty)[:, 0], 0.0))
+
+    arrays = world.arrays()
+
+    circles = arrays["circles"]
+    if len(circles):
+        # Only obstacles that can be reached within max_range
+        fx = x - circles[:, 0]
+        fy = y - circles[:, 1]
+        near = fx * fx + fy * fy <= (max_range + circles[:, 2]) ** 2
+        if near.any():
+            fx, fy, r = fx[near], fy[near], circles[near, 2]
+            b = dx * fx + dy * fy  # (rays, circles)
+            c = fx * fx + fy * fy - r * r
+            disc = b * b - c
+            with np.errstate(invalid="ignore"):
+                root = np.sqrt(disc)
+            t = np.where(c <= 0, 0.0, -b - root)  # Inside a circle reads as 0
+            t = np.where((disc >= 0) & (t >= 0), t, np.inf)
+            ranges = np.minimum(ranges, t.min(axis=1))
+
+    rects = arrays["rects"]
+    if len(rects):
+        cx = np.clip(x, rects[:, 0], rects[:, 2])
+        cy = np.clip(y, rects[:, 1], rects[:, 3])
+        near = (cx - x) ** 2 + (cy - y) ** 2 <= max_range ** 2
+        if near.any():
+            rects = rects[near]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t0x = (rects[:, 0] - x) / dx
+                t1x = (rects[:, 2] - x) / dx
+                t0y = (rects[:, 1] - y) / dy
+                t1y = (rects[:, 3] - y) / dy
+            # Rays parallel to an axis only hit if they start within that slab
+            inside_x = (rects[:, 0] <= x) & (x <= rects[:, 2])
+            inside_y = (rects[:, 1] <= y) & (y <= rects[:, 3])
+            lo_x = np.where(dx == 0, np.where(inside_x, -np.inf, np.inf), np.minimum(t0x, t1x))
+            hi_x = np.where(dx == 0, np.where(inside_x, np.inf, -np.inf), np.maximum(t0x, t1x))
+            lo_y = np.where(dy == 0, np.where(inside_y, -np.inf, np.inf), np.minimum(t0y, t1y))
+            hi_y = np.where(dy == 0, np.where(inside_y, np.inf, -np.inf), np.maximum(t0y, t1y))
+            t_enter = np.maximum(np.maximum(lo_x, lo_y), 0.0)
+            t_exit = np.minimum(hi_x, hi_y)
+            t = np.where(t_enter <= t_exit, t_enter, np.inf)
+            ranges = np.minimum(ranges, t.min(axis=1))
+
+    return ranges
+
+
+class RangeSensor:
+    def __init__(self, rays=360, fov=360.0, max_range=300.0):
+        self.rays = rays
+        self.fov = fov  # Degrees, centred on the robot's heading
+        self.max_range = max_range
+
+    def offsets(self):
+        """Ray headings relative to the robot, in degrees."""
+        if self.fov >= 360:
+            return np.arange(self.rays) * (360.0 / self.rays)
+        if self.rays == 1:
+            return np.zeros(1)
+        return np.linspace(-self.fov / 2, self.fov / 2, self.rays)
+
+    def scan(self, world, x, y, heading):
+        """Return (ray headings relative to the robot, ranges)."""
+        offsets = self.offsets()
+        return offsets, cast_rays(world, x, y, heading + offsets, self.max_range)
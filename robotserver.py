@@ -0,0 +1,528 @@
+"""HTTP API for the robot simulator.
+
+The routes only talk to a HeadlessRobotEngine, so the same server works with
+or without the Tk viewer attached. Flask is imported when an app is created,
+so the aiohttp front end, which shares the handlers, starts without it.
+"""
+
+import json
+import math
+import queue
+import threading
+import time
+import logging
+
+from robotmetrics import CONTENT_TYPE
+from robotplanner import NoPath
+from robotqueue import QueueFull
+from robotsensors import RangeSensor
+from robottrajectory import encode_binary, encode_json
+from robotworld import World
+
+# Disable Flask's default logging to keep the console clean
+log = logging.getLogger('werkzeug')
+log.setLevel(logging.ERROR)
+
+
+def format_sse(event, data):
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_engine(engine, rate=10.0, heartbeat=15.0):
+    """Yield SSE messages: engine events as they happen, pose samples at `rate` Hz.
+
+    Pose samples are skipped while the robot is not moving; a comment line
+    is sent every `heartbeat` seconds so idle connections stay open.
+    """
+    events = queue.Queue()
+
+    def on_event(event, data):
+        events.put((event, data))
+
+    engine.add_listener(on_event)
+    try:
+        # Flush headers right away so the client knows it is subscribed
+        yield ": connected\n\n"
+
+        interval = 1.0 / rate if rate > 0 else None
+        next_pose = time.monotonic()
+        last_sent = time.monotonic()
+        last_pose = None
+        while True:
+            now = time.monotonic()
+            timeout = heartbeat - (now - last_sent)
+            if interval is not None:
+                timeout = min(timeout, next_pose - now)
+            try:
+                event, data = events.get(timeout=max(0.0, timeout))
+                yield format_sse(event, data)
+                last_sent = time.monotonic()
+                continue
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            if interval is not None and now >= next_pose:
+                next_pose = max(next_pose + interval, now)
+                status = engine.status()
+                pose = (status["position"]["x"], status["position"]["y"], status["angle"])
+                if pose != last_pose:
+                    last_pose = pose
+                    yield format_sse("pose", {"x": pose[0], "y": pose[1], "angle": pose[2],
+                                              "executing": status["executing"], "time": time.time()})
+                    last_sent = now
+            if now - last_sent >= heartbeat:
+                yield ": keep-alive\n\n"
+                last_sent = now
+    finally:
+        # Runs when the client disconnects and the generator is closed
+        engine.remove_listener(on_event)
+
+
+def parse_velocity(step):
+    """The (linear, angular) rates of a command body, or None if it has neither."""
+    if 'linear' in step or 'angular' in step:
+        return float(step.get('linear', 0.0)), float(step.get('angular', 0.0))
+    return None
+
+
+def parse_command(data):
+    """POST /command body -> (command, duration, priority, velocity). Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, not {type(data).__name__}")
+    command = data.get('command', '')
+    if not isinstance(command, str):
+        raise ValueError("'command' must be a string")
+    try:
+        return (command.lower(), float(data.get('duration', 1.0)), int(data.get('priority', 0)),
+                parse_velocity(data))
+    except (TypeError, ValueError) as e:
+        raise ValueError(str(e)) from None
+
+
+def handle_command(engine, data):
+    """POST /command body -> (payload, status_code). Shared by both server modes.
+
+    {"command": "velocity", "linear": px/s, "angular": deg/s, "duration": s}
+    drives an arc; {"command": "velocity", "segments": [{"linear": ...,
+    "angular": ..., "duration": ...}, ...]} queues a timed list of them.
+    """
+    if not data:
+        return {"error": "No data provided"}, 400
+    if isinstance(data, dict) and isinstance(data.get('segments'), list):
+        priority = data.get('priority', 0)
+        return handle_commands(engine, {"commands": [
+            dict(segment, command='velocity', priority=priority) if isinstance(segment, dict) else segment
+            for segment in data['segments']]})
+
+    try:
+        command, duration, priority, velocity = parse_command(data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    # Add command to queue, pushing back when it is full
+    try:
+        entry = engine.submit(command, duration, priority, velocity)
+    except QueueFull as e:
+        return {"error": str(e), "queue_size": len(engine.command_queue)}, 429
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    payload = {"status": "Command received", "id": entry["id"], "command": command,
+               "duration": duration, "priority": priority}
+    if "linear" in entry:
+        payload["linear"], payload["angular"] = entry["linear"], entry["angular"]
+    return payload, 200
+
+
+def handle_commands(engine, data):
+    """POST /commands body -> (payload, status_code)."""
+    if not isinstance(data, dict) or not isinstance(data.get('commands'), list) or not data['commands']:
+        return {"error": "Expected a non-empty 'commands' list"}, 400
+
+    try:
+        entries = engine.submit_many(parse_steps(data['commands']))
+    except QueueFull as e:
+        return {"error": str(e), "queue_size": len(engine.command_queue)}, 429
+    except (AttributeError, TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+
+    return {"status": "Commands received", "ids": [entry["id"] for entry in entries],
+            "commands": entries}, 200
+
+
+def parse_steps(steps):
+    """Command bodies of a plan -> (command, duration, priority, velocity) steps."""
+    return [(step.get('command', ''), step.get('duration', 1.0), step.get('priority', 0),
+             parse_velocity(step))
+            for step in steps]
+
+
+def handle_replace_commands(engine, data):
+    """PUT /commands body -> (payload, status_code).
+
+    Atomically replaces everything queued with {"commands": [...]} (an empty
+    list just clears the queue); "interrupt": true also cuts the running
+    command short.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('commands'), list):
+        return {"error": "Expected a 'commands' list"}, 400
+
+    try:
+        result = engine.replace_queue(parse_steps(data['commands']), bool(data.get('interrupt')))
+    except QueueFull as e:
+        return {"error": str(e), "queue_size": len(engine.command_queue)}, 429
+    except (AttributeError, TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+
+    return dict(result, status="Queue replaced", ids=[entry["id"] for entry in result["commands"]]), 200
+
+
+def handle_stop(engine):
+    """POST /stop -> (payload, status_code)."""
+    return dict(engine.stop(), status="Stopped"), 200
+
+
+def handle_cancel(engine, command_id):
+    """POST /cancel/<id> -> (payload, status_code)."""
+    entry = engine.cancel(command_id)
+    if entry is None:
+        return {"error": f"Unknown command id {command_id}"}, 404
+    if entry["status"] != "cancelled":
+        return {"error": f"Command {command_id} already {entry['status']}", "command": entry}, 409
+    return entry, 200
+
+
+def handle_command_status(engine, command_id):
+    """GET /commands/<id> -> (payload, status_code)."""
+    entry = engine.command_status(command_id)
+    if entry is None:
+        return {"error": f"Unknown command id {command_id}"}, 404
+    return entry, 200
+
+
+def parse_path_args(args):
+    """Query args of GET /path -> (since, limit, binary). Raises ValueError."""
+    try:
+        since = int(args.get('since', 0))
+        limit = args.get('limit')
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        raise ValueError("since and limit must be integers")
+    return since, limit, args.get('format') == 'binary'
+
+
+def handle_sensors(engine, args):
+    """GET /sensors -> (payload, status_code). ?rays=, ?fov= (degrees), ?max_range= override the defaults."""
+    default = engine.sensor
+    try:
+        rays = int(args.get('rays', default.rays))
+        fov = float(args.get('fov', default.fov))
+        max_range = float(args.get('max_range', default.max_range))
+    except ValueError:
+        return {"error": "rays must be an integer, fov and max_range numbers"}, 400
+    # Written so that NaN fails too
+    if not 1 <= rays <= 3600 or not 0 < fov <= 360 or not 0 < max_range < math.inf:
+        return {"error": "rays must be 1-3600, fov in (0, 360] and max_range positive and finite"}, 400
+
+    sensor = default
+    if (rays, fov, max_range) != (default.rays, default.fov, default.max_range):
+        sensor = RangeSensor(rays, fov, max_range)
+    return engine.scan(sensor), 200
+
+
+def handle_status(engine, args):
+    """GET /status -> payload; ?sensors=1 adds a default range scan."""
+    status = engine.status()
+    if args.get('sensors') in ('1', 'true'):
+        status["sensors"] = engine.scan()
+    return status
+
+
+def handle_set_map(engine, data=None, npz=None):
+    """POST /map -> (payload, status_code).
+
+    The body is either NPZ bytes from World.to_npz_bytes, a JSON map from
+    GET /map, or just {"seed": N} to generate the classic scenery.
+    """
+    try:
+        if npz is not None:
+            world = World.from_npz_bytes(npz)
+        elif isinstance(data, dict) and ("seed" in data or "obstacles" in data):
+            world = World.from_dict(data)
+        else:
+            return {"error": "Expected a JSON map, {\"seed\": N} or an NPZ body"}, 400
+    except (KeyError, TypeError, ValueError, OSError) as e:
+        return {"error": f"Invalid map: {e}"}, 400
+
+    engine.set_world(world)
+    return {"status": "Map loaded", "seed": world.seed, "obstacles": len(world),
+            "map_width": world.map_width, "map_height": world.map_height}, 200
+
+
+def handle_plan(engine, data, execute=False):
+    """GET/POST /plan -> (payload, status_code).
+
+    The goal is a named location (`to`) or a point (`x`, `y`). `backward=0`
+    forbids reversing. With execute, the plan is queued like POST /commands
+    and the response carries the command ids.
+    """
+    if not data:
+        return {"error": "Expected 'to' (a location name) or 'x' and 'y'"}, 400
+    try:
+        goal = data.get('to')
+        if goal is None:
+            goal = (float(data['x']), float(data['y']))
+        allow_backward = str(data.get('backward', True)).lower() not in ('0', 'false')
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return {"error": "Expected 'to' (a location name) or numeric 'x' and 'y'"}, 400
+
+    try:
+        plan = engine.plan(goal, allow_backward=allow_backward)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except KeyError:
+        return {"error": f"Unknown location '{goal}'", "locations": sorted(engine.world.locations)}, 404
+    except NoPath as e:
+        return {"error": str(e)}, 422
+
+    if execute and plan["commands"]:
+        try:
+            entries = engine.submit_many([(step["command"], step["duration"]) for step in plan["commands"]])
+        except QueueFull as e:
+            return {"error": str(e), "queue_size": len(engine.command_queue)}, 429
+        plan["ids"] = [entry["id"] for entry in entries]
+    return plan, 200
+
+
+def handle_add_location(engine, data):
+    """POST /locations {"name", "x", "y"} -> (payload, status_code)."""
+    try:
+        name = str(data['name'])
+        x, y = float(data['x']), float(data['y'])
+    except (KeyError, TypeError, ValueError):
+        return {"error": "Expected 'name' and numeric 'x' and 'y'"}, 400
+    engine.world.add_location(name, x, y)
+    return {"status": "Location saved", "name": name, "x": x, "y": y}, 200
+
+
+def http_metrics(engine):
+    """(latency histogram, response counter) for per-route HTTP metrics on an engine."""
+    return (engine.metrics.histogram("robot_http_request_seconds", "HTTP handler latency by route",
+                                     labels=("method", "route")),
+            engine.metrics.counter("robot_http_responses_total", "HTTP responses by route and status",
+                                   labels=("method", "route", "code")))
+
+
+def handle_health(engine, started):
+    """GET /health -> (payload, status_code). Answers without taking the engine lock."""
+    return {"status": "ok", "uptime": time.time() - started, "sim_time": engine.sim_time}, 200
+
+
+def parse_stream_rate(args):
+    """?rate= of GET /stream, capped at 100 Hz. Raises ValueError."""
+    try:
+        return min(float(args.get('rate', 10.0)), 100.0)
+    except ValueError:
+        raise ValueError("rate must be a number")
+
+
+def create_app(engine):
+    """Create the Flask app serving /command and /status for an engine."""
+    from flask import Flask, Response, g, request, jsonify
+
+    app = Flask(__name__)
+    latency, responses = http_metrics(engine)
+    started = time.time()
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        # Label by route pattern, not path, so /commands/<id> stays one series
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        latency.labels(request.method, route).observe(time.perf_counter() - g.request_start)
+        responses.labels(request.method, route, str(response.status_code)).inc()
+        return response
+
+    @app.route('/health', methods=['GET'])
+    def get_health():
+        payload, status = handle_health(engine, started)
+        return jsonify(payload), status
+
+    @app.route('/command', methods=['POST'])
+    def receive_command():
+        payload, status = handle_command(engine, request.get_json(silent=True))
+        return jsonify(payload), status
+
+    @app.route('/commands', methods=['POST'])
+    def receive_commands():
+        """Queue a whole plan: {"commands": [{"command": ..., "duration": ...}, ...]}."""
+        payload, status = handle_commands(engine, request.get_json(silent=True))
+        return jsonify(payload), status
+
+    @app.route('/commands', methods=['PUT'])
+    def replace_commands():
+        """Replace the queue: {"commands": [...], "interrupt": false}."""
+        payload, status = handle_replace_commands(engine, request.get_json(silent=True))
+        return jsonify(payload), status
+
+    @app.route('/stop', methods=['POST'])
+    def stop():
+        payload, status = handle_stop(engine)
+        return jsonify(payload), status
+
+    @app.route('/cancel/<int:command_id>', methods=['POST'])
+    def cancel_command(command_id):
+        payload, status = handle_cancel(engine, command_id)
+        return jsonify(payload), status
+
+    @app.route('/commands/<int:command_id>', methods=['GET'])
+    def get_command(command_id):
+        payload, status = handle_command_status(engine, command_id)
+        return jsonify(payload), status
+
+    @app.route('/status', methods=['GET'])
+    def get_status():
+        return jsonify(handle_status(engine, request.args))
+
+    @app.route('/sensors', methods=['GET'])
+    def get_sensors():
+        payload, status = handle_sensors(engine, request.args)
+        return jsonify(payload), status
+
+    @app.route('/stream', methods=['GET'])
+    def get_stream():
+        """Server-sent events: pose at ?rate= Hz (0 = events only), plus command events."""
+        try:
+            rate = parse_stream_rate(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return Response(stream_engine(engine, rate), mimetype='text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.route('/path', methods=['GET'])
+    def get_path():
+        """Trajectory samples from ?since=<cursor>, at most ?limit=, as JSON or ?format=binary."""
+        try:
+            since, limit, binary = parse_path_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        first_seq, next_cursor, records = engine.path.since(since, limit)
+        if binary:
+            return Response(encode_binary(first_seq, next_cursor, records),
+                            mimetype='application/octet-stream')
+        return jsonify(encode_json(first_seq, next_cursor, records))
+
+    @app.route('/plan', methods=['GET'])
+    def get_plan():
+        """Route to ?to=<location> or ?x=&y= as forward/left/right/backward steps."""
+        payload, status = handle_plan(engine, request.args)
+        return jsonify(payload), status
+
+    @app.route('/plan', methods=['POST'])
+    def post_plan():
+        """Same as GET with a JSON body; {"execute": true} also queues the plan."""
+        data = request.get_json(silent=True)
+        payload, status = handle_plan(engine, data, execute=isinstance(data, dict) and bool(data.get('execute')))
+        return jsonify(payload), status
+
+    @app.route('/locations', methods=['GET'])
+    def get_locations():
+        return jsonify(engine.world.locations)
+
+    @app.route('/locations', methods=['POST'])
+    def add_location():
+        payload, status = handle_add_location(engine, request.get_json(silent=True))
+        return jsonify(payload), status
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        """Counters and histograms in the Prometheus text format."""
+        return Response(engine.metrics.render(), content_type=CONTENT_TYPE)
+
+    @app.route('/map', methods=['GET'])
+    def get_map():
+        """The current world as JSON, or ?format=npz for the binary form."""
+        if request.args.get('format') == 'npz':
+            return Response(engine.world.to_npz_bytes(), mimetype='application/octet-stream')
+        return jsonify(engine.world.to_dict())
+
+    @app.route('/map', methods=['POST'])
+    def set_map():
+        if request.mimetype == 'application/octet-stream':
+            payload, status = handle_set_map(engine, npz=request.get_data())
+        else:
+            payload, status = handle_set_map(engine, request.get_json(silent=True))
+        return jsonify(payload), status
+
+    return app
+
+
+def create_fleet_app(fleet):
+    """Create the Flask app for a FleetEngine; routes take a robot_id."""
+    from flask import Flask, request, jsonify
+
+    app = Flask(__name__)
+    started = time.time()
+
+    @app.route('/health', methods=['GET'])
+    def get_health():
+        payload, status = handle_health(fleet, started)
+        return jsonify(payload), status
+
+    @app.route('/command', methods=['POST'])
+    def receive_command():
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        try:
+            command, duration, _, _ = parse_command(data)
+            result = fleet.submit(data.get('robot_id', 0), command, duration)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"status": "Command received", **result})
+
+    @app.route('/status', methods=['GET'])
+    def get_status():
+        try:
+            return jsonify(fleet.status(request.args.get('robot_id', 0)))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.route('/fleet/status', methods=['GET'])
+    def get_fleet_status():
+        return jsonify(fleet.fleet_status())
+
+    return app
+
+
+def start_server(app, host='0.0.0.0', port=5000, ready=None):
+    """Run the Flask app in a daemon thread and return the thread.
+
+    The port is bound before this returns, so requests can be sent right
+    away; `ready`, a threading.Event, is set then. If the port cannot be
+    bound the error is printed, `ready` stays clear and None is returned.
+    """
+    from werkzeug.serving import make_server
+
+    try:
+        server = make_server(host, port, app, threaded=True)
+    except OSError as e:
+        print(f"Server error: {e}")
+        return None
+    except SystemExit:  # werkzeug exits instead of raising when the port is taken
+        print(f"Server error: port {port} is already in use")
+        return None
+
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    if ready is not None:
+        ready.set()
+    return server_thread
@@ -1,42 +1,42 @@
-import tkinter as tk
-from tkinter import Canvas, Frame, Label, Button
+import argparse
+import queue
 import threading
 import time
-import math
 import random
-from flask import Flask, request, jsonify
-import logging
+from robotengine import HeadlessRobotEngine
+from robotrenderer import RetainedRobotRenderer
+from robottrajectory import TrajectoryStore
+from robotworld import World
+from robotserver import create_app, create_fleet_app, start_server
 
-# Disable Flask's default logging to keep the console clean
-log = logging.getLogger('werkzeug')
-log.setLevel(logging.ERROR)
+try:
+    import tkinter as tk
+    from tkinter import Canvas, Frame, Label, Button
+except ImportError:  # Headless installs may not ship Tk
+    tk = None
 
 class OptimizedRobotSimulator:
-    def __init__(self, root):
+    """Tk viewer attached to a HeadlessRobotEngine."""
+
+    def __init__(self, root, engine=None, port=5000, server="flask", render_hz=30):
         self.root = root
         self.root.title("Robot Simulator")
         self.root.geometry("800x700")
         
-        # Robot properties
-        self.robot_x = 250  # Starting X position
-        self.robot_y = 250  # Starting Y position
-        self.robot_angle = 0  # 0 degrees = facing right/east
-        self.robot_size = 20  # Size of the robot
-        self.robot_speed = 50  # Pixels per second
-        self.robot_turn_speed = 90  # Degrees per second
+        # The engine owns pose, queue and kinematics; the window only draws it
+        self.engine = engine if engine is not None else HeadlessRobotEngine()
+        self.robot_size = self.engine.robot_size
         
         # Map properties
-        self.map_width = 600
-        self.map_height = 500
-        self.grid_size = 50
+        self.map_width = self.engine.map_width
+        self.map_height = self.engine.map_height
+        self.grid_size = self.engine.grid_size
         
-        # Command queue and timing
-        self.command_queue = []
-        self.executing_command = False
         self.server_running = False
-        self.path_points = []  # Store robot's path
-        self.command_start_time = 0  # Track when command started
-        self.command_duration = 0  # Current command duration
+        self.test_ids = []  # Command ids of the running test sequence
+        self.port = port
+        self.server = server
+        self.ready_text = f"Robot Simulator Ready - Listening on http://localhost:{port}"
         
         # Colors
         self.colors = {
@@ -58,18 +58,48 @@ class OptimizedRobotSimulator:
         # Create UI
         self.setup_ui()
         
-        # Add decorative elements
-        self.add_decorations()
+        # An unseeded engine gets random scenery before anything can drive into it
+        if not self.engine.world.obstacles:
+            self.engine.world.add_random_obstacles(self.robot_x, self.robot_y)
         
         # Start HTTP server in a separate thread
         self.start_server()
         
-        # Start command processing
-        self.process_commands()
+        # Physics runs at its fixed rate on its own thread; the window only
+        # redraws render_hz times a second, interpolating between steps
+        self.events = queue.SimpleQueue()  # Engine events, handled on the Tk thread
+        self.engine.add_listener(self.on_engine_event)
+        self.last_drawn_pose = None
+        self.render_interval = max(1, int(1000 / render_hz))
+        self.frame_time = self.engine.metrics.histogram(
+            "robot_frame_seconds", "Time spent drawing one Tk frame")
+        self.canvas_items = self.engine.metrics.gauge(
+            "robot_canvas_items", "Items on the Tk canvas, sampled once a second")
+        self.items_sampled_at = 0.0
+        self.stop_event = threading.Event()
+        threading.Thread(target=self.engine.run_forever, args=(self.stop_event,), daemon=True).start()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.render_frame()
+        
+        # The scenery is only drawn once the window is up; the server and
+        # physics are already running by then
+        self.root.after_idle(self.add_decorations)
         
         # Create test client
         self.create_test_client()
         
+    @property
+    def robot_x(self):
+        return self.engine.robot_x
+
+    @property
+    def robot_y(self):
+        return self.engine.robot_y
+
+    @property
+    def robot_angle(self):
+        return self.engine.robot_angle
+
     def setup_ui(self):
         # Main frame
         main_frame = Frame(self.root, bg=self.colors["bg"])
@@ -148,33 +178,34 @@ class OptimizedRobotSimulator:
         # Draw grid
         self.draw_grid()
         
+        # Robot and trail items are created once and moved every frame
+        self.renderer = RetainedRobotRenderer(self.canvas, self.colors, self.robot_size)
+        
         # Draw robot
         self.draw_robot()
         
     def add_decorations(self):
-        # Add trees around the map (simple green circles)
-        for _ in range(8):
-            x = random.randint(50, self.map_width - 50)
-            y = random.randint(50, self.map_height - 50)
-            # Make sure trees don't overlap with the robot's starting position
-            if abs(x - self.robot_x) > 50 or abs(y - self.robot_y) > 50:
-                self.draw_tree(x, y)
-        
-        # Add houses (simple rectangles)
-        for _ in range(3):
-            x = random.randint(80, self.map_width - 80)
-            y = random.randint(80, self.map_height - 80)
-            # Make sure houses don't overlap with the robot's starting position
-            if abs(x - self.robot_x) > 80 or abs(y - self.robot_y) > 80:
-                self.draw_house(x, y)
-        
-        # Add some grass patches
+        # Trees and houses are real obstacles in the engine's world
+        world = self.engine.world
+        for obstacle in world.obstacles:
+            if obstacle.kind == "tree":
+                self.draw_tree(obstacle.x, obstacle.y)
+            elif obstacle.kind == "house":
+                self.draw_house(obstacle.x, obstacle.y)
+            else:
+                self.draw_obstacle(obstacle)
+        
+        # Add some grass patches, the same ones every time for a seeded world
+        rng = random.Random(world.seed) if world.seed is not None else random
         for _ in range(15):
-            x = random.randint(20, self.map_width - 20)
-            y = random.randint(20, self.map_height - 20)
-            size = random.randint(10, 25)
+            x = rng.randint(20, self.map_width - 20)
+            y = rng.randint(20, self.map_height - 20)
+            size = rng.randint(10, 25)
             self.canvas.create_oval(x-size/2, y-size/2, x+size/2, y+size/2, 
                                    fill=self.colors["grass"], outline="", tags="decoration")
+        
+        # Keep the retained robot items above the scenery
+        self.canvas.tag_raise("robot")
     
     def draw_tree(self, x, y):
         # Draw tree trunk
@@ -238,269 +269,120 @@ class OptimizedRobotSimulator:
             fill="#ADD8E6", outline="black", tags="decoration"
         )
         
+    def draw_obstacle(self, obstacle):
+        # Plain shape for obstacle kinds loaded from a map file
+        x0, y0 = obstacle.x - obstacle.half_w, obstacle.y - obstacle.half_h
+        x1, y1 = obstacle.x + obstacle.half_w, obstacle.y + obstacle.half_h
+        if obstacle.shape == "circle":
+            self.canvas.create_oval(x0, y0, x1, y1, fill=self.colors["tree"], outline="", tags="decoration")
+        else:
+            self.canvas.create_rectangle(x0, y0, x1, y1, fill=self.colors["house"], outline="black",
+                                         tags="decoration")
+        
     def draw_grid(self):
         # Draw vertical grid lines
         for x in range(0, self.map_width + 1, self.grid_size):
-            self.canvas.create_line(x, 0, x, self.map_height, fill=self.colors["grid"], dash=(4, 4))
+            self.canvas.create_line(x, 0, x, self.map_height, fill=self.colors["grid"], dash=(4, 4), tags="grid")
             
         # Draw horizontal grid lines
         for y in range(0, self.map_height + 1, self.grid_size):
-            self.canvas.create_line(0, y, self.map_width, y, fill=self.colors["grid"], dash=(4, 4))
+            self.canvas.create_line(0, y, self.map_width, y, fill=self.colors["grid"], dash=(4, 4), tags="grid")
             
         # Draw border
         self.canvas.create_rectangle(2, 2, self.map_width-2, self.map_height-2, 
-                                    outline=self.colors["border"], width=3)
+                                    outline=self.colors["border"], width=3, tags="grid")
     
-    def draw_robot(self):
-        # Clear previous robot
-        self.canvas.delete("robot")
-        
-        # Draw robot body (circle)
-        self.canvas.create_oval(
-            self.robot_x - self.robot_size,
-            self.robot_y - self.robot_size,
-            self.robot_x + self.robot_size,
-            self.robot_y + self.robot_size,
-            fill=self.colors["robot"], outline="black", width=2, tags="robot"
-        )
-        
-        # Draw robot face (cute eyes and smile)
-        eye_size = self.robot_size / 5
-        eye_offset = self.robot_size / 3
-        
-        # Calculate eye positions based on robot angle
-        angle_rad = math.radians(self.robot_angle)
-        left_eye_x = self.robot_x + math.cos(angle_rad + math.pi/4) * eye_offset
-        left_eye_y = self.robot_y - math.sin(angle_rad + math.pi/4) * eye_offset
-        right_eye_x = self.robot_x + math.cos(angle_rad - math.pi/4) * eye_offset
-        right_eye_y = self.robot_y - math.sin(angle_rad - math.pi/4) * eye_offset
-        
-        # Draw eyes
-        self.canvas.create_oval(
-            left_eye_x - eye_size, left_eye_y - eye_size,
-            left_eye_x + eye_size, left_eye_y + eye_size,
-            fill="white", outline="black", tags="robot"
-        )
-        
-        self.canvas.create_oval(
-            right_eye_x - eye_size, right_eye_y - eye_size,
-            right_eye_x + eye_size, right_eye_y + eye_size,
-            fill="white", outline="black", tags="robot"
-        )
-        
-        # Draw direction indicator (antenna)
-        antenna_length = self.robot_size * 1.2
-        end_x = self.robot_x + math.cos(angle_rad) * antenna_length
-        end_y = self.robot_y - math.sin(angle_rad) * antenna_length
-        
-        self.canvas.create_line(
-            self.robot_x, self.robot_y, end_x, end_y,
-            fill=self.colors["direction"], width=3, tags="robot"
-        )
-        
-        # Draw antenna ball
-        self.canvas.create_oval(
-            end_x - 4, end_y - 4,
-            end_x + 4, end_y + 4,
-            fill=self.colors["direction"], outline="black", tags="robot"
-        )
+    def redraw_world(self):
+        # A new map was loaded: rebuild the scenery and restart the trail
+        self.map_width = self.engine.map_width
+        self.map_height = self.engine.map_height
+        self.canvas.config(width=self.map_width, height=self.map_height)
+        self.canvas.delete("decoration", "grid")
+        self.draw_grid()
+        self.add_decorations()
+        self.renderer.clear_path()
+        self.renderer.extend_path(self.robot_x, self.robot_y)
+    
+    def draw_robot(self, pose=None):
+        x, y, angle = pose if pose is not None else (self.robot_x, self.robot_y, self.robot_angle)
+        self.renderer.draw_robot(x, y, angle)
         
         # Update position label
-        self.position_label.config(text=f"Position: ({int(self.robot_x)}, {int(self.robot_y)}), Angle: {int(self.robot_angle)}°")
+        self.position_label.config(text=f"Position: ({int(x)}, {int(y)}), Angle: {int(angle)}°")
     
-    def update_path(self):
-        # Add current position to path
-        self.path_points.append((self.robot_x, self.robot_y))
-        
-        # Draw path line
-        if len(self.path_points) > 1:
-            p1 = self.path_points[-2]
-            p2 = self.path_points[-1]
-            self.canvas.create_line(p1[0], p1[1], p2[0], p2[1],
-                                   fill=self.colors["path"], width=2, tags="path")
+    def update_path(self, pose=None):
+        # The engine records the trajectory; the window only draws the trail
+        x, y = pose[:2] if pose is not None else (self.robot_x, self.robot_y)
+        self.renderer.extend_path(x, y)
     
     def start_server(self):
-        # Create Flask app
-        app = Flask(__name__)
-        
-        @app.route('/command', methods=['POST'])
-        def receive_command():
-            data = request.json
-            if not data:
-                return jsonify({"error": "No data provided"}), 400
-            
-            command = data.get('command', '').lower()
-            duration = float(data.get('duration', 1.0))
-            
-            # Add command to queue
-            self.command_queue.append((command, duration))
-            
-            # Update command label
-            self.root.after(0, lambda: self.command_label.config(
-                text=f"Received command: {command} for {duration}s"))
-            
-            return jsonify({"status": "Command received", "command": command, "duration": duration})
-        
-        @app.route('/status', methods=['GET'])
-        def get_status():
-            return jsonify({
-                "position": {"x": self.robot_x, "y": self.robot_y},
-                "angle": self.robot_angle,
-                "queue_size": len(self.command_queue),
-                "executing": self.executing_command
-            })
-        
-        # Start server in a thread
-        def run_server():
-            try:
-                app.run(host='0.0.0.0', port=5000)
-            except Exception as e:
-                print(f"Server error: {e}")
-        
-        server_thread = threading.Thread(target=run_server, daemon=True)
-        server_thread.start()
-        
-        # Wait a bit for the server to start
-        time.sleep(1)
-        self.server_running = True
-        self.status_label.config(text="Robot Simulator Ready - Listening on http://localhost:5000")
+        # Serve the engine over HTTP in a separate thread; the port is bound when this returns
+        ready = threading.Event()
+        serve_engine(self.engine, port=self.port, server=self.server, ready=ready)
+        self.server_running = ready.is_set()
+        self.status_label.config(text=self.ready_text if self.server_running
+                                 else f"Server failed to start on port {self.port}")
     
-    def process_commands(self):
-        if self.command_queue and not self.executing_command:
-            self.executing_command = True
-            command, duration = self.command_queue.pop(0)
-            
-            # Execute command
-            self.execute_command(command, duration)
-        
-        # Update timer if a command is executing
-        if self.executing_command:
-            elapsed = time.time() - self.command_start_time
-            if elapsed <= self.command_duration:
-                self.timer_label.config(text=f"Timer: {elapsed:.1f}s / {self.command_duration:.1f}s")
-            
-        # Check again after 50ms (more responsive)
-        self.root.after(50, self.process_commands)
+    def on_engine_event(self, event, data):
+        # Events fire on the physics and HTTP threads; Tk is only touched from render_frame
+        self.events.put((event, data))
     
-    def execute_command(self, command, duration):
-        # Update status
-        self.status_label.config(text=f"Executing: {command} for {duration}s")
-        
-        # Store command start time and duration
-        self.command_start_time = time.time()
-        self.command_duration = duration
-        
-        # Execute the command based on type
-        if command == "forward":
-            self.execute_movement(duration, 1)
-        elif command == "backward":
-            self.execute_movement(duration, -1)
-        elif command == "left":
-            self.execute_turn(duration, 1)
-        elif command == "right":
-            self.execute_turn(duration, -1)
-        else:
-            print(f"Unknown command: {command}")
-            self.executing_command = False
-            self.status_label.config(text="Robot Simulator Ready - Listening on http://localhost:5000")
-            self.timer_label.config(text="Timer: 0.0s")
-    
-    def execute_movement(self, duration, direction):
-        """Improved movement execution with precise timing"""
-        # Calculate total distance to move
-        total_distance = self.robot_speed * duration
-        angle_rad = math.radians(self.robot_angle)
-        
-        # Calculate target position
-        target_x = self.robot_x + math.cos(angle_rad) * total_distance * direction
-        target_y = self.robot_y - math.sin(angle_rad) * total_distance * direction
-        
-        # Keep target within bounds
-        target_x = max(self.robot_size, min(self.map_width - self.robot_size, target_x))
-        target_y = max(self.robot_size, min(self.map_height - self.robot_size, target_y))
-        
-        # Start the animation
-        self.animate_movement(target_x, target_y, duration)
-    
-    def animate_movement(self, target_x, target_y, duration):
-        """Animate movement with precise timing"""
-        start_time = time.time()
-        start_x = self.robot_x
-        start_y = self.robot_y
-        
-        def update_position():
-            # Calculate progress (0.0 to 1.0)
-            elapsed = time.time() - start_time
-            progress = min(elapsed / duration, 1.0)
-            
-            # Update position with linear interpolation
-            self.robot_x = start_x + (target_x - start_x) * progress
-            self.robot_y = start_y + (target_y - start_y) * progress
-            
-            # Update path and robot
-            self.update_path()
-            self.draw_robot()
-            
-            # Continue animation if not complete
-            if progress < 1.0:
-                self.root.after(16, update_position)  # ~60fps
-            else:
-                # Ensure final position is exact
-                self.robot_x = target_x
-                self.robot_y = target_y
-                self.draw_robot()
-                
-                # Command complete
-                self.executing_command = False
-                self.status_label.config(text="Robot Simulator Ready - Listening on http://localhost:5000")
+    def handle_events(self):
+        received = None
+        while True:
+            try:
+                event, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event == "received":
+                received = data  # Only the latest is shown
+            elif event == "started":
+                self.status_label.config(text=f"Executing: {data['command']} for {data['duration']}s")
+            elif event == "world":
+                self.redraw_world()
+            elif event == "completed":
+                self.status_label.config(text=self.ready_text)
                 self.timer_label.config(text="Timer: 0.0s")
-        
-        # Start the animation
-        update_position()
-    
-    def execute_turn(self, duration, direction):
-        """Improved turning execution with precise timing"""
-        # Calculate total angle change
-        total_angle_change = self.robot_turn_speed * duration * direction
-        target_angle = (self.robot_angle + total_angle_change) % 360
-        
-        # Start the animation
-        self.animate_turn(target_angle, duration)
+                if data["id"] in self.test_ids:
+                    done = self.test_ids.index(data["id"]) + 1
+                    if done == len(self.test_ids):
+                        self.test_result_label.config(text="Test sequence completed!")
+                    else:
+                        self.test_result_label.config(
+                            text=f"Completed command {done}/{len(self.test_ids)}: {data['command']} for {data['duration']}s")
+        if received is not None:
+            self.command_label.config(text=f"Received command: {received['command']} for {received['duration']}s")
     
-    def animate_turn(self, target_angle, duration):
-        """Animate turning with precise timing"""
-        start_time = time.time()
-        start_angle = self.robot_angle
-        angle_diff = (target_angle - start_angle) % 360
-        if angle_diff > 180:
-            angle_diff -= 360
-        
-        def update_angle():
-            # Calculate progress (0.0 to 1.0)
-            elapsed = time.time() - start_time
-            progress = min(elapsed / duration, 1.0)
-            
-            # Update angle with linear interpolation
-            self.robot_angle = (start_angle + angle_diff * progress) % 360
-            
-            # Update robot
-            self.draw_robot()
-            
-            # Continue animation if not complete
-            if progress < 1.0:
-                self.root.after(16, update_angle)  # ~60fps
-            else:
-                # Ensure final angle is exact
-                self.robot_angle = target_angle
-                self.draw_robot()
-                
-                # Command complete
-                self.executing_command = False
-                self.status_label.config(text="Robot Simulator Ready - Listening on http://localhost:5000")
-                self.timer_label.config(text="Timer: 0.0s")
+    def render_frame(self):
+        """Draw the robot between the last two physics states; never steps the engine."""
+        start = time.perf_counter()
+        self.handle_events()
+        
+        pose = self.engine.interpolated_pose()
+        if pose != self.last_drawn_pose:
+            if self.last_drawn_pose is None or pose[:2] != self.last_drawn_pose[:2]:
+                self.update_path(pose)
+            self.draw_robot(pose)
+            self.last_drawn_pose = pose
         
-        # Start the animation
-        update_angle()
+        # Update timer if a command is executing
+        if self.engine.executing_command:
+            elapsed = self.engine.sim_time - self.engine.command_start_time
+            if elapsed <= self.engine.command_duration:
+                self.timer_label.config(text=f"Timer: {elapsed:.1f}s / {self.engine.command_duration:.1f}s")
+        
+        # Counting canvas items walks the whole canvas, so only sample it
+        if start - self.items_sampled_at >= 1.0:
+            self.canvas_items.set(self.renderer.item_count())
+            self.items_sampled_at = start
+        self.frame_time.observe(time.perf_counter() - start)
+        
+        self.root.after(self.render_interval, self.render_frame)
+    
+    def close(self):
+        self.stop_event.set()
+        self.engine.command_queue.notify()
+        self.root.destroy()
     
     def create_test_client(self):
         # Create a frame for test client
@@ -535,27 +417,18 @@ class OptimizedRobotSimulator:
             ("forward", 1.0)
         ]
         
-        # Add commands to queue with a delay between them
-        def add_command(index):
-            if index < len(commands):
-                command, duration = commands[index]
-                self.add_test_command(command, duration)
-                self.test_result_label.config(text=f"Sending command {index+1}/{len(commands)}: {command} for {duration}s")
-                self.root.after(int((duration + 0.2) * 1000), lambda: add_command(index + 1))
-            else:
-                self.test_result_label.config(text="Test sequence completed!")
-        
-        # Start the sequence
-        add_command(0)
+        # Queue the whole plan at once; progress is reported as steps complete
+        entries = self.engine.submit_many(commands)
+        self.test_ids = [entry["id"] for entry in entries]
+        self.test_result_label.config(text=f"Sent {len(commands)} commands")
     
     def add_test_command(self, command, duration=None):
         # Get duration from dropdown if not specified
         if duration is None:
             duration = float(self.duration_var.get())
             
-        # Add command directly to queue (simulating HTTP request)
-        self.command_queue.append((command, duration))
-        self.command_label.config(text=f"Added command: {command} for {duration}s")
+        # Add command directly to the engine (simulating HTTP request)
+        self.engine.submit(command, duration)
 
 # Function to send HTTP commands to the robot
 def send_command(command, duration):
@@ -573,6 +446,118 @@ def send_command(command, duration):
         print("Make sure the simulator is running before sending commands.")
         return {"error": "Connection failed"}
 
+# Function to send a whole plan in one request; returns one command id per step
+def send_commands(commands):
+    import requests
+    url = "http://localhost:5000/commands"
+    data = {"commands": [{"command": command, "duration": duration} for command, duration in commands]}
+    try:
+        response = requests.post(url, json=data)
+        return response.json()
+    except requests.exceptions.ConnectionError:
+        print("Connection error: Could not connect to the robot simulator.")
+        print("Make sure the simulator is running before sending commands.")
+        return {"error": "Connection failed"}
+
+# Function to ask the simulator for a route to a named location or an (x, y) point.
+# With execute=True the route is queued right away and the reply carries its command ids.
+def plan_route(goal, execute=False):
+    import requests
+    url = "http://localhost:5000/plan"
+    data = {"to": goal} if isinstance(goal, str) else {"x": goal[0], "y": goal[1]}
+    data["execute"] = execute
+    try:
+        response = requests.post(url, json=data)
+        return response.json()
+    except requests.exceptions.ConnectionError:
+        print("Connection error: Could not connect to the robot simulator.")
+        return {"error": "Connection failed"}
+
+# Function to get the state of one command (queued/running/done/failed)
+def get_command_status(command_id):
+    import requests
+    url = f"http://localhost:5000/commands/{command_id}"
+    try:
+        response = requests.get(url)
+        return response.json()
+    except requests.exceptions.ConnectionError:
+        print("Connection error: Could not connect to the robot simulator.")
+        return {"error": "Connection failed"}
+
+# Function to wait until a command has finished running
+def wait_for_command(command_id, poll_interval=0.05, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = get_command_status(command_id)
+        if "error" in status or status["status"] in ("done", "failed", "cancelled"):
+            return status
+        time.sleep(poll_interval)
+    return {"error": f"Timed out waiting for command {command_id}"}
+
+# Function to halt the robot where it is and drop every queued command
+def stop_robot():
+    import requests
+    try:
+        response = requests.post("http://localhost:5000/stop")
+        return response.json()
+    except requests.exceptions.ConnectionError:
+        print("Connection error: Could not connect to the robot simulator.")
+        return {"error": "Connection failed"}
+
+# Function to cancel one queued or running command
+def cancel_command(command_id):
+    import requests
+    try:
+        response = requests.post(f"http://localhost:5000/cancel/{command_id}")
+        return response.json()
+    except requests.exceptions.ConnectionError:
+        print("Connection error: Could not connect to the robot simulator.")
+        return {"error": "Connection failed"}
+
+# Function to swap the queued commands for a new plan in one step.
+# With interrupt=True the running command is cut short as well.
+def replace_commands(commands, interrupt=False):
+    import requests
+    data = {"commands": [{"command": command, "duration": duration} for command, duration in commands],
+            "interrupt": interrupt}
+    try:
+        response = requests.put("http://localhost:5000/commands", json=data)
+        return response.json()
+    except requests.exceptions.ConnectionError:
+        print("Connection error: Could not connect to the robot simulator.")
+        return {"error": "Connection failed"}
+
+# Function to subscribe to the simulator's event stream.
+# Returns a generator of (event, data) tuples; the subscription is live on return.
+# If the simulator cannot be reached or goes away, the stream ends with an "error" event.
+def stream_events(rate=10.0):
+    import json
+    import requests
+    url = f"http://localhost:5000/stream?rate={rate}"
+    try:
+        response = requests.get(url, stream=True, timeout=(5, None))
+    except requests.exceptions.ConnectionError:
+        print("Connection error: Could not connect to the robot simulator.")
+        print("Make sure the simulator is running before subscribing to events.")
+        return iter([("error", {"error": "Connection failed"})])
+    
+    def events():
+        try:
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: ") and event is not None:
+                    yield event, json.loads(line[len("data: "):])
+                    event = None
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            print("Connection error: Lost the connection to the robot simulator.")
+            yield "error", {"error": "Connection lost"}
+        finally:
+            response.close()
+    
+    return events()
+
 # Function to get robot status
 def get_status():
     import requests
@@ -587,8 +572,6 @@ def get_status():
 
 # Example of how to use the HTTP client from another Python script
 def example_control_sequence():
-    import time
-    
     # Example sequence of commands
     commands = [
         ("forward", 2.0),
@@ -598,24 +581,130 @@ def example_control_sequence():
         ("backward", 1.0)
     ]
     
-    # Execute commands with a delay between them
-    for command, duration in commands:
-        print(f"Sending command: {command} for {duration}s")
-        result = send_command(command, duration)
-        print(f"Response: {result}")
-        
-        # Wait for the command to complete (duration + a small buffer)
-        time.sleep(duration + 0.2)
+    # Subscribe before sending so no completion event is missed
+    events = stream_events(rate=0)
+    
+    # Send the whole plan in one request
+    print(f"Sending {len(commands)} commands")
+    result = send_commands(commands)
+    print(f"Response: {result}")
+    if "error" in result:
+        return
+    
+    # React to completions as the simulator pushes them
+    remaining = set(result["ids"])
+    for event, data in events:
+        if event != "completed" or data["id"] not in remaining:
+            continue
+        remaining.discard(data["id"])
+        print(f"Command {data['id']}: {data['command']} {data['status']} "
+              f"in {data['finished_at'] - data['started_at']:.2f}s")
         
         # Get and print the robot's status
         status = get_status()
         if "error" not in status:
             print(f"Robot status: Position: ({status['position']['x']:.1f}, {status['position']['y']:.1f}), Angle: {status['angle']:.1f}°")
         print("-" * 50)
+        if not remaining:
+            break
+    events.close()
     
     print("Command sequence completed!")
 
+def parse_time_warp(value):
+    """Parse --time-warp; 'max' steps as fast as possible."""
+    if value.lower() in ("max", "inf", "unbounded"):
+        return None
+    warp = float(value)
+    if warp <= 0:
+        raise argparse.ArgumentTypeError("time warp must be positive or 'max'")
+    return warp
+
+def serve_engine(engine, port=5000, server="flask", ready=None):
+    """Start the HTTP front end for an engine in a background thread.
+
+    server is "flask" (development server) or "aiohttp" (async, keep-alive).
+    Fleets are only served by Flask. Returns once the port is bound, and
+    sets `ready` (a threading.Event) if it was.
+    """
+    if server == "aiohttp":
+        from robotasyncserver import create_async_app, start_async_server
+        return start_async_server(create_async_app(engine), port=port, ready=ready)
+    if isinstance(engine, HeadlessRobotEngine):
+        app = create_app(engine)
+    else:
+        app = create_fleet_app(engine)
+    return start_server(app, port=port, ready=ready)
+
+def run_headless(engine, port=5000, server="flask"):
+    """Serve an engine (or a FleetEngine) over HTTP without a display."""
+    ready = threading.Event()
+    serve_engine(engine, port=port, server=server, ready=ready)
+    if not ready.is_set():
+        raise SystemExit(f"Could not serve on port {port}")
+    print(f"Headless robot simulator listening on http://localhost:{port}", flush=True)
+    stop_event = threading.Event()
+    try:
+        engine.run_forever(stop_event)
+    except KeyboardInterrupt:
+        stop_event.set()
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = OptimizedRobotSimulator(root)
-    root.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Robot simulator")
+    parser.add_argument("--headless", action="store_true", help="Run without the Tk window")
+    parser.add_argument("--time-warp", type=parse_time_warp, default=1.0,
+                        help="Simulated seconds per wall-clock second, or 'max'")
+    parser.add_argument("--fleet", type=int, default=0, metavar="N",
+                        help="Simulate N robots headlessly with vectorized state arrays")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--path-retention", type=int, default=100000,
+                        help="Maximum number of trajectory samples kept for /path")
+    parser.add_argument("--server", choices=("flask", "aiohttp"), default="flask",
+                        help="HTTP front end: Flask's development server or the async aiohttp one")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Generate the scenery from this seed (default: random, printed at startup)")
+    parser.add_argument("--map", default=None, metavar="FILE",
+                        help="Load the world from a .json or .npz map file instead")
+    parser.add_argument("--physics-hz", type=float, default=200.0,
+                        help="Fixed simulation step rate")
+    parser.add_argument("--render-hz", type=float, default=30.0,
+                        help="Tk redraw rate; frames interpolate between physics steps")
+    parser.add_argument("--record", default=None, metavar="FILE",
+                        help="Log every command and pose to FILE for robotrecorder.py replay/export")
+    parser.add_argument("--compact", action="store_true",
+                        help="Merge redundant queued commands (same-direction moves, opposing turns, no-ops)")
+    args = parser.parse_args()
+    if args.fleet and args.server != "flask":
+        parser.error("--fleet is only served by --server flask")
+    
+    if args.fleet:
+        from robotfleet import FleetEngine
+        run_headless(FleetEngine(args.fleet, time_warp=args.time_warp), port=args.port)
+        raise SystemExit(0)
+    
+    if args.map:
+        world = World.load(args.map)
+        print(f"Loaded map {args.map} ({len(world)} obstacles)")
+    else:
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        world = World.generate(seed)
+        print(f"World seed: {seed}")
+    engine = HeadlessRobotEngine(time_warp=args.time_warp,
+                                 path=TrajectoryStore(capacity=args.path_retention), world=world,
+                                 physics_hz=args.physics_hz, compact=args.compact)
+    recorder = None
+    if args.record:
+        from robotrecorder import FlightRecorder
+        recorder = FlightRecorder(engine, args.record).start()
+        print(f"Recording to {args.record}")
+    try:
+        if args.headless:
+            run_headless(engine, port=args.port, server=args.server)
+        else:
+            root = tk.Tk()
+            app = OptimizedRobotSimulator(root, engine, port=args.port, server=args.server,
+                                          render_hz=args.render_hz)
+            root.mainloop()
+    finally:
+        if recorder is not None:
+            recorder.close()
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""Bounded, decimated trajectory store for the robot simulator.
+
+Poses are kept in a fixed-size NumPy ring buffer, so memory stays constant
+however long the robot runs. Samples closer than min_distance pixels and
+min_angle degrees to the last stored one are dropped. Every stored sample
+gets a monotonically increasing sequence number that readers use as a
+`since` cursor.
+"""
+
+import struct
+import threading
+
+import numpy as np
+
+# Binary /path encoding: a little-endian header followed by `count` records
+HEADER = struct.Struct("<QQI")  # first_seq, next_cursor, count
+RECORD_DTYPE = np.dtype([("t", "<f8"), ("x", "<f4"), ("y", "<f4"), ("angle", "<f4")])
+
+
+class TrajectoryStore:
+    def __init__(self, capacity=100000, min_distance=1.0, min_angle=1.0):
+        self.capacity = capacity
+        self.min_distance = min_distance
+        self.min_angle = min_angle
+        self.t = np.zeros(capacity)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.angle = np.zeros(capacity)
+        self.next_seq = 0  # Sequence number of the next stored sample
+        self._last = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.next_seq, self.capacity)
+
+    @property
+    def first_seq(self):
+        """Oldest sequence number still retained."""
+        return max(0, self.next_seq - self.capacity)
+
+    def append(self, t, x, y, angle, force=False):
+        """Store a pose sample unless it is within the decimation thresholds.
+
+        Returns True if the sample was stored.
+        """
+        last = self._last
+        if last is not None and not force:
+            moved = (x - last[0]) ** 2 + (y - last[1]) ** 2 >= self.min_distance ** 2
+            turn = abs(angle - last[2]) % 360
+            turned = min(turn, 360 - turn) >= self.min_angle
+            if not moved and not turned:
+                return False
+        elif last is not None and (x, y, angle) == last:
+            return False
+
+        with self.lock:
+            i = self.next_seq % self.capacity
+            self.t[i] = t
+            self.x[i] = x
+            self.y[i] = y
+            self.angle[i] = angle
+            self.next_seq += 1
+        self._last = (x, y, angle)
+        return True
+
+    def since(self, cursor=0, limit=None):
+        """Return (first_seq, next_cursor, records) for samples at or after cursor.
+
+        A cursor older than the retention window starts at the oldest retained
+        sample, which the caller can detect as first_seq > cursor.
+        """
+        with self.lock:
+            start = max(int(cursor), self.first_seq)
+            end = self.next_seq
+            if limit is not None:
+                end = min(end, start + int(limit))
+            count = max(0, end - start)
+            records = np.empty(count, dtype=RECORD_DTYPE)
+            idx = np.arange(start, start + count) % self.capacity
+            records["t"] = self.t[idx]
+            records["x"] = self.x[idx]
+            records["y"] = self.y[idx]
+            records["angle"] = self.angle[idx]
+        return start, start + count, records
+
+    def clear(self):
+        with self.lock:
+            self.next_seq = 0
+            self._last = None
+
+
+def encode_json(first_seq, next_cursor, records):
+    """Column-oriented JSON payload for /path."""
+    return {
+        "first_seq": first_seq,
+        "next": next_cursor,
+        "count": len(records),
+        "t": records["t"].tolist(),
+        # Records are float32; round so JSON does not carry the widening noise
+        "x": records["x"].astype(np.float64).round(3).tolist(),
+        "y": records["y"].astype(np.float64).round(3).tolist(),
+        "angle": records["angle"].astype(np.float64).round(3).tolist()
+    }
+
+
+def encode_binary(first_seq, next_cursor, records):
+    """HEADER followed by packed RECORD_DTYPE records (20 bytes per sample)."""
+    return HEADER.pack(first_seq, next_cursor, len(records)) + records.tobytes()
+
+
+def decode_binary(payload):
+    """Inverse of encode_binary; returns (first_seq, next_cursor, records)."""
+    first_seq, next_cursor, count = HEADER.unpack_from(payload)
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+    return first_seq, next_cursor, records
@@ -0,0 +1,394 @@
+"""World obstacles for the robot simulator.
+
+Obstacles are kept as geometry (circles for trees, axis-aligned rectangles
+for houses) in a uniform-grid spatial hash, so a collision query only looks
+at the few cells a movement passes through, however many obstacles the map
+holds.
+
+A world is reproducible: it is either generated from a seed or loaded from a
+map file, JSON for humans or NPZ for large maps. Map files hold the map
+dimensions, the obstacles, named locations and an optional start pose.
+"""
+
+import gc
+import io
+import json
+import math
+import random
+from collections import defaultdict
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Obstacle(NamedTuple):
+    id: int
+    kind: str  # "tree", "house", ...
+    shape: str  # "circle" or "rect"
+    x: float  # Centre
+    y: float
+    half_w: float  # Radius for circles
+    half_h: float
+
+    def to_dict(self):
+        return self._asdict()
+
+
+SHAPES = ("circle", "rect")
+
+
+def _positive(data, key, default):
+    """data[key] as a positive finite number (an int when whole), or ValueError."""
+    value = data.get(key, default)
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a number, not {value!r}") from None
+    if not (0 < value < math.inf):
+        raise ValueError(f"{key} must be positive and finite")
+    return int(value) if value.is_integer() else value
+
+
+class World:
+    def __init__(self, map_width=600, map_height=500, cell_size=50, seed=None):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.cell_size = cell_size
+        self.seed = seed  # Seed the world was generated from, if any
+        self.obstacles = []
+        self.cells = defaultdict(list)  # (cx, cy) -> [obstacle, ...]
+        self.locations = {}  # name -> (x, y)
+        self.start = None  # Optional (x, y, angle) start pose
+        self.version = 0  # Bumped on every change, invalidates array views
+        self._arrays = None
+
+    @classmethod
+    def generate(cls, seed, map_width=600, map_height=500, cell_size=50, robot_x=250, robot_y=250):
+        """The classic random scenery, reproducible from `seed`.
+
+        Also names two destinations: the "charging dock" at the robot's
+        start and a "kitchen" somewhere clear of obstacles.
+        """
+        world = cls(map_width, map_height, cell_size, seed=seed)
+        rng = random.Random(seed)
+        world.add_random_obstacles(robot_x, robot_y, rng=rng)
+        world.add_location("charging dock", robot_x, robot_y)
+        for _ in range(100):
+            x = rng.randint(60, map_width - 60)
+            y = rng.randint(60, map_height - 60)
+            if world.is_free(x, y, 40) and math.hypot(x - robot_x, y - robot_y) > 150:
+                world.add_location("kitchen", x, y)
+                break
+        return world
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    def _cell_range(self, x0, y0, x1, y1):
+        size = self.cell_size
+        return (int(math.floor(x0 / size)), int(math.floor(y0 / size)),
+                int(math.floor(x1 / size)), int(math.floor(y1 / size)))
+
+    def _add(self, kind, shape, x, y, half_w, half_h):
+        obstacle = Obstacle(len(self.obstacles), kind, shape, float(x), float(y),
+                            float(half_w), float(half_h))
+        self.obstacles.append(obstacle)
+        self.version += 1
+        cx0, cy0, cx1, cy1 = self._cell_range(x - half_w, y - half_h, x + half_w, y + half_h)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells[(cx, cy)].append(obstacle)
+        return obstacle
+
+    def add_circle(self, x, y, radius, kind="tree"):
+        return self._add(kind, "circle", x, y, radius, radius)
+
+    def add_rect(self, x, y, width, height, kind="house"):
+        """Add a rectangle centred on (x, y)."""
+        return self._add(kind, "rect", x, y, width / 2, height / 2)
+
+    def add_many(self, kinds, shapes, x, y, half_w, half_h):
+        """Bulk-add obstacles from parallel sequences; much faster than _add in a loop."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        half_w = np.asarray(half_w, dtype=np.float64)
+        half_h = np.asarray(half_h, dtype=np.float64)
+        size = self.cell_size
+        cx0 = np.floor((x - half_w) / size).astype(np.int64)
+        cy0 = np.floor((y - half_h) / size).astype(np.int64)
+        cx1 = np.floor((x + half_w) / size).astype(np.int64)
+        cy1 = np.floor((y + half_h) / size).astype(np.int64)
+
+        # Building many small tuples triggers repeated full GC passes; none of
+        # them can be garbage, so pause the collector while they are created
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            first = len(self.obstacles)
+            new = list(map(Obstacle, range(first, first + len(x)), kinds, shapes,
+                           x.tolist(), y.tolist(), half_w.tolist(), half_h.tolist()))
+            self.obstacles.extend(new)
+            self._index(new, cx0, cy0, cx1, cy1)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.version += 1
+
+    def _index(self, new, cx0, cy0, cx1, cy1):
+        """Register `new` obstacles in the cells spanned by their cell ranges."""
+
+        # Expand each obstacle into the cells it covers, then group by cell in NumPy
+        span_x = cx1 - cx0 + 1
+        counts = span_x * (cy1 - cy0 + 1)
+        owner = np.repeat(np.arange(len(new)), counts)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = cx0[owner] + offset % span_x[owner]
+        cell_y = cy0[owner] + offset // span_x[owner]
+        order = np.lexsort((owner, cell_y, cell_x))
+        cell_x, cell_y = cell_x[order], cell_y[order]
+        boundaries = np.flatnonzero((np.diff(cell_x) != 0) | (np.diff(cell_y) != 0)) + 1
+        starts = np.concatenate(([0], boundaries)).tolist()
+        ends = np.concatenate((boundaries, [len(order)])).tolist()
+
+        grouped = [new[i] for i in owner[order].tolist()]
+        cells = self.cells
+        for start, end, cx, cy in zip(starts, ends, cell_x[starts].tolist(), cell_y[starts].tolist()):
+            cells[(cx, cy)].extend(grouped[start:end])
+
+    def add_location(self, name, x, y):
+        self.locations[name] = (float(x), float(y))
+
+    def clear(self):
+        self.obstacles = []
+        self.cells = defaultdict(list)
+        self.version += 1
+
+    def to_dict(self):
+        """JSON-friendly map description."""
+        return {
+            "map_width": self.map_width,
+            "map_height": self.map_height,
+            "cell_size": self.cell_size,
+            "seed": self.seed,
+            "start": list(self.start) if self.start is not None else None,
+            "locations": {name: list(point) for name, point in self.locations.items()},
+            "obstacles": [{"kind": o.kind, "shape": o.shape, "x": o.x, "y": o.y,
+                           "half_w": o.half_w, "half_h": o.half_h} for o in self.obstacles]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a world from to_dict() output; a bare {"seed": N} generates one."""
+        size = (_positive(data, "map_width", 600), _positive(data, "map_height", 500),
+                _positive(data, "cell_size", 50))
+        if "obstacles" not in data and data.get("seed") is not None:
+            world = cls.generate(data["seed"], *size)
+        else:
+            world = cls(*size, seed=data.get("seed"))
+            obstacles = data.get("obstacles", [])
+            if obstacles:
+                shapes = [o["shape"] for o in obstacles]
+                for index, shape in enumerate(shapes):
+                    if shape not in SHAPES:
+                        raise ValueError(f"obstacle {index}: shape must be one of {', '.join(SHAPES)}")
+                columns = np.array([(o["x"], o["y"], o["half_w"], o.get("half_h", o["half_w"]))
+                                    for o in obstacles], dtype=np.float64)
+                # NaN or infinite extents would index absurd cell ranges
+                if not np.isfinite(columns).all() or (columns[:, 2:] < 0).any():
+                    raise ValueError("obstacle positions must be finite and sizes non-negative")
+                world.add_many([o.get("kind", "obstacle") for o in obstacles], shapes,
+                               columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3])
+        for name, point in data.get("locations", {}).items():
+            world.add_location(name, *point)
+        if data.get("start") is not None:
+            world.start = tuple(float(v) for v in data["start"])
+        return world
+
+    def to_npz_bytes(self):
+        """Compact binary map: obstacle columns as NumPy arrays in an NPZ archive."""
+        kinds = sorted({o.kind for o in self.obstacles})
+        kind_index = {kind: i for i, kind in enumerate(kinds)}
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            meta=np.array(json.dumps({
+                "map_width": self.map_width, "map_height": self.map_height,
+                "cell_size": self.cell_size, "seed": self.seed,
+                "start": list(self.start) if self.start is not None else None,
+                "locations": {name: list(point) for name, point in self.locations.items()},
+                "kinds": kinds
+            })),
+            kind=np.array([kind_index[o.kind] for o in self.obstacles], dtype=np.uint16),
+            shape=np.array([SHAPES.index(o.shape) for o in self.obstacles], dtype=np.uint8),
+            xy=np.array([(o.x, o.y, o.half_w, o.half_h) for o in self.obstacles],
+                        dtype=np.float64).reshape(-1, 4)
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_npz_bytes(cls, payload):
+        with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+            meta = json.loads(str(archive["meta"]))
+            kind, shape, xy = archive["kind"], archive["shape"], archive["xy"]
+        world = cls(_positive(meta, "map_width", 600), _positive(meta, "map_height", 500),
+                    _positive(meta, "cell_size", 50), seed=meta["seed"])
+        if len(xy):
+            kinds = np.array(meta["kinds"], dtype=object)[kind].tolist()
+            shapes = np.array(SHAPES, dtype=object)[shape].tolist()
+            world.add_many(kinds, shapes, xy[:, 0], xy[:, 1], xy[:, 2], xy[:, 3])
+        for name, point in meta["locations"].items():
+            world.add_location(name, *point)
+        if meta["start"] is not None:
+            world.start = tuple(float(v) for v in meta["start"])
+        return world
+
+    def save(self, path):
+        """Write a .npz (binary) or any other extension as JSON."""
+        if str(path).endswith(".npz"):
+            with open(path, "wb") as f:
+                f.write(self.to_npz_bytes())
+        else:
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        if str(path).endswith(".npz"):
+            with open(path, "rb") as f:
+                return cls.from_npz_bytes(f.read())
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def arrays(self):
+        """NumPy views of the obstacles for vectorized queries, cached per version.
+
+        Returns {"circles": (M, 3) [x, y, r], "rects": (K, 4) [x0, y0, x1, y1]}.
+        """
+        cached = self._arrays
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        version = self.version
+        circles = [(o.x, o.y, o.half_w) for o in self.obstacles if o.shape == "circle"]
+        rects = [(o.x - o.half_w, o.y - o.half_h, o.x + o.half_w, o.y + o.half_h)
+                 for o in self.obstacles if o.shape == "rect"]
+        arrays = {
+            "circles": np.array(circles, dtype=np.float64).reshape(-1, 3),
+            "rects": np.array(rects, dtype=np.float64).reshape(-1, 4)
+        }
+        self._arrays = (version, arrays)
+        return arrays
+
+    def add_random_obstacles(self, robot_x, robot_y, rng=random):
+        """Scatter trees and houses the way the Tk simulator always has."""
+        for _ in range(8):
+            x = rng.randint(50, self.map_width - 50)
+            y = rng.randint(50, self.map_height - 50)
+            # Make sure trees don't overlap with the robot's starting position
+            if abs(x - robot_x) > 50 or abs(y - robot_y) > 50:
+                self.add_circle(x, y, 15, kind="tree")
+
+        for _ in range(3):
+            x = rng.randint(80, self.map_width - 80)
+            y = rng.randint(80, self.map_height - 80)
+            # Make sure houses don't overlap with the robot's starting position
+            if abs(x - robot_x) > 80 or abs(y - robot_y) > 80:
+                self.add_rect(x, y, 40, 30, kind="house")
+
+    def nearby(self, x0, y0, x1, y1):
+        """Obstacles registered in any cell touching the box (x0, y0)-(x1, y1)."""
+        cx0, cy0, cx1, cy1 = self._cell_range(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        if (cx0, cy0) == (cx1, cy1):
+            return self.cells.get((cx0, cy0), ())
+        seen = {}
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for obstacle in self.cells.get((cx, cy), ()):
+                    seen[obstacle.id] = obstacle
+        return seen.values()
+
+    def is_free(self, x, y, radius):
+        """True if a disc of `radius` at (x, y) touches no obstacle and lies inside the map."""
+        if not (radius <= x <= self.map_width - radius and radius <= y <= self.map_height - radius):
+            return False
+        for obstacle in self.nearby(x - radius, y - radius, x + radius, y + radius):
+            if obstacle.shape == "circle":
+                if math.hypot(x - obstacle.x, y - obstacle.y) <= obstacle.half_w + radius:
+                    return False
+            elif (abs(x - obstacle.x) <= obstacle.half_w + radius and
+                  abs(y - obstacle.y) <= obstacle.half_h + radius):
+                return False
+        return True
+
+    def sweep(self, x0, y0, x1, y1, radius):
+        """First contact of a disc of `radius` moving from (x0, y0) to (x1, y1).
+
+        Returns (t, obstacle) with t in [0, 1] the fraction of the segment
+        travelled before contact, or None if the path is clear. A disc that
+        already touches an obstacle is blocked only when moving into it.
+        Rectangles are tested as boxes grown by `radius`, which is slightly
+        conservative at their corners.
+        """
+        candidates = self.nearby(min(x0, x1) - radius, min(y0, y1) - radius,
+                                 max(x0, x1) + radius, max(y0, y1) + radius)
+        if not candidates:
+            return None
+
+        dx = x1 - x0
+        dy = y1 - y0
+        best = None
+        for obstacle in candidates:
+            if obstacle.shape == "circle":
+                t = _sweep_circle(x0, y0, dx, dy, obstacle.x, obstacle.y, obstacle.half_w + radius)
+            else:
+                t = _sweep_box(x0, y0, dx, dy, obstacle.x, obstacle.y,
+                               obstacle.half_w + radius, obstacle.half_h + radius)
+            if t is not None and (best is None or t < best[0]):
+                best = (t, obstacle)
+        return best
+
+
+def _sweep_circle(x0, y0, dx, dy, cx, cy, reach):
+    fx = x0 - cx
+    fy = y0 - cy
+    c = fx * fx + fy * fy - reach * reach
+    b = fx * dx + fy * dy
+    if c <= 0:
+        # Already touching: blocked only if moving towards the centre
+        return 0.0 if b < 0 else None
+    a = dx * dx + dy * dy
+    if a == 0 or b >= 0:
+        return None
+    disc = b * b - a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / a
+    return t if t <= 1.0 else None
+
+
+def _sweep_box(x0, y0, dx, dy, cx, cy, half_w, half_h):
+    lo_x, hi_x = cx - half_w, cx + half_w
+    lo_y, hi_y = cy - half_h, cy + half_h
+    if lo_x <= x0 <= hi_x and lo_y <= y0 <= hi_y:
+        # Already touching: blocked only if moving further in through the
+        # nearest face (both faces at a corner)
+        faces = ((x0 - lo_x, dx > 0), (hi_x - x0, dx < 0), (y0 - lo_y, dy > 0), (hi_y - y0, dy < 0))
+        nearest = min(depth for depth, _ in faces)
+        return 0.0 if any(inward for depth, inward in faces if depth <= nearest + 1e-9) else None
+
+    t_enter, t_exit = 0.0, 1.0
+    for p, d, lo, hi in ((x0, dx, lo_x, hi_x), (y0, dy, lo_y, hi_y)):
+        if d == 0:
+            if p < lo or p > hi:
+                return None
+            continue
+        t0 = (lo - p) / d
+        t1 = (hi - p) / d
+        if t0 > t1:
+            t0, t1 = t1, t0
+        t_enter = max(t_enter, t0)
+        t_exit = min(t_exit, t1)
+        if t_enter > t_exit:
+            return None
+    return t_enter
@@ -1,6 +1,7 @@
 import os
 from mech_client.interact import interact
 from dotenv import load_dotenv
+from robotplancompiler import PlanError, compile_plan, plan_prompt
 
 load_dotenv()
 
@@ -19,9 +20,13 @@ def send_mech_request(mech_address: str, tool: str, prompt: str, chain_config: s
     except Exception as e:
         return f"Error: {str(e)}"
 
-def parse_openai_response(response: str) -> list[str]:
-    """Parse OpenAI Mech response into a list of commands."""
-    return [cmd.strip() for cmd in response.split(",") if cmd.strip()]
+def parse_openai_response(response: str) -> list:
+    """Compile OpenAI Mech response into validated plan steps; [] if the plan is rejected."""
+    try:
+        return compile_plan(response)
+    except PlanError as e:
+        print(f"Rejected plan: {e}")
+        return []
 
 def test_system():
     """Test the coordinator-like interaction between OpenAI and robot control Mechs."""
@@ -29,7 +34,7 @@ def test_system():
     openai_mech_address = "0x1234567890abcdef1234567890abcdef12345678"  # Placeholder
     robot_mech_address = "0xabcdef1234567890abcdef1234567890abcdef12"  # Placeholder
     openai_tool = "openai-gpt-4o-2024-08-06"
-    robot_tool = "robot-control"
+    robot_tool = "robot-control-batch"
 
     # Step 1: Send user command to OpenAI Mech
     user_command = "Navigate to the kitchen"
@@ -42,29 +47,32 @@ def test_system():
         print("Failed to get OpenAI response")
         return
 
-    # Step 2: Parse commands
-    commands = parse_openai_response(openai_response)
-    if not commands:
+    # Step 2: Compile commands
+    plan = parse_openai_response(openai_response)
+    if not plan:
         print("No valid commands received")
         return
-    print(f"Parsed Commands: {commands}")
+    print(f"Compiled Plan: {plan_prompt(plan)}")
 
-    # Step 3: Send each command to Robot Control Mech
-    for command in commands:
-        print(f"Sending to Robot Control Mech: {command}")
-        robot_response = send_mech_request(robot_mech_address, robot_tool, command)
+    # Step 3: Send the whole plan to Robot Control Mech in one request
+    plans = [plan]
+    for current_plan in plans:
+        prompt = plan_prompt(current_plan)
+        print(f"Sending to Robot Control Mech: {prompt}")
+        robot_response = send_mech_request(robot_mech_address, robot_tool, prompt)
         print(f"Robot Response: {robot_response}")
 
         # Step 4: Check for feedback
         if "error" in robot_response.lower() or "obstacle" in robot_response.lower():
             print("Issue detected; requesting new path")
-            new_path_prompt = f"Obstacle detected during '{command}' while navigating to the kitchen. Suggest a new sequence of commands."
+            new_path_prompt = f"Obstacle detected during '{', '.join(step.text for step in current_plan)}' while navigating to the kitchen. Suggest a new sequence of commands."
             new_openai_response = send_mech_request(openai_mech_address, openai_tool, new_path_prompt)
             print(f"New OpenAI Response: {new_openai_response}")
             if "Error" not in new_openai_response:
-                new_commands = parse_openai_response(new_openai_response)
-                commands.extend(new_commands)
-                print(f"New Commands: {new_commands}")
+                new_plan = parse_openai_response(new_openai_response)
+                if new_plan:
+                    plans.append(new_plan)
+                    print(f"New Plan: {plan_prompt(new_plan)}")
 
 if __name__ == "__main__":
     test_system()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import logging
 from localrobotagent import LocalCoordinatorBehaviour
+from robotplancompiler import PlanStep, plan_prompt
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -31,25 +32,43 @@ class TestLocalCoordinator:
             openai_prompt = f"Generate a sequence of robot commands to {self.user_command}, avoiding obstacles. Use format: 'move forward 2 seconds, turn left 1.5 seconds'."
             openai_response = self.behaviour._send_openai_request(prompt=openai_prompt)
             if openai_response:
-                commands = self.behaviour._parse_openai_response(openai_response)
-                for command in commands:
-                    robot_response = self.behaviour._send_robot_request(prompt=command)
-                    logger.info(f"Robot response: {robot_response}")
-                    # Simulate obstacle for testing
-                    if "forward" in command:
-                        logger.info("Simulating obstacle detection")
-                        new_path_prompt = f"Obstacle detected during '{command}' while navigating to {self.user_command}. Suggest a new sequence of commands."
-                        new_openai_response = self.behaviour._send_openai_request(prompt=new_path_prompt)
-                        if new_openai_response:
-                            new_commands = self.behaviour._parse_openai_response(new_openai_response)
-                            for new_command in new_commands:
-                                robot_response = self.behaviour._send_robot_request(prompt=new_command)
-                                logger.info(f"Robot response for new command: {robot_response}")
+                plan = self.behaviour._compile_plan(openai_response)
+                self._check_plan(plan)
+                # The whole plan goes to the robot as one robot-control-batch prompt
+                robot_response = self._send_plan(plan)
+                logger.info(f"Robot response: {robot_response}")
+                # Simulate obstacle for testing
+                if any(step.command == "forward" for step in plan):
+                    logger.info("Simulating obstacle detection")
+                    new_path_prompt = f"Obstacle detected during '{', '.join(step.text for step in plan)}' while navigating to {self.user_command}. Suggest a new sequence of commands."
+                    new_openai_response = self.behaviour._send_openai_request(prompt=new_path_prompt)
+                    if new_openai_response:
+                        new_plan = self.behaviour._compile_plan(new_openai_response)
+                        self._check_plan(new_plan)
+                        robot_response = self._send_plan(new_plan)
+                        logger.info(f"Robot response for new plan: {robot_response}")
         
         self.behaviour.act = patched_act
         self.behaviour.act()
         self.behaviour.teardown()
 
+    def _check_plan(self, plan):
+        """Every compiled step is a PlanStep the simulator accepts."""
+        for step in plan:
+            assert isinstance(step, PlanStep), f"Expected a PlanStep, got {step!r}"
+            assert step.command in ("forward", "backward", "left", "right", "velocity"), step
+            assert step.duration > 0, step
+            if step.command == "velocity":
+                assert step.linear is not None and step.angular is not None, step
+        logger.info(f"Compiled plan: {[step.to_dict() for step in plan]}")
+
+    def _send_plan(self, plan):
+        """Send the plan as one robot-control-batch request, a step per prompt line."""
+        assert self.behaviour.robot_tool == "robot-control-batch", self.behaviour.robot_tool
+        prompt = plan_prompt(plan)
+        assert len(prompt.splitlines()) == len(plan), prompt
+        return self.behaviour._send_robot_request(prompt=prompt)
+
 if __name__ == "__main__":
     test_command = "Navigate to the kitchen"
     coordinator_test = TestLocalCoordinator(user_command=test_command)
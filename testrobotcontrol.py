@@ -6,4 +6,13 @@ kwargs = {
     "counter_callback": None
 }
 result = run(**kwargs)
-print(result[0])  # Prints the response
\ No newline at end of file
+print(result[0])  # Prints the response
+
+# A whole plan in one call
+kwargs = {
+    "prompt": "move forward 2 seconds, left 1.5, forward 1",
+    "tool": "robot-control-batch",
+    "counter_callback": None
+}
+result = run(**kwargs)
+print(result[0])